@@ -8,10 +8,27 @@
 # - settings.py: Configuración global (resolución, FOV, velocidades)
 # - player.py: Clase del jugador con movimiento y colisiones
 # - raycasting.py: Motor de raycasting con algoritmo DDA
+# - parallel_raycasting.py: Raycasting opcional en un pool de procesos (franjas de columnas)
+# - parallel_renderer.py: Rasterizado opcional en paralelo sobre un back buffer compartido
+# - kernels.py: Kernels opcionales (DDA y columnas de pared) compilados con numba si está instalado
 # - renderer.py: Sistema de renderizado (paredes, sprites, UI)
+# - lightmap.py: Luz precalculada por celda de los sprites que emiten luz (rebake incremental con las puertas)
 # - map.py: Definición del mapa del juego
+# - world_stream.py: Mundo por trozos para niveles grandes (chunks cargados en segundo plano)
+# - level.py: Formato de archivo de nivel (levels/*.txt) compilado a capas planas y mapeado en memoria
+# - pvs.py: Conjuntos potencialmente visibles por celda guardados junto al nivel (python pvs.py levels/e1m1.txt)
 # - sprite.py: Clase para objetos 3D (sprites)
+# - enemy_system.py: IA de enemigos por lotes con el estado en arrays NumPy (opcional)
+# - ai_scheduler.py: Nivel de detalle de la IA (frecuencia de actualización por distancia y visibilidad)
 # - texture_manager.py: Carga y gestión de texturas
+# - texture_atlas.py: Atlas NumPy con todas las texturas (paredes, sprites, HUD)
+# - asset_loader.py: Decodificación de PNG/WAV en un pool de hilos durante la carga
+# - asset_cache.py: Caché binaria de assets preprocesados (python asset_cache.py para construirla)
+# - audio_bank.py: Banco de audio con el PCM ya convertido al formato del mixer (python audio_bank.py)
+# - game_clock.py: Reloj de la simulación (fijo por tick al grabar o reproducir la entrada)
+# - input_log.py: Grabación y reproducción determinista de la entrada (python input_log.py sesion.r3di)
+# - golden.py: Regresión del renderer por imágenes de referencia en golden/ (python golden.py)
+# - benchmark.py: Benchmarks de rendimiento (python benchmark.py)
 #
 # PARA EJECUTAR EL JUEGO:
 # python main.py
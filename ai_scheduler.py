@@ -0,0 +1,161 @@
+"""
+Nivel de detalle de la IA (settings.AI_LOD).
+
+Cada tick reparte a los enemigos vivos en tres niveles:
+    cercanos  a menos de AI_NEAR_DISTANCE o visibles en pantalla: cada tick
+    lejanos   cada AI_FAR_INTERVAL ticks, escalonados por índice para repartir
+              el trabajo por igual entre ticks
+    dormidos  IDLE más allá de AI_DORMANT_DISTANCE y fuera de la vista, o fuera
+              del PVS del jugador (no pueden verlo): no se actualizan hasta que
+              un ruido (noise, p. ej. un disparo) los alcanza
+Los que se saltaron ticks recuperan el movimiento perdido en su siguiente
+actualización. El coste de cada tick queda en cost_ms; con enemigos objeto, al
+pasar de AI_BUDGET_MS los restantes se aplazan al tick siguiente (con
+EnemySystem el lote entero cuesta menos que el propio reparto). Al grabar o
+reproducir la entrada no se aplaza nada: el resultado no depende del tiempo real.
+"""
+import math
+import time
+import settings
+
+
+def tiers(distance, visible, idle, hidden, alerted, turn):
+    """
+    Nivel de un enemigo vivo: (cercano, lejano); ninguno de los dos = dormido.
+    hidden es IDLE fuera del PVS del jugador y turn que le toca al escalonado de los
+    lejanos. Solo usa & | ^, así que vale igual para valores sueltos (due) que para
+    arrays NumPy de todos los enemigos (_due_batched).
+    """
+    near = alerted | ((hidden ^ True) & ((distance <= settings.AI_NEAR_DISTANCE) | visible))
+    dormant = hidden | (idle & (distance > settings.AI_DORMANT_DISTANCE))
+    far = ((near | dormant) ^ True) & turn
+    return near, far
+
+
+class AIScheduler:
+    def __init__(self, enemies, player, system=None):
+        self.enemies = enemies
+        self.player = player
+        self.system = system      # EnemySystem si la IA va por lotes
+        self.tick = 0
+        self.pending = [0] * len(enemies)  # Ticks sin actualizar de cada enemigo
+        if system is not None:
+            import numpy
+            from enemy_system import IDLE
+            self.system_np = numpy
+            self.idle_state = IDLE
+            self.pending = numpy.zeros(len(enemies), dtype=numpy.int64)
+        self.alerted = set()      # Índices despertados por un ruido
+        self.overdue = []         # Índices aplazados por el presupuesto
+        self.cost_ms = 0.0        # Coste del último tick
+        self.updated = 0          # Enemigos actualizados en el último tick
+        self.budget_ms = settings.AI_BUDGET_MS  # None = sin aplazar (simulación determinista)
+        self.pvs = None           # PVS del nivel (settings.PVS)
+
+    def noise(self, x, y, radius):
+        """
+        Un ruido en (x, y): los enemigos a menos de radius (y en el PVS de donde suena)
+        se actualizan en el siguiente tick
+        """
+        sees = self.pvs.viewer(x, y) if self.pvs else None
+        for i, enemy in enumerate(self.enemies):
+            if not enemy.dead and (enemy.x - x) ** 2 + (enemy.y - y) ** 2 <= radius * radius:
+                if sees is None or sees(enemy.x, enemy.y):
+                    self.alerted.add(i)
+
+    def _visible(self, distance, angle_delta, rays):
+        """Dentro del FOV y más cerca que la pared del rayo de su columna"""
+        if abs(angle_delta) > settings.HALF_FOV or not rays:
+            return False
+        column = int((angle_delta + settings.HALF_FOV) / settings.FOV * len(rays))
+        return distance < rays[min(column, len(rays) - 1)]['depth'] + 0.5
+
+    def due(self, rays):
+        """Índices a actualizar este tick, por prioridad (aplazados, cercanos y despertados, lejanos)"""
+        if self.system is not None:
+            return self._due_batched(rays)
+        px, py = self.player.x, self.player.y
+        angle = self.player.angle
+        interval = settings.AI_FAR_INTERVAL
+        pending = self.pending
+        sees = self.pvs.viewer(px, py) if self.pvs else None
+        near = []
+        far = []
+        for i, enemy in enumerate(self.enemies):
+            if enemy.dead:
+                continue
+            pending[i] += 1
+            dx = enemy.x - px
+            dy = enemy.y - py
+            distance = enemy.distance = math.sqrt(dx * dx + dy * dy)
+            idle = enemy.state == 'IDLE'
+            hidden = idle and sees is not None and not sees(enemy.x, enemy.y)  # No puede ver al jugador
+            # La vista solo decide entre los que no son cercanos ya (atan2 es lo más caro del bucle)
+            visible = (not hidden and distance > settings.AI_NEAR_DISTANCE and
+                       self._visible(distance, (math.atan2(dy, dx) - angle + math.pi) % (2 * math.pi) - math.pi, rays))
+            is_near, is_far = tiers(distance, visible, idle, hidden, i in self.alerted, (self.tick + i) % interval == 0)
+            if is_near:
+                near.append(i)
+            elif is_far:
+                far.append(i)
+        self.alerted.clear()
+        overdue = [i for i in self.overdue if not self.enemies[i].dead]
+        queued = set(overdue)
+        return overdue + [i for i in near + far if i not in queued]
+
+    def _due_batched(self, rays):
+        """due() con los arrays de EnemySystem"""
+        np = self.system_np
+        system = self.system
+        px, py = self.player.x, self.player.y
+        alive = ~system.dead
+        dx = system.x - px
+        dy = system.y - py
+        distance = np.sqrt(dx * dx + dy * dy)
+        system.distance[alive] = distance[alive]
+        self.pending[alive] += 1
+
+        idle = system.state == self.idle_state
+        hidden = np.zeros(len(distance), dtype=bool)
+        if self.pvs:
+            # IDLE fuera del PVS del jugador: no pueden verlo
+            hidden = idle & ~self.pvs.sees_many(px, py, system.x, system.y)
+        alerted = np.zeros(len(distance), dtype=bool)
+        if self.alerted:
+            alerted[list(self.alerted)] = True
+            self.alerted.clear()
+        visible = np.zeros(len(distance), dtype=bool)
+        if rays:
+            delta = (np.arctan2(dy, dx) - self.player.angle + math.pi) % (2 * math.pi) - math.pi
+            depths = np.array([ray['depth'] for ray in rays])
+            columns = ((delta + settings.HALF_FOV) / settings.FOV * len(rays)).astype(np.int64)
+            columns = np.clip(columns, 0, len(rays) - 1)
+            visible = (np.abs(delta) <= settings.HALF_FOV) & (distance < depths[columns] + 0.5)
+        turn = (self.tick + np.arange(len(distance))) % settings.AI_FAR_INTERVAL == 0
+        near, far = tiers(distance, visible, idle, hidden, alerted, turn)
+        return np.flatnonzero(alive & (near | far))
+
+    def update(self, rays=None, now=None):
+        """Un tick de IA: actualiza los enemigos que tocan y mide el coste"""
+        start = time.perf_counter()
+        self.tick += 1
+        order = self.due(rays)
+        cap = settings.AI_FAR_INTERVAL  # No recuperar más movimiento que el de un intervalo lejano
+        self.overdue = []
+
+        if self.system is not None:
+            if len(order):
+                self.system.update(now, order, self.system_np.minimum(self.pending, cap))
+                self.pending[order] = 0
+        else:
+            budget = None if self.budget_ms is None else self.budget_ms / 1000
+            for n, i in enumerate(order):
+                if n and budget is not None and time.perf_counter() - start > budget:
+                    self.overdue = order[n:]
+                    order = order[:n]
+                    break
+                self.enemies[i].update(now, min(self.pending[i], cap))
+                self.pending[i] = 0
+
+        self.updated = len(order)
+        self.cost_ms = (time.perf_counter() - start) * 1000
@@ -0,0 +1,256 @@
+"""
+Caché binaria de assets preprocesados.
+
+Guarda en un único archivo versionado las texturas ya decodificadas y escaladas
+y los frames de sprites ya cortados para la resolución actual (el audio va en su
+propio banco, ver audio_bank.py). Al arrancar el archivo se mapea en memoria
+(mmap) y cada asset se crea directamente desde su bloque de bytes, sin decodificar
+PNG. Cada entrada recuerda su archivo fuente (mtime, tamaño y SHA-1): si la
+fuente cambia, la entrada se ignora, el cargador vuelve a decodificarla y la caché
+se reescribe al final de la carga.
+
+Formato:
+    MAGIC (8 bytes) | versión (u32) | longitud del índice (u32) | índice JSON | datos
+
+Para construirla sin lanzar el juego:
+    python asset_cache.py
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import pygame
+import settings
+
+MAGIC = b'R3DCACHE'
+CACHE_VERSION = 2
+HEADER = struct.Struct('<8sII')
+ALIGN = 16
+
+
+def _key_str(key):
+    """('wall', 1) -> 'wall:1'"""
+    return ':'.join(str(part) for part in key)
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssetCache:
+    def __init__(self, path=None, base_dir=None):
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.path = path or os.path.join(self.base_dir, settings.ASSET_CACHE_FILE)
+        self.params = {
+            'screen': [settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT],
+        }
+        self.entries = {}      # clave -> metadatos de la entrada en el archivo mapeado
+        self.sources = {}      # ruta relativa -> [mtime_ns, tamaño, sha1]
+        self.stale = set()     # fuentes modificadas desde que se escribió la caché
+        self.new_entries = {}  # clave -> (metadatos, bytes) pendientes de guardar
+        self._added_sources = set()  # fuentes ya hasheadas en esta carga
+        self.hits = 0
+        self.misses = 0
+        self._file = None
+        self._map = None
+        self._data_start = 0
+
+    # ---- Lectura ----
+
+    def open(self):
+        """Mapea el archivo de caché si existe y es compatible; retorna True si se pudo usar"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, index_len = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != CACHE_VERSION:
+                raise ValueError(f"versión {version} incompatible")
+            index = json.loads(self._map[HEADER.size:HEADER.size + index_len].decode('utf-8'))
+            if index.get('params') != self.params:
+                raise ValueError("parámetros distintos (resolución)")
+        except (OSError, ValueError, struct.error) as e:
+            print(f"  ! Caché de assets descartada: {e}")
+            self.close()
+            return False
+
+        self._data_start = -(-(HEADER.size + index_len) // ALIGN) * ALIGN
+        self.entries = index['entries']
+        self.sources = index['sources']
+        self.stale = {source for source in self.sources if not self._source_valid(source)}
+        return True
+
+    def _source_valid(self, source):
+        """Una fuente es válida si su mtime y tamaño coinciden, o si su contenido (SHA-1) es el mismo"""
+        path = os.path.join(self.base_dir, source)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        mtime_ns, size, sha1 = self.sources[source]
+        if stat.st_mtime_ns == mtime_ns and stat.st_size == size:
+            return True
+        if stat.st_size != size or _file_sha1(path) != sha1:
+            return False
+        # Solo cambió el mtime: actualizarlo para la próxima vez
+        self.sources[source] = [stat.st_mtime_ns, size, sha1]
+        return True
+
+    def has_source(self, path):
+        """True si la caché tiene entradas válidas de este archivo (no hace falta decodificarlo)"""
+        source = os.path.relpath(path, self.base_dir)
+        return self._map is not None and source in self.sources and source not in self.stale
+
+    def _lookup(self, key):
+        """Metadatos y bytes de una entrada válida, o None"""
+        entry = self.entries.get(key)
+        if entry is None or self._map is None or entry['source'] in self.stale:
+            return None
+        start = self._data_start + entry['offset']
+        return entry, memoryview(self._map)[start:start + entry['size']]
+
+    def load_image(self, key):
+        """Superficie (ya en formato de pantalla) de una imagen cacheada, o None"""
+        found = self._lookup(_key_str(key))
+        if found is None:
+            self.misses += 1
+            return None
+        entry, data = found
+        image = pygame.image.frombuffer(data, tuple(entry['size_px']), entry['format'])
+        image = image.convert_alpha() if entry['format'] == 'RGBA' else image.convert()
+        data.release()
+        if entry.get('colorkey') is not None:
+            image.set_colorkey(entry['colorkey'])
+        self.hits += 1
+        return image
+
+    def load_frames(self, key):
+        """Lista de superficies cacheadas con store_frames, o None si falta alguna"""
+        entry = self.entries.get(_key_str(key))
+        if entry is None or entry['source'] in self.stale:
+            self.misses += 1
+            return None
+        frames = [self.load_image(key + (i,)) for i in range(entry['count'])]
+        return frames if all(frame is not None for frame in frames) else None
+
+    # ---- Escritura ----
+
+    def _add_source(self, path):
+        source = os.path.relpath(path, self.base_dir)
+        if source in self._added_sources:
+            return source
+        self._added_sources.add(source)
+        stat = os.stat(path)
+        self.sources[source] = [stat.st_mtime_ns, stat.st_size, _file_sha1(path)]
+        self.stale.discard(source)
+        return source
+
+    def store_image(self, key, surface, source_path):
+        """Registra una imagen decodificada para la próxima escritura de la caché"""
+        alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        fmt = 'RGBA' if alpha else 'RGB'
+        colorkey = surface.get_colorkey()
+        data = pygame.image.tostring(surface, fmt)
+        entry = {
+            'format': fmt,
+            'size_px': list(surface.get_size()),
+            'colorkey': list(colorkey[:3]) if colorkey is not None else None,
+            'source': self._add_source(source_path),
+        }
+        self.new_entries[_key_str(key)] = (entry, data)
+
+    def store_frames(self, key, surfaces, source_path):
+        """Registra una lista de frames (ya cortados y escalados)"""
+        for i, surface in enumerate(surfaces):
+            self.store_image(key + (i,), surface, source_path)
+        entry = {'count': len(surfaces), 'source': self._add_source(source_path)}
+        self.new_entries[_key_str(key)] = (entry, b'')
+
+    def save(self):
+        """Reescribe la caché si hubo entradas nuevas o inválidas; retorna True si se escribió"""
+        if not self.new_entries:
+            self.close()
+            return False
+
+        # Entradas antiguas aún válidas + nuevas
+        blobs = {}
+        for key, entry in self.entries.items():
+            if key not in self.new_entries and entry['source'] not in self.stale and self._map is not None:
+                start = self._data_start + entry['offset']
+                blobs[key] = (entry, self._map[start:start + entry['size']])
+        blobs.update(self.new_entries)
+        self.close()
+
+        entries = {}
+        offset = 0
+        for key, (entry, data) in blobs.items():
+            entry = dict(entry, offset=offset, size=len(data))
+            entries[key] = entry
+            offset += -(-len(data) // ALIGN) * ALIGN
+        used_sources = {entry['source'] for entry in entries.values()}
+        index = json.dumps({
+            'params': self.params,
+            'sources': {s: v for s, v in self.sources.items() if s in used_sources},
+            'entries': entries,
+        }).encode('utf-8')
+
+        data_start = -(-(HEADER.size + len(index)) // ALIGN) * ALIGN
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, CACHE_VERSION, len(index)))
+            f.write(index)
+            f.write(b'\0' * (data_start - HEADER.size - len(index)))
+            for key, (entry, data) in blobs.items():
+                f.write(data)
+                f.write(b'\0' * (-len(data) % ALIGN))
+        os.replace(tmp_path, self.path)
+
+        self.entries = entries
+        self.new_entries = {}
+        print(f"  ✓ Caché de assets escrita: {len(entries)} entradas en {os.path.basename(self.path)}")
+        return True
+
+    def close(self):
+        """Libera el mapeo del archivo"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self):
+        print(f"  ✓ Caché de assets: {self.hits} assets desde caché, {self.misses} decodificados")
+
+
+def build():
+    """Construye (o actualiza) la caché cargando todos los assets del juego sin ventana"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    screen = pygame.display.set_mode((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
+
+    from texture_manager import TextureManager
+    from hud import HUD
+    from weapon import Weapon
+    from player import Player
+
+    cache = AssetCache()
+    cache.open()
+    texture_manager = TextureManager(cache)
+    texture_manager.load_textures()
+    HUD(screen, texture_manager)
+    Weapon(screen, Player(0, 0, 0), texture_manager)
+    cache.report()
+    if not cache.save():
+        print("  ✓ Caché de assets al día")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,106 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+import settings
+from texture_manager import load_pillow
+
+
+def _decode_image(path):
+    """Decodifica un PNG sin convertirlo al formato de pantalla (seguro fuera del hilo principal)"""
+    try:
+        return pygame.image.load(path)
+    except Exception:
+        Image = load_pillow()
+        if Image is None:
+            raise
+        pil_img = Image.open(path).convert('RGBA')
+        return pygame.image.fromstring(pil_img.tobytes(), pil_img.size, pil_img.mode)
+
+
+def _decode_sound(path):
+    """Lee y convierte un WAV al formato del mixer"""
+    return pygame.mixer.Sound(path)
+
+
+class AssetLoader:
+    """
+    Decodifica imágenes y sonidos en un pool de hilos.
+
+    El juego pide por adelantado (prefetch) todos los archivos que va a cargar; los
+    gestores luego recogen el resultado ya decodificado con get_image/get_sound y solo
+    hacen el convert()/convert_alpha() final en el hilo principal. Un archivo que no
+    se pidió por adelantado se decodifica en el momento.
+
+    Cada resultado se entrega una vez: al recogerlo se suelta el Future, así el
+    loader no retiene los Surface decodificados (una textura descargada se vuelve a
+    decodificar si se pide otra vez).
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or settings.ASSET_LOADER_THREADS
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.futures = {}  # ruta -> Future (hasta que se recoge el resultado)
+        self.times = {}    # ruta -> ms de decodificación
+        self.start_time = None
+        self.end_time = None
+
+    def _timed(self, decode, path):
+        start = time.perf_counter()
+        try:
+            return decode(path)
+        finally:
+            self.times[path] = (time.perf_counter() - start) * 1000
+
+    def _submit(self, decode, path):
+        if path in self.futures or not os.path.exists(path):
+            return
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        self.futures[path] = self.executor.submit(self._timed, decode, path)
+
+    def prefetch_images(self, paths):
+        for path in paths:
+            self._submit(_decode_image, path)
+
+    def prefetch_sounds(self, paths):
+        # El mixer debe estar inicializado antes de convertir sonidos
+        if not pygame.mixer.get_init():
+            return
+        for path in paths:
+            self._submit(_decode_sound, path)
+
+    def _result(self, decode, path):
+        future = self.futures.pop(path, None)
+        if future is None:
+            # No se pidió por adelantado (o ya se recogió): decodificar aquí
+            return self._timed(decode, path)
+        result = future.result()  # Relanza la excepción del hilo si la decodificación falló
+        self.end_time = time.perf_counter()
+        return result
+
+    def is_ready(self, path):
+        """True si el archivo ya se pidió y terminó de decodificarse (get_* no bloqueará)"""
+        future = self.futures.get(path)
+        return future is not None and future.done()
+
+    def get_image(self, path):
+        """Surface decodificado (sin convert) de un PNG"""
+        return self._result(_decode_image, path)
+
+    def get_sound(self, path):
+        """Sound de un WAV"""
+        return self._result(_decode_sound, path)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def report(self):
+        """Imprime el tiempo total y el de cada asset (más lentos primero)"""
+        total = 0.0
+        if self.start_time is not None and self.end_time is not None:
+            total = (self.end_time - self.start_time) * 1000
+        decode_sum = sum(self.times.values())
+        print(f"  ✓ Assets decodificados: {len(self.times)} en {total:.1f} ms "
+              f"({decode_sum:.1f} ms de decodificación, {self.workers} hilos)")
+        for path, ms in sorted(self.times.items(), key=lambda item: item[1], reverse=True):
+            print(f"      {ms:7.2f} ms  {os.path.basename(path)}")
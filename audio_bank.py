@@ -0,0 +1,164 @@
+"""
+Banco de audio: el PCM de todos los sonidos registrados ya convertido al formato
+del mixer (frecuencia, tamaño de muestra y canales) en un único archivo.
+
+El archivo se mapea en memoria (mmap) y queda abierto durante la partida: cada
+Sound se crea con su primer uso directamente desde su bloque de bytes, sin
+decodificar ni remuestrear el WAV. Si el mixer negocia otro formato, falta algún
+sonido o un WAV cambió (mtime, tamaño y SHA-1), el banco se reconstruye.
+
+Formato:
+    MAGIC (8 bytes) | versión (u32) | frecuencia (i32) | tamaño (i32) | canales (u32) |
+    longitud del índice (u32) | índice JSON | datos
+
+Para construirlo sin lanzar el juego:
+    python audio_bank.py
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import pygame
+import settings
+
+MAGIC = b'R3DAUDIO'
+BANK_VERSION = 1
+HEADER = struct.Struct('<8sIiiII')
+ALIGN = 16
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AudioBank:
+    def __init__(self, path=None, base_dir=None):
+        self.base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.path = path or os.path.join(self.base_dir, settings.AUDIO_BANK_FILE)
+        self.mixer_format = None
+        self.entries = {}  # ruta relativa del WAV -> {offset, size, mtime_ns, bytes, sha1}
+        self.valid = set()  # WAVs cuyo PCM en el banco sigue al día
+        self._file = None
+        self._map = None
+        self._data_start = 0
+
+    def open(self, mixer_format):
+        """Mapea el banco si existe y es del formato del mixer; retorna True si se pudo usar"""
+        mixer_format = tuple(mixer_format)
+        if self._map is not None and self.mixer_format == mixer_format:
+            return True
+        self.close()
+        self.mixer_format = mixer_format
+        if not os.path.exists(self.path):
+            return False
+        try:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, frequency, size, channels, index_len = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != BANK_VERSION:
+                raise ValueError(f"versión {version} incompatible")
+            if (frequency, size, channels) != mixer_format:
+                raise ValueError(f"formato {frequency} Hz/{size}/{channels} distinto del mixer")
+            self.entries = json.loads(self._map[HEADER.size:HEADER.size + index_len].decode('utf-8'))
+        except (OSError, ValueError, struct.error) as e:
+            print(f"  ! Banco de audio descartado: {e}")
+            self.close()
+            return False
+
+        self._data_start = -(-(HEADER.size + index_len) // ALIGN) * ALIGN
+        self.valid = {source for source in self.entries if self._source_valid(source)}
+        return True
+
+    def _source_valid(self, source):
+        path = os.path.join(self.base_dir, source)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        entry = self.entries[source]
+        if stat.st_mtime_ns == entry['mtime_ns'] and stat.st_size == entry['bytes']:
+            return True
+        return stat.st_size == entry['bytes'] and _file_sha1(path) == entry['sha1']
+
+    def has_source(self, path):
+        """True si el banco tiene el PCM al día de este WAV"""
+        return os.path.relpath(path, self.base_dir) in self.valid
+
+    def _pcm(self, source):
+        entry = self.entries[source]
+        start = self._data_start + entry['offset']
+        return memoryview(self._map)[start:start + entry['size']]
+
+    def load_sound(self, path):
+        """Sound creado desde el PCM del banco, o None si no está al día"""
+        source = os.path.relpath(path, self.base_dir)
+        if self._map is None or source not in self.valid:
+            return None
+        data = self._pcm(source)
+        sound = pygame.mixer.Sound(buffer=data)
+        data.release()
+        return sound
+
+    def build(self, paths, decode):
+        """
+        Reescribe el banco con los WAVs de paths: reutiliza el PCM que sigue al
+        día y convierte el resto con decode(ruta) -> Sound
+        """
+        blobs = {}
+        for path in paths:
+            source = os.path.relpath(path, self.base_dir)
+            if source in blobs or not os.path.exists(path):
+                continue
+            if self._map is not None and source in self.valid:
+                pcm = bytes(self._pcm(source))
+            else:
+                pcm = decode(path).get_raw()
+            stat = os.stat(path)
+            blobs[source] = (pcm, {'mtime_ns': stat.st_mtime_ns, 'bytes': stat.st_size, 'sha1': _file_sha1(path)})
+        mixer_format = self.mixer_format
+        self.close()
+
+        entries = {}
+        offset = 0
+        for source, (pcm, meta) in blobs.items():
+            entries[source] = dict(meta, offset=offset, size=len(pcm))
+            offset += -(-len(pcm) // ALIGN) * ALIGN
+        index = json.dumps(entries).encode('utf-8')
+
+        data_start = -(-(HEADER.size + len(index)) // ALIGN) * ALIGN
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, BANK_VERSION, *mixer_format, len(index)))
+            f.write(index)
+            f.write(b'\0' * (data_start - HEADER.size - len(index)))
+            for pcm, _ in blobs.values():
+                f.write(pcm)
+                f.write(b'\0' * (-len(pcm) % ALIGN))
+        os.replace(tmp_path, self.path)
+        print(f"  ✓ Banco de audio escrito: {len(entries)} sonidos, {offset // 1024} KB "
+              f"({mixer_format[0]} Hz) en {os.path.basename(self.path)}")
+        return self.open(mixer_format)
+
+    def close(self):
+        """Libera el mapeo del archivo"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.valid = set()
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from sound_manager import SoundManager
+    pygame.mixer.init()
+    manager = SoundManager(AudioBank())
+    print(f"  ✓ Banco de audio al día: {len(manager.SOUNDS)} sonidos registrados")
+    pygame.mixer.quit()
@@ -0,0 +1,1075 @@
+"""
+Benchmarks de rendimiento del motor.
+
+Uso:
+    python benchmark.py                 # ejecuta todos los benchmarks
+    python benchmark.py raycast         # solo el indicado
+    python benchmark.py raycast --frames 200
+"""
+import argparse
+import math
+import os
+import time
+import settings
+from door import Door, DoorScheduler
+from map import DOOR_POSITIONS
+
+
+# Poses de cámara (x, y, ángulo) usadas por los benchmarks
+CAMERA_POSES = [
+    (8.0, 8.0, 0.0),
+    (8.0, 8.0, math.pi / 2),
+    (1.5, 1.5, math.pi / 4),
+    (7.5, 9.0, -math.pi / 2),     # Mirando a la puerta
+    (14.2, 8.0, math.pi),         # Pegado a la pared
+    (3.2, 5.0, 5 * math.pi / 4),
+]
+
+
+def make_doors(open_amount=0.5):
+    """Crea las puertas del mapa con una apertura fija"""
+    doors = []
+    for x, y in DOOR_POSITIONS:
+        door = Door(x, y)
+        door.open_amount = open_amount
+        door.is_open = open_amount > 0.0
+        doors.append(door)
+    return doors
+
+
+def init_display():
+    """Inicializa PyGame con una pantalla (sin ventana si no hay servidor gráfico)"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+    pygame.init()
+    return pygame.display.set_mode((settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT))
+
+
+def make_scene(screen):
+    """Carga texturas y crea sprites y enemigos del mapa para los benchmarks de render"""
+    from texture_manager import TextureManager
+    from sprite import Sprite
+    from enemy import Guard
+    from player import Player
+    from raycasting import RayCaster
+    from map import SPRITE_POSITIONS, ENEMY_POSITIONS
+
+    texture_manager = TextureManager()
+    texture_manager.load_textures()
+    player = Player(*CAMERA_POSES[0])
+    raycaster = RayCaster()
+    raycaster.set_doors(make_doors())
+    sprites = [Sprite(x, y, kind, texture_manager.get_sprite_texture(kind))
+               for x, y, kind in SPRITE_POSITIONS]
+    sprites += [Guard(x, y, player, raycaster, texture_manager, None)
+                for x, y, kind in ENEMY_POSITIONS]
+    texture_manager.build_atlas()
+    texture_manager.build_mipmaps()
+    return texture_manager, player, raycaster, sprites
+
+
+def time_frames(fn, frames):
+    """Ejecuta fn(pose) recorriendo CAMERA_POSES y retorna ms por llamada"""
+    start = time.perf_counter()
+    for i in range(frames):
+        fn(CAMERA_POSES[i % len(CAMERA_POSES)])
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def report(label, ms, baseline=None):
+    line = f"  {label:<28} {ms:8.2f} ms"
+    if baseline:
+        line += f"   x{baseline / ms:5.2f}"
+    print(line)
+
+
+def bench_raycast(frames):
+    """Raycasting serie vs. pool de procesos con 1/2/4/8 trabajadores"""
+    from raycasting import RayCaster
+    from parallel_raycasting import ParallelRayCaster
+
+    doors = make_doors()
+    print(f"Raycasting ({settings.NUM_RAYS} columnas, {frames} frames)")
+
+    caster = RayCaster()
+    caster.set_doors(doors)
+    caster.cast_rays(*CAMERA_POSES[0])  # Calentar (compilación de los kernels), como los pools
+    baseline = time_frames(lambda pose: caster.cast_rays(*pose), frames)
+    report("serie", baseline)
+
+    for workers in (1, 2, 4, 8):
+        caster = ParallelRayCaster(workers, min_columns=0)
+        caster.set_doors(doors)
+        try:
+            caster.cast_rays(*CAMERA_POSES[0])  # Calentar el pool
+            ms = time_frames(lambda pose: caster.cast_rays(*pose), frames)
+        finally:
+            caster.close()
+        report(f"pool {workers} trabajadores", ms, baseline)
+
+
+def bench_rasterize(frames):
+    """Rasterizado de paredes y sprites: Renderer en serie vs. back buffer compartido"""
+    from renderer import Renderer
+    from parallel_renderer import ParallelRenderer, HAS_NUMPY
+
+    screen = init_display()
+    texture_manager, player, raycaster, sprites = make_scene(screen)
+
+    def render(renderer, pose):
+        player.x, player.y, player.angle = pose
+        rays = raycaster.cast_rays(*pose)
+        for sprite in sprites:
+            sprite.calculate_distance(player.x, player.y)
+        renderer.render_scene(rays, player, sprites)
+
+    cores = os.cpu_count() or 1
+    print(f"Rasterizado ({settings.SCREEN_WIDTH}x{settings.SCREEN_HEIGHT}, {frames} frames, incluye raycasting, "
+          f"{cores} núcleos)")
+    renderer = Renderer(screen, texture_manager)
+    render(renderer, CAMERA_POSES[0])  # Calentar (compilación de los kernels)
+    baseline = time_frames(lambda pose: render(renderer, pose), frames)
+    report("serie", baseline)
+
+    if not HAS_NUMPY:
+        print("  NumPy no disponible: se omite el modo paralelo")
+        return
+    split = None
+    for workers in (1, 2, 4, 8):
+        renderer = ParallelRenderer(screen, texture_manager, workers)
+        waits = []
+
+        def render_parallel(pose):
+            render(renderer, pose)
+            waits.append(renderer.wait_ms)
+        try:
+            render(renderer, CAMERA_POSES[0])  # Calentar el pool
+            ms = time_frames(render_parallel, frames)
+        finally:
+            renderer.close()
+        report(f"pool {workers} trabajadores" + ("*" if workers > cores else ""), ms, baseline)
+        if workers == 1:
+            wait = sum(waits) / len(waits)
+            split = (ms - wait, wait)
+
+    # Con un trabajador el tiempo se reparte entre el proceso principal (serie) y las franjas
+    # (paralelizable): la proyección es lo que daría cada número de núcleos (ley de Amdahl)
+    serial, strips = split
+    if cores < 8:
+        print("  * más trabajadores que núcleos: comparten CPU y no pueden escalar")
+    print(f"  proceso principal {serial:.2f} ms + franjas {strips:.2f} ms por frame")
+    for workers in (2, 4, 8):
+        report(f"proyección {workers} núcleos", serial + strips / workers, baseline)
+
+
+def pose_corpus():
+    """Corpus de poses: CAMERA_POSES más una rejilla de celdas vacías x 8 ángulos"""
+    from map import WORLD_MAP
+    poses = list(CAMERA_POSES)
+    for y, row in enumerate(WORLD_MAP):
+        for x, cell in enumerate(row):
+            if cell == 0 and (x + y) % 3 == 0:
+                poses += [(x + 0.3, y + 0.6, k * math.pi / 4 + 0.1) for k in range(8)]
+    return poses
+
+
+def verify_kernels(screen, texture_manager):
+    """Comprueba que los kernels dan resultados idénticos bit a bit al camino de referencia"""
+    import pygame
+    import kernels
+    from raycasting import RayCaster
+    from renderer import Renderer
+
+    mismatches = 0
+    for open_amount in (0.0, 0.5, 1.0):
+        caster = RayCaster()
+        caster.set_doors(make_doors(open_amount))
+        renderer = Renderer(screen, texture_manager)
+        for pose in pose_corpus():
+            kernels.set_mode('reference')
+            reference = caster.cast_rays(*pose)
+            kernels.set_mode('kernel')
+            if caster.cast_rays(*pose) != reference:
+                mismatches += 1
+                print(f"  ! Rayos distintos en pose {pose} (puerta {open_amount})")
+
+        # Rasterizado: solo CAMERA_POSES (el kernel sin numba es lento)
+        for pose in CAMERA_POSES:
+            kernels.set_mode('reference')
+            rays = caster.cast_rays(*pose)
+            renderer._draw_walls(rays, 3.0)
+            reference_frame = pygame.surfarray.array3d(screen)
+            kernels.set_mode('kernel')
+            renderer._draw_walls(rays, 3.0)
+            if not (pygame.surfarray.array3d(screen) == reference_frame).all():
+                mismatches += 1
+                print(f"  ! Paredes distintas en pose {pose} (puerta {open_amount})")
+    return mismatches
+
+
+def bench_kernels(frames):
+    """DDA y columnas de pared: referencia vs. kernels en Python y compilados con numba"""
+    import kernels
+    from raycasting import RayCaster
+    from renderer import Renderer
+
+    screen = init_display()
+    texture_manager, player, raycaster, sprites = make_scene(screen)
+    previous_mode = kernels.get_mode()
+    kernels.compile_kernels()
+
+    print(f"Kernels (numba: {'sí' if kernels.HAS_NUMBA else 'no'}, {frames} frames)")
+    if not kernels.HAS_NUMPY:
+        print("  NumPy no disponible: se omite")
+        return
+
+    mismatches = verify_kernels(screen, texture_manager)
+    print(f"  Verificación bit a bit: {len(pose_corpus()) * 3} poses, {mismatches} diferencias")
+    if kernels.HAS_NUMBA:
+        # Verificar también los kernels sin compilar
+        jitted = (kernels.cast_rays_kernel, kernels.draw_wall_columns_kernel)
+        kernels.cast_rays_kernel = jitted[0].py_func
+        kernels.draw_wall_columns_kernel = jitted[1].py_func
+        try:
+            mismatches = verify_kernels(screen, texture_manager)
+        finally:
+            kernels.cast_rays_kernel, kernels.draw_wall_columns_kernel = jitted
+        print(f"  Verificación sin compilar: {mismatches} diferencias")
+
+    caster = RayCaster()
+    caster.set_doors(make_doors())
+    renderer = Renderer(screen, texture_manager)
+    rays = caster.cast_rays(*CAMERA_POSES[0])
+
+    def frame(pose):
+        renderer._draw_walls(caster.cast_rays(*pose), 0)
+
+    kernels.set_mode('reference')
+    baseline_dda = time_frames(lambda pose: caster.cast_rays(*pose), frames)
+    baseline_walls = time_frames(lambda pose: renderer._draw_walls(rays, 0), frames)
+    report("DDA referencia", baseline_dda)
+    report("paredes referencia", baseline_walls)
+
+    # Kernels sin compilar (como se ejecutan cuando numba no está instalado)
+    kernels.set_mode('kernel')
+    jitted = (kernels.cast_rays_kernel, kernels.draw_wall_columns_kernel)
+    kernels.cast_rays_kernel = getattr(jitted[0], 'py_func', jitted[0])
+    kernels.draw_wall_columns_kernel = getattr(jitted[1], 'py_func', jitted[1])
+    try:
+        python_frames = max(1, frames // 10)
+        report("DDA kernel Python", time_frames(lambda pose: caster.cast_rays(*pose), python_frames), baseline_dda)
+        report("paredes kernel Python", time_frames(lambda pose: renderer._draw_walls(rays, 0), python_frames),
+               baseline_walls)
+    finally:
+        kernels.cast_rays_kernel, kernels.draw_wall_columns_kernel = jitted
+
+    if kernels.HAS_NUMBA:
+        frame(CAMERA_POSES[0])  # Compilar antes de medir
+        report("DDA kernel numba", time_frames(lambda pose: caster.cast_rays(*pose), frames), baseline_dda)
+        report("paredes kernel numba", time_frames(lambda pose: renderer._draw_walls(rays, 0), frames),
+               baseline_walls)
+    kernels.set_mode(previous_mode)
+
+
+def bench_walls(frames):
+    """Paredes sin kernels: un blit por columna vs. columnas en formato de pantalla y un Surface.blits"""
+    import kernels
+    from raycasting import RayCaster
+    from renderer import Renderer
+
+    screen = init_display()
+    texture_manager = make_scene(screen)[0]
+    caster = RayCaster()
+    caster.set_doors(make_doors())
+    renderer = Renderer(screen, texture_manager)
+    rays = {pose: caster.cast_rays(*pose) for pose in CAMERA_POSES}
+
+    previous = (kernels.get_mode(), settings.BATCHED_WALL_BLITS)
+    kernels.set_mode('reference')
+    print(f"Blit de paredes ({settings.NUM_RAYS} columnas, {frames} frames)")
+    try:
+        settings.BATCHED_WALL_BLITS = False
+        baseline = time_frames(lambda pose: renderer._draw_walls(rays[pose], 0), frames)
+        report("un blit por columna", baseline)
+        settings.BATCHED_WALL_BLITS = True
+        renderer._draw_walls(rays[CAMERA_POSES[0]], 0)  # Construir las columnas antes de medir
+        report("Surface.blits", time_frames(lambda pose: renderer._draw_walls(rays[pose], 0), frames), baseline)
+    finally:
+        kernels.set_mode(previous[0])
+        settings.BATCHED_WALL_BLITS = previous[1]
+
+
+def bench_shading(frames):
+    """Coste del sombreado de paredes por distancia y lado en los caminos de superficies y de kernels"""
+    import kernels
+    from raycasting import RayCaster
+    from renderer import Renderer
+
+    screen = init_display()
+    texture_manager = make_scene(screen)[0]
+    caster = RayCaster()
+    caster.set_doors(make_doors())
+    renderer = Renderer(screen, texture_manager)
+    rays = {pose: caster.cast_rays(*pose) for pose in CAMERA_POSES}
+
+    previous = (kernels.get_mode(), settings.WALL_SHADING)
+    modes = [('Surface.blits', 'reference')]
+    if kernels.HAS_NUMPY:
+        modes.append(('kernels', 'kernel'))
+    print(f"Sombreado de paredes ({settings.SHADE_LEVELS} niveles x 2 lados, {frames} frames)")
+    try:
+        for label, mode in modes:
+            kernels.set_mode(mode)
+            settings.WALL_SHADING = False
+            renderer._draw_walls(rays[CAMERA_POSES[0]], 0)  # Compilar y construir cachés antes de medir
+            baseline = time_frames(lambda pose: renderer._draw_walls(rays[pose], 0), frames)
+            report(f"{label} sin sombreado", baseline)
+            settings.WALL_SHADING = True
+            for pose in CAMERA_POSES:
+                renderer._draw_walls(rays[pose], 0)
+            report(f"{label} con sombreado", time_frames(lambda pose: renderer._draw_walls(rays[pose], 0), frames),
+                   baseline)
+    finally:
+        kernels.set_mode(previous[0])
+        settings.WALL_SHADING = previous[1]
+
+    variants = sum(len(shaded) for _, shaded in texture_manager.shaded_walls.values())
+    size = sum(surface.get_width() * surface.get_height() * surface.get_bytesize()
+               for _, shaded in texture_manager.shaded_walls.values() for surface in shaded.values())
+    print(f"  Variantes sombreadas: {variants} superficies, {size / 1024:.0f} KB")
+
+
+def make_rooms_level(rooms=16, room_size=8):
+    """Nivel de rooms x rooms salas con una luz en el centro y una puerta en cada pared entre salas"""
+    from level import parse_level
+    size = rooms * room_size + 1
+    rows = []
+    for y in range(size):
+        row = []
+        for x in range(size):
+            on_x, on_y = x % room_size == 0, y % room_size == 0
+            border = x in (0, size - 1) or y in (0, size - 1)
+            door = not border and (on_x and y % room_size == room_size // 2 or
+                                   on_y and x % room_size == room_size // 2)
+            row.append('7' if door else '1' if on_x or on_y else '0')
+        rows.append(''.join(row))
+    centre = room_size / 2 + 0.5
+    lights = [f"{rx * room_size + centre} {ry * room_size + centre} greenlight"
+              for ry in range(rooms) for rx in range(rooms)]
+    text = '[map]\n' + '\n'.join(rows) + '\n[sprites]\n' + '\n'.join(lights) + '\n'
+    return parse_level(text, 'salas')
+
+
+def bench_lighting(frames):
+    """Luz precalculada: bake completo, rebake incremental al abrir/cerrar puertas y consulta por rayo"""
+    import random
+    from door import Door
+    from lightmap import Lightmap
+    from raycasting import RayCaster
+    from map import bump_world_version
+
+    level = make_rooms_level()
+    doors = [Door(x, y) for x, y in level.doors]
+    lightmap = Lightmap(doors, level)
+    print(f"Luz precalculada ({level.width}x{level.height}, {len(lightmap.lights)} luces, "
+          f"radio {settings.LIGHT_RADIUS}, {len(doors)} puertas, {frames} frames)")
+
+    bake_frames = max(1, frames // 20)
+    baseline = time_frames(lambda pose: lightmap.bake(), bake_frames)
+    report("bake completo", baseline)
+    full_cells = lightmap.cells_baked
+
+    # Verificación: tras cada cambio de una puerta el rebake incremental da lo mismo que uno completo
+    rng = random.Random(1)
+    mismatches = 0
+    rebaked = []
+    for door in rng.sample(doors, min(20, len(doors))):
+        for open_amount in (1.0, 0.0):
+            door.open_amount = open_amount
+            bump_world_version()
+            lightmap.update()
+            rebaked.append(lightmap.cells_baked)
+            incremental = bytes(lightmap.levels)
+            lightmap.bake()
+            if bytes(lightmap.levels) != incremental:
+                mismatches += 1
+                print(f"  ! Luz distinta tras mover la puerta ({door.x}, {door.y})")
+    print(f"  Verificación: {len(rebaked)} cambios de puerta, {mismatches} diferencias, "
+          f"{sum(rebaked) / len(rebaked):.0f} de {full_cells} celdas recalculadas de media")
+
+    def door_toggle(pose):
+        door = doors[len(doors) // 2]
+        door.open_amount = 1.0 - door.open_amount
+        bump_world_version()
+        lightmap.update()
+
+    report("rebake por puerta", time_frames(door_toggle, frames), baseline)
+
+    # Consulta por rayo en el nivel del juego
+    game_doors = make_doors(0.0)
+    game_lightmap = Lightmap(game_doors)
+    caster = RayCaster()
+    caster.set_doors(game_doors)
+    rays = {pose: caster.cast_rays(*pose) for pose in CAMERA_POSES}
+    report("luz de los rayos", time_frames(lambda pose: game_lightmap.ray_lights(rays[pose]), frames))
+
+
+def bench_pvs(frames):
+    """PVS por celda: cálculo, carga desde el archivo, verificación con rayos y sprites descartados"""
+    import random
+    import tempfile
+    from door import Door
+    from pvs import load_pvs
+    from raycasting import RayCaster
+
+    level = make_rooms_level()
+    walkable = [(x, y) for y in range(level.height) for x in range(level.width) if level.cell(x, y) in (0, 7)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'salas.txt')
+        start = time.perf_counter()
+        pvs = load_pvs(level, path)
+        build_ms = (time.perf_counter() - start) * 1000
+        pvs.close()
+        start = time.perf_counter()
+        pvs = load_pvs(level, path)
+        load_ms = (time.perf_counter() - start) * 1000
+        size = os.path.getsize(os.path.splitext(path)[0] + '.pvs')
+
+        print(f"PVS ({level.width}x{level.height}, {len(walkable)} celdas, bloques de {pvs.cluster}, "
+              f"{settings.PVS_RAYS} rayos)")
+        report("cálculo", build_ms)
+        report("carga del archivo", load_ms)
+        print(f"  {pvs.row_count} filas distintas de {pvs.row_bytes} bytes, archivo de {size / 1024:.0f} KB")
+
+        # Verificación: con las puertas abiertas, todo punto que ve un rayo está en el PVS
+        doors = []
+        for x, y in level.doors:
+            door = Door(x, y)
+            door.open_amount = 1.0
+            door.is_open = True
+            doors.append(door)
+        caster = RayCaster()
+        caster.world_map = level.rows()
+        caster.set_doors(doors)
+        rng = random.Random(1)
+        poses = [(x + rng.random(), y + rng.random(), rng.uniform(-math.pi, math.pi))
+                 for x, y in rng.sample(walkable, 200)]
+        misses = 0
+        for px, py, angle in poses:
+            sees = pvs.viewer(px, py)
+            for ray in caster.cast_rays(px, py, angle):
+                distance = ray['depth'] / math.cos(angle - ray['angle'])
+                for t in (0.25, 0.5, 0.75, 0.999):
+                    if not sees(px + math.cos(ray['angle']) * distance * t, py + math.sin(ray['angle']) * distance * t):
+                        misses += 1
+        print(f"  Verificación: {len(poses)} poses, {misses} puntos vistos fuera del PVS")
+
+        # Sprites (las luces de cada sala) que quedan tras el culling
+        sprites = [(x, y) for x, y, _ in level.sprites]
+        kept = [sum(1 for x, y in sprites if pvs.sees(px, py, x, y)) for px, py, _ in poses]
+        print(f"  Sprites en el PVS: {sum(kept) / len(kept):.1f} de {len(sprites)} de media")
+        start = time.perf_counter()
+        for i in range(frames):
+            px, py, _ = poses[i % len(poses)]
+            sees = pvs.viewer(px, py)
+            visible = [(x, y) for x, y in sprites if sees(x, y)]
+        report("culling de sprites", (time.perf_counter() - start) * 1000 / frames)
+        pvs.close()
+
+
+def bench_adaptive(frames):
+    """Rayos adaptativos vs. DDA en todas las columnas (camino de referencia, sin kernels)"""
+    import kernels
+    from raycasting import RayCaster
+
+    previous = (kernels.get_mode(), settings.ADAPTIVE_RAYS)
+    kernels.set_mode('reference')
+    try:
+        # Verificación: rayos idénticos en todo el corpus con las puertas cerradas, a medias y abiertas
+        mismatches = 0
+        columns = 0
+        poses = pose_corpus()
+        for open_amount in (0.0, 0.5, 1.0):
+            caster = RayCaster()
+            caster.set_doors(make_doors(open_amount))
+            for pose in poses:
+                settings.ADAPTIVE_RAYS = False
+                reference = caster.cast_rays(*pose)
+                settings.ADAPTIVE_RAYS = True
+                if caster.cast_rays(*pose) != reference:
+                    mismatches += 1
+                    print(f"  ! Rayos distintos en pose {pose} (puerta {open_amount})")
+                columns += caster.columns_cast
+        total = len(poses) * 3
+        print(f"Rayos adaptativos (paso {settings.ADAPTIVE_RAY_STEP}, {frames} frames)")
+        print(f"  Verificación: {total} poses, {mismatches} diferencias, "
+              f"DDA en {columns / total:.0f} de {settings.NUM_RAYS} columnas de media")
+
+        caster = RayCaster()
+        caster.set_doors(make_doors())
+        settings.ADAPTIVE_RAYS = False
+        baseline = time_frames(lambda pose: caster.cast_rays(*pose), frames)
+        report("DDA en todas las columnas", baseline)
+        settings.ADAPTIVE_RAYS = True
+        report("adaptativo", time_frames(lambda pose: caster.cast_rays(*pose), frames), baseline)
+    finally:
+        kernels.set_mode(previous[0])
+        settings.ADAPTIVE_RAYS = previous[1]
+
+
+def load_assets(screen, asset_cache=None, asset_loader=None, audio_bank=None):
+    """Carga todos los assets del arranque del juego (texturas, sonidos, HUD, armas)"""
+    from texture_manager import TextureManager
+    from sound_manager import SoundManager
+    from hud import HUD
+    from weapon import Weapon
+    from player import Player
+
+    if asset_loader:
+        asset_loader.prefetch_images(TextureManager.asset_paths() + HUD.asset_paths() + [Weapon.SHEET_FILE])
+        asset_loader.prefetch_sounds(SoundManager.asset_paths())
+    texture_manager = TextureManager(asset_cache, asset_loader)
+    texture_manager.load_textures()
+    sound_manager = SoundManager(audio_bank, asset_loader)
+    HUD(screen, texture_manager)
+    Weapon(screen, Player(0, 0, 0), texture_manager)
+    return texture_manager, sound_manager
+
+
+def bench_startup(frames):
+    """Tiempo de carga de assets: decodificando PNG/WAV, en hilos y desde la caché binaria"""
+    import contextlib
+    import io
+    import tempfile
+    from asset_cache import AssetCache
+    from asset_loader import AssetLoader
+    from audio_bank import AudioBank
+
+    screen = init_display()
+    repeats = max(1, min(frames, 5))
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    def timed(fn):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            with quiet:
+                fn()
+            best = min(best, (time.perf_counter() - start) * 1000)
+        return best
+
+    print(f"Arranque (carga de assets, mejor de {repeats})")
+    baseline = timed(lambda: load_assets(screen))
+    report("sin caché", baseline)
+
+    def threaded():
+        loader = AssetLoader()
+        load_assets(screen, asset_loader=loader)
+        loader.shutdown()
+    report(f"sin caché, {settings.ASSET_LOADER_THREADS} hilos", timed(threaded), baseline)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'assets.bin')
+        bank_path = os.path.join(tmp, 'sound_bank.bin')
+        cache = AssetCache(path)
+        bank = AudioBank(bank_path)
+        with quiet:
+            load_assets(screen, cache, audio_bank=bank)
+            cache.save()
+            bank.close()
+
+        def cached():
+            cache = AssetCache(path)
+            cache.open()
+            bank = AudioBank(bank_path)
+            load_assets(screen, cache, audio_bank=bank)
+            cache.close()
+            bank.close()
+        report("caché + banco de audio", timed(cached), baseline)
+
+
+def bench_residency(frames):
+    """Texturas bajo demanda con un presupuesto pequeño: carga, descarga y recarga"""
+    import contextlib
+    import gc
+    import io
+    import weakref
+    from asset_loader import AssetLoader
+    from texture_manager import TextureManager
+
+    init_display()
+    loader = AssetLoader()
+    texture_manager = TextureManager(asset_loader=loader)
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    wall_ids = sorted(wall_id for wall_id, path in TextureManager.WALL_TEXTURE_FILES.items()
+                      if os.path.exists(path) and wall_id != 1)
+    budget = 3 * 22  # KB: unas tres texturas de 64x64 con su cadena de mipmaps
+    saved = {name: getattr(settings, name) for name in ('TEXTURE_BUDGET_KB', 'TEXTURE_EVICT_SECONDS')}
+    settings.TEXTURE_BUDGET_KB = budget
+    settings.TEXTURE_EVICT_SECONDS = 0
+
+    def show(wall_id, now):
+        """Frames mirando solo a wall_id hasta que está cargada; retorna ms por frame"""
+        rays = [{'wall_type': wall_id}]
+        start = time.perf_counter()
+        updates = 0
+        while True:
+            with quiet:
+                texture_manager.update_residency(rays, now)
+            updates += 1
+            if wall_id in texture_manager.wall_textures:
+                return (time.perf_counter() - start) * 1000 / updates
+            time.sleep(0.0005)
+
+    try:
+        first = wall_ids[0]
+        with quiet:
+            texture_manager.load_textures({1})
+        print(f"Texturas bajo demanda ({len(wall_ids)} paredes, presupuesto {budget} KB)")
+        load_ms = show(first, 0.0)
+        released = weakref.ref(texture_manager.wall_textures[first])
+        cycle_ms = sum(show(wall_id, float(i)) for i, wall_id in enumerate(wall_ids[1:], 1))
+        report("carga por textura", load_ms)
+        report("recorrer todas", cycle_ms)
+        gc.collect()
+        evicted = first not in texture_manager.wall_textures
+        if evicted and released() is None and TextureManager.WALL_TEXTURE_FILES[first] not in loader.futures:
+            print(f"  ✓ Textura {first} descargada y liberada")
+        else:
+            print(f"  ! Textura {first} sigue en memoria (descargada: {evicted})")
+        show(first, float(len(wall_ids)))
+        if first in texture_manager.wall_textures and texture_manager.wall_textures[first] is not released():
+            print(f"  ✓ Textura {first} recargada desde el archivo")
+        else:
+            print(f"  ! Textura {first} no se recargó")
+        resident = sum(texture_manager._texture_bytes(wall_id) for wall_id in texture_manager.wall_textures)
+        print(f"  {len(texture_manager.wall_textures)} residentes, {resident // 1024} KB")
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+        loader.shutdown()
+
+
+def bench_imports(frames):
+    """Coste de importar main.py por paquete (python -X importtime) y tiempo hasta el primer frame"""
+    import subprocess
+    import sys
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    per_package = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, module = line[len('import time:'):].split('|')
+        package = module.strip().split('.')[0]
+        per_package[package] = per_package.get(package, 0) + int(self_us)
+
+    total = sum(per_package.values()) / 1000
+    print(f"Imports de main.py: {total:.1f} ms")
+    for package, us in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:12]:
+        print(f"  {package:<28} {us / 1000:8.2f} ms")
+
+    # Arranque completo sin ventana hasta el primer frame
+    code = ("import main, pygame\n"
+            "game = main.Game()\n"
+            "game.update(); game.render(); game.finish_startup()\n"
+            "game.asset_loader.shutdown()\n")
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in result.stdout.splitlines():
+        if 'Primer frame' in line:
+            print(line.replace('  ✓ ', '  '))
+
+
+def bench_stream(frames):
+    """Mundo por trozos: un nivel de 1024x1024 recorrido de esquina a esquina"""
+    import random
+    import tempfile
+    from level import CELL_CHARS, load_level
+    from raycasting import RayCaster
+    from world_stream import ChunkedWorld
+
+    size = 1024
+    rng = random.Random(1)
+    rows = []
+    for y in range(size):
+        border = y in (0, size - 1)
+        rows.append(''.join('1' if border or x in (0, size - 1) or rng.random() < 0.05
+                            else CELL_CHARS[0] for x in range(size)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'grande.txt')
+        with open(path, 'w') as f:
+            f.write('[map]\n' + '\n'.join(rows) + '\n')
+        level = load_level(path)
+        world = ChunkedWorld(level, path)
+        caster = RayCaster()
+        caster.world_map = world
+
+        steps = max(frames, 50)
+        world.update(2.5, 2.5, wait=True)
+        max_bytes = 0
+        start = time.perf_counter()
+        for i in range(steps):
+            t = 2.5 + (size - 5) * i / steps
+            world.update(t, t)
+            caster.cast_rays(t, t, 0.3 * i)
+            max_bytes = max(max_bytes, world.resident_bytes())
+        ms = (time.perf_counter() - start) * 1000 / steps
+        world.close()
+
+    print(f"Mundo por trozos ({size}x{size}, chunks de {world.chunk_size}, {steps} pasos en diagonal)")
+    report("update + rayos", ms)
+    print(f"  memoria máxima de chunks       {max_bytes // 1024} KB "
+          f"(nivel completo: {size * size * 4 // 1024} KB)")
+    print(f"  consultas conservadoras        {world.misses}")
+
+
+def bench_doors(frames):
+    """Actualización de puertas: bucle sobre todas vs DoorScheduler (una puerta abriéndose)"""
+    count = 1000
+    steps = max(frames, 100) * 10
+
+    def run(use_scheduler):
+        doors = [Door(i % 64, i // 64) for i in range(count)]
+        scheduler = DoorScheduler(doors) if use_scheduler else None
+        doors[0].open()
+        start = time.perf_counter()
+        for _ in range(steps):
+            if scheduler:
+                scheduler.update()
+            else:
+                for door in doors:
+                    door.update()
+        return (time.perf_counter() - start) * 1000 / steps
+
+    print(f"Puertas ({count} puertas, una abriéndose, {steps} frames)")
+    loop_ms = run(False)
+    report("update() en todas", loop_ms)
+    report("DoorScheduler", run(True), loop_ms)
+
+
+def bench_enemies(frames):
+    """IA de 1000 guardias: Enemy.update uno a uno vs EnemySystem (NumPy)"""
+    import random
+    from enemy import Enemy
+    from enemy_system import EnemySystem, HAS_NUMPY
+    from map import MAP_WIDTH, MAP_HEIGHT, is_wall
+    from player import Player
+    from raycasting import RayCaster
+
+    if not HAS_NUMPY:
+        print("Enemigos: NumPy no disponible")
+        return
+    count = 1000
+    rng = random.Random(1)
+    free = [(x + 0.5, y + 0.5) for y in range(MAP_HEIGHT) for x in range(MAP_WIDTH) if not is_wall(x, y)]
+    positions = [rng.choice(free) for _ in range(count)]
+
+    def make(batched):
+        player = Player(8.0, 8.0, 0.0)
+        player.health = 10 ** 9  # Que no muera durante la medición
+        raycaster = RayCaster()
+        raycaster.set_doors(make_doors(0.0))
+        enemies = [Enemy(x, y, 'guard', None, player, raycaster) for x, y in positions]
+        system = EnemySystem(enemies, player, raycaster) if batched else None
+        return player, enemies, system
+
+    steps = max(frames, 50)
+    results = {}
+    for batched in (False, True):
+        player, enemies, system = make(batched)
+        start = time.perf_counter()
+        for i in range(steps):
+            player.x, player.y = CAMERA_POSES[(i // 10) % len(CAMERA_POSES)][:2]
+            if system:
+                system.update(i * 16)
+            else:
+                for enemy in enemies:
+                    enemy.update(i * 16)
+        results[batched] = ((time.perf_counter() - start) * 1000 / steps,
+                            [(e.x, e.y, e.state) for e in enemies], player.health)
+
+    print(f"Enemigos ({count} guardias, {steps} ticks)")
+    report("Enemy.update", results[False][0])
+    report("EnemySystem", results[True][0], results[False][0])
+    drift = max(max(abs(a[0] - b[0]), abs(a[1] - b[1])) for a, b in zip(results[False][1], results[True][1]))
+    states = sum(a[2] == b[2] for a, b in zip(results[False][1], results[True][1]))
+    print(f"  estados iguales                {states}/{count}, diferencia máx. de posición {drift:.2e}")
+
+
+def bench_ai(frames):
+    """Nivel de detalle de la IA con 1000 guardias (distancias escaladas al mapa de ejemplo)"""
+    import random
+    from ai_scheduler import AIScheduler
+    from enemy import Enemy
+    from enemy_system import EnemySystem, HAS_NUMPY
+    from map import LEVEL, LEVEL_PATH, MAP_WIDTH, MAP_HEIGHT, is_wall
+    from player import Player
+    from pvs import load_pvs
+    from raycasting import RayCaster
+
+    count = 1000
+    rng = random.Random(1)
+    free = [(x + 0.5, y + 0.5) for y in range(MAP_HEIGHT) for x in range(MAP_WIDTH) if not is_wall(x, y)]
+    positions = [rng.choice(free) for _ in range(count)]
+    scaled = {'AI_NEAR_DISTANCE': 3.0, 'AI_DORMANT_DISTANCE': 6.0, 'AI_BUDGET_MS': 1000.0}
+    saved = {name: getattr(settings, name) for name in scaled}
+
+    def run(mode):
+        player = Player(8.0, 8.0, 0.0)
+        player.health = 10 ** 9
+        raycaster = RayCaster()
+        raycaster.set_doors(make_doors(0.0))
+        enemies = [Enemy(x, y, 'guard', None, player, raycaster) for x, y in positions]
+        system = EnemySystem(enemies, player, raycaster) if mode.endswith('lotes') else None
+        scheduler = AIScheduler(enemies, player, system) if mode.startswith('LOD') else None
+        if 'PVS' in mode:
+            scheduler.pvs = pvs
+        steps = max(frames, 50)
+        updated = 0
+        elapsed = 0.0
+        for i in range(steps):
+            pose = CAMERA_POSES[(i // 10) % len(CAMERA_POSES)]
+            player.x, player.y, player.angle = pose
+            rays = raycaster.cast_rays(*pose) if i % 10 == 0 else raycaster.get_rays()
+            start = time.perf_counter()
+            if scheduler:
+                scheduler.update(rays, i * 16)
+                updated += scheduler.updated
+            elif system:
+                system.update(i * 16)
+                updated += count
+            else:
+                for enemy in enemies:
+                    enemy.update(i * 16)
+                updated += count
+            elapsed += time.perf_counter() - start
+        ms = elapsed * 1000 / steps
+        report(f"{mode} ({updated // steps} por tick)", ms, baselines.get(mode.split()[-1]))
+        baselines.setdefault(mode.split()[-1], ms)
+
+    pvs = load_pvs(LEVEL, LEVEL_PATH)
+    baselines = {}
+    print(f"IA ({count} guardias, cercanos < {scaled['AI_NEAR_DISTANCE']}, "
+          f"dormidos > {scaled['AI_DORMANT_DISTANCE']})")
+    for name, value in scaled.items():
+        setattr(settings, name, value)
+    try:
+        modes = ('todos objetos', 'LOD objetos', 'LOD+PVS objetos')
+        if HAS_NUMPY:
+            modes += ('todos lotes', 'LOD lotes', 'LOD+PVS lotes')
+        for mode in modes:
+            run(mode)
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+def bench_sound(frames):
+    """100 guardias disparando: Sound.play() directo vs voces con prioridad y atenuación"""
+    import random
+    import pygame
+    from player import Player
+    from sound_manager import SoundManager
+
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.mixer.init()
+    manager = SoundManager()
+    manager.set_listener(Player(8.0, 8.0, 0.0))
+    rng = random.Random(1)
+    guards = [(rng.uniform(0, 40), rng.uniform(0, 40)) for _ in range(100)]
+    sound = manager.get_sound('pistol')
+    steps = max(frames, 50)
+
+    # Antes: cada disparo llama a Sound.play() en cualquier canal libre
+    pygame.mixer.set_reserved(0)
+    start = time.perf_counter()
+    raw_played = 0
+    for _ in range(steps):
+        for x, y in guards:
+            raw_played += sound.play() is not None
+    raw_ms = (time.perf_counter() - start) * 1000 / steps
+    pygame.mixer.stop()
+
+    manager._reserve_channels()
+    start = time.perf_counter()
+    for _ in range(steps):
+        for x, y in guards:
+            manager.play('pistol', (x, y), 'enemies')
+    ms = (time.perf_counter() - start) * 1000 / steps
+    pygame.mixer.stop()
+
+    print(f"Sonido (100 guardias disparando cada tick, {steps} ticks)")
+    report(f"Sound.play ({raw_played} voces)", raw_ms)
+    report(f"SoundManager ({manager.stats['played']} voces)", ms, raw_ms)
+    print(f"  robadas {manager.stats['stolen']}, descartadas {manager.stats['dropped']}, "
+          f"inaudibles {manager.stats['culled']}")
+    pygame.mixer.quit()
+
+
+def bench_input(frames):
+    """Latencia mouse→pantalla del juego completo: movimiento relativo vs recentrar el puntero"""
+    import contextlib
+    import io
+    import threading
+    import pygame
+
+    init_display()
+    from main import Game
+
+    sent = []  # Horas de envío de los movimientos que el juego aún no ha recogido
+    lock = threading.Lock()
+
+    def feeder(stop):
+        # Un mouse de 1000 Hz: eventos de movimiento relativo (se anota cuándo se envía cada uno)
+        while not stop.is_set():
+            with lock:
+                sent.append(time.perf_counter())
+                pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(0, 0), rel=(2, 0),
+                                                     buttons=(0, 0, 0)))
+            time.sleep(0.001)
+
+    steps = max(frames, 30)
+    warmup = 5
+    previous = settings.MOUSE_MODE
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    print(f"Entrada (mouse a 1000 Hz, {steps} frames del juego completo)")
+    try:
+        for mode in ('relative', 'warp'):
+            settings.MOUSE_MODE = mode
+            with quiet:
+                game = Game()
+            center = (settings.SCREEN_WIDTH // 2, settings.SCREEN_HEIGHT // 2)
+            pygame.mouse.set_pos(center)
+            if mode == 'warp' and pygame.mouse.get_pos() != center:
+                print(f"  {mode:<10} no medible: el driver de vídeo "
+                      f"({pygame.display.get_driver()}) no mueve el puntero")
+                game.asset_loader.shutdown()
+                continue
+            stop = threading.Event()
+            thread = threading.Thread(target=feeder, args=(stop,), daemon=True)
+            thread.start()
+            samples = []
+            with quiet:
+                for i in range(warmup + steps):
+                    if mode == 'warp':
+                        # El "mouse" mueve el puntero; el juego lo lee y lo recentra
+                        moved = time.perf_counter()
+                        pygame.mouse.set_pos((center[0] + 2, center[1]))
+                    game.handle_events()
+                    with lock:
+                        # El juego recogió todos los eventos enviados hasta aquí
+                        oldest = sent[0] if sent else None
+                        sent.clear()
+                    if mode == 'warp':
+                        oldest = moved
+                    angle = game.player.angle
+                    game.update()
+                    game.render()
+                    # Latencia medida por el benchmark: envío de la entrada -> flip que la muestra
+                    if i >= warmup and oldest is not None and game.player.angle != angle:
+                        samples.append(time.perf_counter() - oldest)
+            stop.set()
+            thread.join()
+            game.asset_loader.shutdown()
+            samples.sort()
+            if samples:
+                mean = sum(samples) / len(samples) * 1000
+                p95 = samples[int(len(samples) * 0.95)] * 1000
+                print(f"  {mode:<10} media {mean:6.2f} ms   p95 {p95:6.2f} ms   ({len(samples)} frames con giro)")
+    finally:
+        settings.MOUSE_MODE = previous
+
+
+def write_session(path, ticks):
+    """Registro de entrada sintético: avanzar, girar con flechas y mouse, disparar y abrir puertas"""
+    import pygame
+    from input_log import InputRecorder, EVENT_KEYDOWN, EVENT_MOUSEBUTTONDOWN
+
+    recorder = InputRecorder(path, 1000)
+    for i in range(ticks):
+        pressed = [False] * 512
+        pressed[pygame.KSCAN_W] = (i // 50) % 2 == 0
+        pressed[pygame.KSCAN_LEFT] = (i // 70) % 3 == 1
+        events = []
+        if i % 40 == 5:
+            events.append((EVENT_MOUSEBUTTONDOWN, 1))
+        if i % 60 == 7:
+            events.append((EVENT_KEYDOWN, pygame.K_SPACE))
+        recorder.record(1000 + i * 16, i, pressed, 7 if i % 13 == 0 else 0, events)
+    recorder.close()
+
+
+def bench_replay(frames):
+    """Reproducción sin ventana de una sesión grabada: coste por tick y determinismo entre ejecuciones"""
+    import re
+    import subprocess
+    import sys
+    import tempfile
+
+    ticks = max(frames, 100)
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sesion.r3di')
+        write_session(path, ticks)
+        print(f"Reproducción de entrada ({ticks} ticks, {os.path.getsize(path) / 1024:.1f} KB)")
+        digests = []
+        for run in range(2):
+            result = subprocess.run([sys.executable, 'input_log.py', path], capture_output=True,
+                                    text=True, env=env, cwd=root)
+            digest = re.search(r'estado ([0-9a-f]{12})', result.stdout)
+            timing = re.search(r'\(([0-9.]+) ms/tick\)', result.stdout)
+            if not digest or not timing:
+                print(f"  ! La reproducción falló:\n{result.stdout[-400:]}{result.stderr[-400:]}")
+                return
+            digests.append(digest.group(1))
+            print(f"  ejecución {run + 1}  {float(timing.group(1)):6.2f} ms/tick   estado {digest.group(1)}")
+    if digests[0] == digests[1]:
+        print("  ✓ Simulación determinista: mismo estado final en las dos ejecuciones")
+    else:
+        print("  ! El estado final cambia entre ejecuciones")
+
+
+BENCHMARKS = {
+    'raycast': bench_raycast,
+    'rasterize': bench_rasterize,
+    'kernels': bench_kernels,
+    'adaptive': bench_adaptive,
+    'walls': bench_walls,
+    'shading': bench_shading,
+    'lighting': bench_lighting,
+    'pvs': bench_pvs,
+    'startup': bench_startup,
+    'residency': bench_residency,
+    'imports': bench_imports,
+    'stream': bench_stream,
+    'doors': bench_doors,
+    'enemies': bench_enemies,
+    'ai': bench_ai,
+    'sound': bench_sound,
+    'input': bench_input,
+    'replay': bench_replay,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del motor de raycasting")
+    parser.add_argument('names', nargs='*',
+                        help=f"benchmarks a ejecutar: {', '.join(BENCHMARKS)} (por defecto todos)")
+    parser.add_argument('--frames', type=int, default=100, help="frames por medición")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"benchmark desconocido: {name}")
+
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
-import pygame
-import time
+import bisect
+import heapq
+import itertools
+import game_clock
+from map import set_door_passable, bump_world_version
 
 
 class Door:
@@ -13,29 +16,67 @@ class Door:
         self.is_open = False
         self.is_opening = False
         self.is_closing = False
-        self.open_amount = 0.0  # 0.0 = cerrada, 1.0 = completamente abierta
+        self.passable = False  # Último valor de is_passable() publicado en la máscara del mapa
+        self._open_amount = 0.0
+        set_door_passable(self.x, self.y, False)  # Una puerta nueva empieza cerrada en map.SOLID
         self.open_time = None  # Tiempo cuando se abrió la puerta
         self.auto_close_delay = 5.0  # Segundos antes de cerrarse automáticamente
         
         # Velocidad de apertura/cierre (valores más bajos = más lento y realista)
         self.open_speed = 0.012   # Aproximadamente 2.8 segundos para abrir completamente
         self.close_speed = 0.015  # Cierra un poco más rápido (2.2 segundos)
+        self.scheduler = None  # DoorScheduler que la actualiza (None = update() cada frame)
         
+    @property
+    def open_amount(self):
+        """0.0 = cerrada, 1.0 = completamente abierta"""
+        return self._open_amount
+
+    @open_amount.setter
+    def open_amount(self, value):
+        # Cualquier cambio (animación o asignación directa) publica el paso en map.SOLID;
+        # la versión del mundo solo sube al cruzar el umbral, no en cada frame de la animación
+        self._open_amount = value
+        if (value > 0.7) != self.passable:
+            self.passable = value > 0.7
+            set_door_passable(self.x, self.y, self.passable)
+            bump_world_version()
+
     def open(self):
         """Inicia la apertura de la puerta"""
         if not self.is_open and not self.is_opening:
             self.is_opening = True
             self.is_closing = False
-            self.open_time = time.time()
+            self.open_time = game_clock.seconds()
+            if self.scheduler:
+                self.scheduler.wake(self)
             
     def close(self):
         """Inicia el cierre de la puerta"""
         if self.is_open and not self.is_closing:
             self.is_closing = True
             self.is_opening = False
+            if self.scheduler:
+                self.scheduler.wake(self)
             
     def update(self):
         """Actualiza el estado de la puerta"""
+        self.step()
+        
+        # Auto-cerrar después del delay
+        if self.is_open and not self.is_closing and self.open_time is not None:
+            elapsed = game_clock.seconds() - self.open_time
+            if elapsed >= self.auto_close_delay:
+                self.close()
+                
+    def is_animating(self):
+        return self.is_opening or self.is_closing
+        
+    def step(self):
+        """Avanza un frame la animación de apertura/cierre (sin el temporizador de auto-cierre)"""
+        if not self.is_opening and not self.is_closing:
+            return
+        
         # Si está abriéndose
         if self.is_opening:
             self.open_amount += self.open_speed
@@ -52,12 +93,6 @@ class Door:
                 self.is_closing = False
                 self.is_open = False
                 
-        # Auto-cerrar después del delay
-        if self.is_open and not self.is_closing and self.open_time:
-            elapsed = time.time() - self.open_time
-            if elapsed >= self.auto_close_delay:
-                self.close()
-                
     def get_position(self):
         """Retorna la posición de la puerta"""
         return (self.x, self.y)
@@ -73,3 +108,63 @@ class Door:
         Cuando está abierta (1.0), offset = 1.0 (puerta completamente a un lado)
         """
         return self.open_amount
+
+
+class DoorScheduler:
+    """
+    Actualiza solo las puertas que se están moviendo. Las puertas quietas no
+    cuestan nada por frame: open()/close() las despiertan y el auto-cierre de
+    las abiertas se programa en un heap de temporizadores (se consulta la hora
+    solo si hay alguno pendiente).
+    """
+    def __init__(self, doors):
+        self.doors = doors
+        self.order = {door: i for i, door in enumerate(doors)}  # Puerta -> posición en doors
+        self.active = []   # Puertas animándose, en el orden de doors
+        self._active_order = []  # Posición en doors de cada puerta de active (para bisect)
+        self.timers = []   # Heap de (hora de auto-cierre, n, puerta)
+        # Sube en cada update que mueve alguna puerta: las cachés de rayos lo usan porque el
+        # desplazamiento de una puerta cambia en cada frame sin cambiar world_version
+        self.moves = 0
+        self._counter = itertools.count()
+        for door in doors:
+            door.scheduler = self
+            if door.is_animating():
+                self.wake(door)
+            elif door.is_open and door.open_time is not None:
+                self._schedule_close(door)
+
+    def wake(self, door):
+        """Una puerta empezó a abrirse o a cerrarse"""
+        i = self.order[door]
+        k = bisect.bisect_left(self._active_order, i)
+        if k == len(self._active_order) or self._active_order[k] != i:
+            self._active_order.insert(k, i)
+            self.active.insert(k, door)
+
+    def _schedule_close(self, door):
+        heapq.heappush(self.timers, (door.open_time + door.auto_close_delay, next(self._counter), door))
+
+    def update(self, now=None):
+        """Avanza un frame las puertas activas y dispara los auto-cierres vencidos"""
+        if self.active:
+            self.moves += 1
+        still = []
+        for door in list(self.active):
+            door.step()
+            if door.is_animating():
+                still.append(door)
+            elif door.is_open and door.open_time is not None:
+                self._schedule_close(door)
+        if len(still) != len(self.active):
+            self.active = still
+            self._active_order = [self.order[door] for door in still]
+
+        if self.timers:
+            now = game_clock.seconds() if now is None else now
+            while self.timers and self.timers[0][0] <= now:
+                _, _, door = heapq.heappop(self.timers)
+                # Ignorar temporizadores de una apertura anterior
+                if door.is_open and not door.is_closing and door.open_time is not None:
+                    if now - door.open_time >= door.auto_close_delay:
+                        door.close()
@@ -1,6 +1,7 @@
 import pygame
 import math
 import settings
+import game_clock
 from sprite import Sprite
 from map import is_wall
 
@@ -17,15 +18,17 @@ class Enemy(Sprite):
         # Animación
         self.frames = {}  # 'idle': [img], 'walk': [img1, img2...], etc.
         self.current_frame = 0
-        self.last_update = pygame.time.get_ticks()
+        self.last_update = game_clock.ticks()
         self.frame_rate = 150 # ms por frame
+        self.last_attack = 0
         self.angle = 0
         
-    def update(self):
+    def update(self, now=None, ticks=1):
+        """Un tick de IA (ticks > 1 si se saltaron ticks: el movimiento los recupera)"""
         if self.dead:
             return
             
-        now = pygame.time.get_ticks()
+        now = game_clock.ticks() if now is None else now
         dist = self.calculate_distance(self.player.x, self.player.y)
         
         # Lógica de estados simple
@@ -34,7 +37,7 @@ class Enemy(Sprite):
             if self.raycaster.has_line_of_sight(self.x, self.y, self.player.x, self.player.y):
                 self.state = 'CHASE'
                 if settings.SOUND_ENABLED and hasattr(self, 'sound_manager'):
-                    self.sound_manager.play('achtung')
+                    self.sound_manager.play('achtung', (self.x, self.y), 'enemies')
                     
         elif self.state == 'CHASE':
             # Moverse hacia el jugador
@@ -43,8 +46,8 @@ class Enemy(Sprite):
             angle = math.atan2(dy, dx)
             
             # Movimiento simple (sin A*)
-            new_x = self.x + math.cos(angle) * self.speed
-            new_y = self.y + math.sin(angle) * self.speed
+            new_x = self.x + math.cos(angle) * self.speed * ticks
+            new_y = self.y + math.sin(angle) * self.speed * ticks
             
             if not is_wall(new_x, new_y):
                 self.x = new_x
@@ -68,7 +71,7 @@ class Enemy(Sprite):
                 self.player.take_damage(10) # 10 de daño
                 self.last_attack = now
                 if hasattr(self, 'sound_manager'):
-                   self.sound_manager.play('pistol') # Sonido de disparo del guardia
+                   self.sound_manager.play('pistol', (self.x, self.y), 'enemies') # Sonido de disparo del guardia
             
             # Volver a perseguir si el jugador se aleja
             if dist > 2.5:
@@ -102,7 +105,20 @@ class Guard(Enemy):
         # Cargar sprite sheet y cortar
         self._load_sprites(base_tex)
         
+        # Registrar frames en el atlas de texturas
+        for animation, frames in self.frames.items():
+            for i, frame in enumerate(frames):
+                texture_manager.atlas.add(('guard', animation, i), frame)
+        
+    # Frames ya cortados por sprite sheet (compartidos por todos los guardias)
+    _frames_cache = {}
+        
     def _load_sprites(self, sheet):
+        cached = Guard._frames_cache.get(id(sheet))
+        if cached:
+            self.frames = dict(cached)
+            return
+        
         # Asumiendo 448x128 pixels.
         # 64x64 por frame -> 7 col, 2 filas.
         # Fila 0: 4 caminar, 3 ataque?
@@ -130,3 +146,5 @@ class Guard(Enemy):
         
         # Frame muerto final
         self.frames['dead'] = [get_frame(1, 4)]
+        
+        Guard._frames_cache[id(sheet)] = dict(self.frames)
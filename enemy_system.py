@@ -0,0 +1,221 @@
+"""
+Sistema de enemigos por lotes (settings.BATCHED_ENEMIES).
+
+Guarda la posición, vida, estado y temporizadores de todos los enemigos en arrays
+NumPy y actualiza distancias, línea de visión, transiciones de estado y
+movimiento de todos a la vez en cada tick. Los objetos Enemy siguen existiendo
+para el renderizado y los disparos, pero al entrar en el sistema pasan a una
+subclase cuyos atributos de estado leen y escriben directamente en los arrays
+(los enemigos fuera de un sistema conservan atributos normales).
+
+Solo se vuelve a Python por enemigo para los eventos (sonidos, daño al jugador y
+cambio de frame de la animación).
+"""
+import settings
+import game_clock
+import map as game_map
+from map import is_wall
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Estados (mismo orden que los nombres que usa Enemy.state)
+STATES = ('IDLE', 'CHASE', 'ATTACK', 'PAIN', 'DIE')
+IDLE, CHASE, ATTACK, PAIN, DIE = range(len(STATES))
+
+ATTACK_RANGE = 2.0    # Distancia a la que deja de perseguir y dispara
+CHASE_RANGE = 2.5     # Distancia a la que vuelve a perseguir
+ATTACK_DELAY = 1000   # ms entre disparos
+ATTACK_DAMAGE = 10
+
+
+# Atributos de Enemy que pasan a vivir en los arrays
+FIELDS = ('x', 'y', 'distance', 'health', 'dead', 'state', 'current_frame', 'last_update', 'last_attack')
+
+
+class _Field:
+    """Atributo de un enemigo que es una vista de un array de su EnemySystem"""
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, enemy, owner=None):
+        if enemy is None:
+            return self
+        return enemy.system.get(self.name, enemy.index)
+
+    def __set__(self, enemy, value):
+        enemy.system.set(self.name, enemy.index, value)
+
+
+_view_classes = {}
+
+
+def view_class(cls):
+    """Subclase de una clase de enemigo con los FIELDS como vistas de los arrays"""
+    view = _view_classes.get(cls)
+    if view is None:
+        view = type(cls.__name__, (cls,), {name: _Field() for name in FIELDS})
+        _view_classes[cls] = view
+    return view
+
+
+class EnemySystem:
+    def __init__(self, enemies, player, raycaster):
+        self.enemies = list(enemies)
+        self.player = player
+        self.raycaster = raycaster
+
+        # Copiar el estado de los objetos a los arrays antes de convertirlos en vistas
+        self.x = np.array([e.x for e in self.enemies], dtype=np.float64)
+        self.y = np.array([e.y for e in self.enemies], dtype=np.float64)
+        self.distance = np.array([e.distance for e in self.enemies], dtype=np.float64)
+        self.health = np.array([e.health for e in self.enemies], dtype=np.int64)
+        self.dead = np.array([e.dead for e in self.enemies], dtype=bool)
+        self.state = np.array([STATES.index(e.state) for e in self.enemies], dtype=np.int8)
+        self.current_frame = np.array([e.current_frame for e in self.enemies], dtype=np.int64)
+        self.last_update = np.array([e.last_update for e in self.enemies], dtype=np.int64)
+        self.last_attack = np.array([e.last_attack for e in self.enemies], dtype=np.int64)
+        self.speed = np.array([e.speed for e in self.enemies], dtype=np.float64)
+        self.frame_rate = np.array([e.frame_rate for e in self.enemies], dtype=np.int64)
+        self.walk_frames = [e.frames.get('walk', [e.texture]) for e in self.enemies]
+        self.walk_count = np.array([len(frames) for frames in self.walk_frames], dtype=np.int64)
+        for i, enemy in enumerate(self.enemies):
+            for name in FIELDS:
+                enemy.__dict__.pop(name, None)
+            enemy.index = i
+            enemy.system = self
+            enemy.__class__ = view_class(type(enemy))
+
+        # Vistas NumPy de la rejilla con borde (None en el mundo por trozos)
+        self.grid = None
+        self.solid = None
+        if game_map.GRID is not None:
+            self.grid = np.frombuffer(game_map.GRID, dtype=np.uint8)
+            self.solid = np.frombuffer(game_map.SOLID, dtype=np.uint8)
+
+    # ---- Vistas (enemy._Field) ----
+
+    def get(self, name, index):
+        value = getattr(self, name)[index].item()
+        if name == 'state':
+            return STATES[value]
+        return value
+
+    def set(self, name, index, value):
+        if name == 'state':
+            value = STATES.index(value)
+        getattr(self, name)[index] = value
+
+    # ---- Consultas del mapa ----
+
+    def _walls(self, x, y, doors=False):
+        """is_wall para arrays de coordenadas (las puertas abiertas solo cuentan con doors=True)"""
+        if self.grid is None:
+            doors = self.raycaster.doors if doors else None
+            return np.array([is_wall(cx, cy, doors) for cx, cy in zip(x.tolist(), y.tolist())], dtype=bool)
+        outside = (x < 0) | (x >= game_map.MAP_WIDTH) | (y < 0) | (y >= game_map.MAP_HEIGHT)
+        ix = np.where(outside, 0, x).astype(np.int64)
+        iy = np.where(outside, 0, y).astype(np.int64)
+        layer = self.solid if doors else self.grid
+        return outside | (layer[(iy + 1) * game_map.GRID_STRIDE + ix + 1] != 0)
+
+    def line_of_sight(self, indices, target_x, target_y):
+        """RayCaster.has_line_of_sight desde varios enemigos a la vez (mismos puntos de muestreo)"""
+        x1 = self.x[indices]
+        y1 = self.y[indices]
+        dx = target_x - x1
+        dy = target_y - y1
+        steps = np.maximum((np.sqrt(dx * dx + dy * dy) * 2).astype(np.int64), 1)
+        max_steps = int(steps.max())
+
+        # Sumas acumuladas como el bucle original (cx += step_x), una fila por enemigo
+        xs = np.empty((len(indices), max_steps + 1))
+        ys = np.empty((len(indices), max_steps + 1))
+        xs[:, 0] = x1
+        ys[:, 0] = y1
+        xs[:, 1:] = (dx / steps)[:, None]
+        ys[:, 1:] = (dy / steps)[:, None]
+        xs = np.cumsum(xs, axis=1)[:, 1:]
+        ys = np.cumsum(ys, axis=1)[:, 1:]
+
+        # is_wall(int(cx), int(cy)): truncar hacia cero antes del test de límites
+        valid = np.arange(1, max_steps + 1)[None, :] <= steps[:, None]
+        blocked = self._walls(np.trunc(xs[valid]), np.trunc(ys[valid]), bool(self.raycaster.doors))
+        hits = np.zeros(valid.shape, dtype=bool)
+        hits[valid] = blocked
+        return ~hits.any(axis=1)
+
+    # ---- Actualización ----
+
+    def update(self, now=None, indices=None, ticks=None):
+        """
+        Un tick de IA para todos los enemigos (equivale a Enemy.update en cada uno),
+        o solo para indices; ticks (array por enemigo) escala el movimiento de los
+        que se saltaron ticks.
+        """
+        if not self.enemies:
+            return
+        now = game_clock.ticks() if now is None else now
+        player = self.player
+        px, py = player.x, player.y
+
+        alive = ~self.dead
+        if indices is not None:
+            selected = np.zeros(len(self.enemies), dtype=bool)
+            selected[indices] = True
+            alive &= selected
+        dx = self.x - px
+        dy = self.y - py
+        dist = np.sqrt(dx * dx + dy * dy)
+        self.distance[alive] = dist[alive]
+        state = self.state.copy()  # Estados al empezar el tick
+
+        # IDLE: pasar a perseguir si ven al jugador
+        idle = np.flatnonzero(alive & (state == IDLE))
+        if idle.size:
+            spotted = idle[self.line_of_sight(idle, px, py)]
+            self.state[spotted] = CHASE
+            if settings.SOUND_ENABLED:
+                for i in spotted.tolist():
+                    sound_manager = getattr(self.enemies[i], 'sound_manager', None)
+                    if sound_manager:
+                        sound_manager.play('achtung', (self.x[i], self.y[i]), 'enemies')
+
+        # CHASE: moverse hacia el jugador y atacar si está cerca
+        chase = np.flatnonzero(alive & (state == CHASE))
+        if chase.size:
+            angle = np.arctan2(py - self.y[chase], px - self.x[chase])
+            step = self.speed[chase] if ticks is None else self.speed[chase] * ticks[chase]
+            new_x = self.x[chase] + np.cos(angle) * step
+            new_y = self.y[chase] + np.sin(angle) * step
+            free = ~self._walls(new_x, new_y)
+            moved = chase[free]
+            self.x[moved] = new_x[free]
+            self.y[moved] = new_y[free]
+
+            close = chase[dist[chase] < ATTACK_RANGE]
+            self.state[close] = ATTACK
+            self.last_attack[close] = now
+
+            # Animación de caminar de los que siguen persiguiendo
+            walking = chase[dist[chase] >= ATTACK_RANGE]
+            advance = walking[now - self.last_update[walking] > self.frame_rate[walking]]
+            if advance.size:
+                self.last_update[advance] = now
+                self.current_frame[advance] = (self.current_frame[advance] + 1) % self.walk_count[advance]
+                for i, frame in zip(advance.tolist(), self.current_frame[advance].tolist()):
+                    self.enemies[i].texture = self.walk_frames[i][frame]
+
+        # ATTACK: disparar cada ATTACK_DELAY ms y volver a perseguir si el jugador se aleja
+        attack = np.flatnonzero(alive & (state == ATTACK))
+        if attack.size:
+            firing = attack[now - self.last_attack[attack] > ATTACK_DELAY]
+            for i in firing.tolist():
+                player.take_damage(ATTACK_DAMAGE)
+                self.last_attack[i] = now
+                sound_manager = getattr(self.enemies[i], 'sound_manager', None)
+                if sound_manager:
+                    sound_manager.play('pistol', (self.x[i], self.y[i]), 'enemies')
+            self.state[attack[dist[attack] > CHASE_RANGE]] = CHASE
@@ -0,0 +1,26 @@
+"""
+Reloj de la simulación: lo leen las puertas, los enemigos y el arma.
+
+Por defecto es pygame.time.get_ticks(). Al grabar o reproducir la entrada
+(input_log.py) Game lo fija al principio de cada tick, así que todo el tick ve
+la misma hora y una reproducción ve exactamente las horas de la grabación.
+"""
+import pygame
+
+_fixed_ms = None  # Hora fijada por Game (None = reloj de pygame)
+
+
+def ticks():
+    """Milisegundos de la simulación"""
+    return pygame.time.get_ticks() if _fixed_ms is None else _fixed_ms
+
+
+def seconds():
+    """Segundos de la simulación"""
+    return ticks() / 1000
+
+
+def set_ticks(ms):
+    """Fija la hora de la simulación (None vuelve al reloj de pygame)"""
+    global _fixed_ms
+    _fixed_ms = ms
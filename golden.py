@@ -0,0 +1,220 @@
+"""
+Regresión del renderer por imágenes de referencia (golden).
+
+Renderiza sin ventana un conjunto fijo de escenas (poses de cámara y apertura de
+las puertas) con Renderer.render_scene y:
+    1. compara el camino de referencia (RayCaster en serie, Renderer en serie,
+       kernels en modo 'reference') con los frames guardados en golden/;
+    2. compara cada camino rápido (kernels, raycaster y renderer paralelos) con
+       el frame de referencia de la misma ejecución.
+Un píxel difiere si algún canal se aleja más de TOLERANCE; una escena falla si
+difieren más de MAX_DIFF_RATIO de sus píxeles. De cada fallo se escriben en
+golden/diff/ el frame obtenido y una imagen con los píxeles distintos en rojo
+sobre la referencia atenuada.
+
+Uso:
+    python golden.py             # comprueba (código de salida 1 si algo falla)
+    python golden.py --update    # regenera las referencias con el camino de referencia
+    python golden.py --paths kernels 'renderer paralelo'
+"""
+import argparse
+import math
+import os
+import sys
+import settings
+from benchmark import init_display, make_scene, make_doors
+from map import bump_world_version
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+DIFF_DIR = os.path.join(GOLDEN_DIR, 'diff')
+TOLERANCE = 8            # Diferencia máxima por canal que no cuenta como distinta
+MAX_DIFF_RATIO = 0.001   # Fracción de píxeles distintos que se acepta por escena
+# Settings del camino de referencia (desactivan las optimizaciones que se activan por settings)
+REFERENCE_SETTINGS = {'ADAPTIVE_RAYS': False, 'BATCHED_WALL_BLITS': False}
+
+# nombre, (x, y, ángulo), apertura de las puertas
+SCENES = [
+    ('inicio', (8.0, 8.0, 0.0), 0.0),
+    ('puerta_cerrada', (7.5, 8.6, math.pi / 2), 0.0),
+    ('puerta_media', (7.5, 8.6, math.pi / 2), 0.5),
+    ('puerta_abierta', (7.5, 8.6, math.pi / 2), 1.0),
+    ('puerta_oblicua', (5.2, 8.8, math.pi / 3), 0.5),
+    ('pegado_pared', (14.8, 8.0, 0.0), 0.0),
+    ('pegado_pared_oblicuo', (1.2, 5.0, 0.9 * math.pi), 0.0),
+    ('sprites_tras_esquina', (11.8, 10.5, -1.43), 0.0),
+    ('sprites_sala', (8.0, 8.0, 3 * math.pi / 4), 0.0),
+    ('habitacion_secreta', (7.5, 11.2, math.pi / 2), 1.0),
+]
+
+
+def _reference(screen, texture_manager):
+    from raycasting import RayCaster
+    from renderer import Renderer
+    return 'reference', RayCaster(), Renderer(screen, texture_manager), {}
+
+
+def _kernels(screen, texture_manager):
+    from raycasting import RayCaster
+    from renderer import Renderer
+    return 'kernel', RayCaster(), Renderer(screen, texture_manager), {}
+
+
+def _adaptive_rays(screen, texture_manager):
+    from raycasting import RayCaster
+    from renderer import Renderer
+    return 'reference', RayCaster(), Renderer(screen, texture_manager), {'ADAPTIVE_RAYS': True}
+
+
+def _batched_walls(screen, texture_manager):
+    from raycasting import RayCaster
+    from renderer import Renderer
+    return 'reference', RayCaster(), Renderer(screen, texture_manager), {'BATCHED_WALL_BLITS': True}
+
+
+def _pvs_culling(screen, texture_manager):
+    from pvs import load_pvs
+    from map import LEVEL, LEVEL_PATH
+    from raycasting import RayCaster
+    from renderer import Renderer
+    renderer = Renderer(screen, texture_manager)
+    renderer.pvs = load_pvs(LEVEL, LEVEL_PATH)
+    return 'reference', RayCaster(), renderer, {}
+
+
+def _parallel_raycaster(screen, texture_manager):
+    from parallel_raycasting import ParallelRayCaster
+    from renderer import Renderer
+    return 'reference', ParallelRayCaster(2, min_columns=0), Renderer(screen, texture_manager), {}
+
+
+def _parallel_renderer(screen, texture_manager):
+    from raycasting import RayCaster
+    from parallel_renderer import ParallelRenderer
+    return 'reference', RayCaster(), ParallelRenderer(screen, texture_manager, 2), {}
+
+
+# Caminos que se comparan con la referencia: nombre -> función(screen, texture_manager)
+# que retorna (modo de kernels, raycaster, renderer, settings que cambia respecto a REFERENCE_SETTINGS)
+FAST_PATHS = {
+    'kernels': _kernels,
+    'rayos adaptativos': _adaptive_rays,
+    'blits por lotes': _batched_walls,
+    'culling por PVS': _pvs_culling,
+    'raycaster paralelo': _parallel_raycaster,
+    'renderer paralelo': _parallel_renderer,
+}
+
+
+def render_scenes(screen, texture_manager, player, sprites, make_path):
+    """Frames (ancho, alto, 3) de todas las escenas con un camino de render"""
+    import pygame
+    import kernels
+
+    previous_mode = kernels.get_mode()
+    mode, caster, renderer, overrides = make_path(screen, texture_manager)
+    overrides = dict(REFERENCE_SETTINGS, **overrides)
+    previous_settings = {name: getattr(settings, name) for name in overrides}
+    doors = make_doors(0.0)
+    caster.set_doors(doors)
+    renderer.set_doors(doors)
+    frames = {}
+    try:
+        kernels.set_mode(mode)
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        for name, pose, open_amount in SCENES:
+            for door in doors:
+                door.open_amount = open_amount
+                door.is_open = open_amount > 0.0
+            bump_world_version()  # Las puertas cambiaron sin Door.step (la luz precalculada se recalcula)
+            player.x, player.y, player.angle = pose
+            player.bobbing_offset = 0
+            for sprite in sprites:
+                sprite.calculate_distance(player.x, player.y)
+            rays = caster.cast_rays(*pose)
+            renderer.render_scene(rays, player, sprites)
+            frames[name] = pygame.surfarray.array3d(screen)
+    finally:
+        kernels.set_mode(previous_mode)
+        for name, value in previous_settings.items():
+            setattr(settings, name, value)
+        for part in (caster, renderer):
+            if hasattr(part, 'close'):
+                part.close()
+    return frames
+
+
+def compare(frame, reference):
+    """(píxeles distintos, diferencia máxima por canal, máscara de píxeles distintos)"""
+    import numpy as np
+    diff = np.abs(frame.astype(np.int16) - reference.astype(np.int16)).max(axis=2)
+    bad = diff > TOLERANCE
+    return int(bad.sum()), int(diff.max()), bad
+
+
+def write_diff(label, frame, reference, bad):
+    """Guarda el frame obtenido y los píxeles distintos en rojo sobre la referencia atenuada"""
+    import pygame
+    os.makedirs(DIFF_DIR, exist_ok=True)
+    image = reference // 3
+    image[bad] = (255, 0, 0)
+    base = os.path.join(DIFF_DIR, label.replace(' ', '_'))
+    pygame.image.save(pygame.surfarray.make_surface(frame), base + '.png')
+    pygame.image.save(pygame.surfarray.make_surface(image), base + '-diff.png')
+    return base + '-diff.png'
+
+
+def check(label, frame, reference):
+    """Compara un frame con su referencia, imprime el resultado y retorna True si pasa"""
+    count, max_diff, bad = compare(frame, reference)
+    if count <= MAX_DIFF_RATIO * bad.size:
+        print(f"  ✓ {label:<44} {count:6d} px distintos (máx. {max_diff})")
+        return True
+    print(f"  ! {label:<44} {count:6d} px distintos (máx. {max_diff}) -> {write_diff(label, frame, reference, bad)}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresión del renderer por imágenes de referencia")
+    parser.add_argument('--update', action='store_true', help="regenera las referencias")
+    parser.add_argument('--paths', nargs='*', choices=list(FAST_PATHS), default=list(FAST_PATHS),
+                        help="caminos rápidos a comparar con la referencia")
+    args = parser.parse_args()
+
+    import pygame
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("NumPy no disponible: no se pueden comparar imágenes")
+        return 2
+
+    screen = init_display()
+    texture_manager, player, _, sprites = make_scene(screen)
+    print(f"Imágenes de referencia ({len(SCENES)} escenas, {settings.SCREEN_WIDTH}x{settings.SCREEN_HEIGHT})")
+    reference = render_scenes(screen, texture_manager, player, sprites, _reference)
+
+    if args.update:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        for name, frame in reference.items():
+            pygame.image.save(pygame.surfarray.make_surface(frame), os.path.join(GOLDEN_DIR, name + '.png'))
+        print(f"  ✓ {len(reference)} referencias escritas en {GOLDEN_DIR}")
+        return 0
+
+    ok = True
+    for name, frame in reference.items():
+        path = os.path.join(GOLDEN_DIR, name + '.png')
+        if not os.path.exists(path):
+            print(f"  ! {name}: sin referencia (python golden.py --update)")
+            ok = False
+            continue
+        ok &= check(f"referencia {name}", frame, pygame.surfarray.array3d(pygame.image.load(path)))
+
+    for path_name in args.paths:
+        frames = render_scenes(screen, texture_manager, player, sprites, FAST_PATHS[path_name])
+        for name, frame in frames.items():
+            ok &= check(f"{path_name} {name}", frame, reference[name])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,17 @@ import pygame
 import os
 
 class HUD:
-    def __init__(self, screen):
+    FACE_FILE = 'bjface.png'
+    WEAPON_FILES = {
+        'knife': 'hudknife.png',
+        'pistol': 'hudgun.png',
+        'machinegun': 'hudmachinegun.png',
+        'minigun': 'hudmini.png'
+    }
+    
+    def __init__(self, screen, texture_manager=None, defer_images=False):
         self.screen = screen
+        self.texture_manager = texture_manager
         self.screen_width = screen.get_width()
         self.screen_height = screen.get_height()
         
@@ -29,33 +38,46 @@ class HUD:
         self.player_face = None  # Needed for fallback or currently displayed face
         self.weapon_images = {}
         
-        # Cargar imágenes del HUD
-        self.load_hud_images()
+        # Cargar imágenes del HUD (o en el primer draw si se difiere el arranque)
+        self.images_loaded = False
+        if not defer_images:
+            self.load_hud_images()
+        
+    @classmethod
+    def asset_paths(cls):
+        """Imágenes que lee load_hud_images (para decodificarlas por adelantado)"""
+        sprite_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sprites')
+        return [os.path.join(sprite_dir, f) for f in [cls.FACE_FILE] + list(cls.WEAPON_FILES.values())]
         
     def load_hud_images(self):
         """Carga las imágenes del HUD"""
         base_dir = os.path.dirname(os.path.abspath(__file__))
         sprite_dir = os.path.join(base_dir, 'sprites')
-        
-        # Intentar importar Pillow para fallback
-        try:
-            from PIL import Image
-            HAS_PILLOW = True
-        except ImportError:
-            HAS_PILLOW = False
+        asset_cache = self.texture_manager.asset_cache if self.texture_manager else None
+        asset_loader = self.texture_manager.asset_loader if self.texture_manager else None
+        self.images_loaded = True
             
         def load_image_safe(path, size=None):
             if not os.path.exists(path):
                 return None
             
             try:
-                img = pygame.image.load(path).convert_alpha()
+                if asset_loader:
+                    img = asset_loader.get_image(path).convert_alpha()
+                else:
+                    img = pygame.image.load(path).convert_alpha()
                 if size:
                     img = pygame.transform.scale(img, size)
                 print(f"  ✓ HUD Image {os.path.basename(path)} cargada (PyGame)")
                 return img
             except Exception as e:
                 print(f"  ! Error PyGame cargando HUD image {os.path.basename(path)}: {e}")
+                # Pillow solo se importa si PyGame falla
+                try:
+                    from PIL import Image
+                    HAS_PILLOW = True
+                except ImportError:
+                    HAS_PILLOW = False
                 if HAS_PILLOW:
                     try:
                         pil_img = Image.open(path).convert('RGBA')
@@ -72,10 +94,11 @@ class HUD:
                 return None
 
         # Cara del jugador (BJ)
-        face_path = os.path.join(sprite_dir, 'bjface.png')
-        raw_face = load_image_safe(face_path)
+        face_path = os.path.join(sprite_dir, self.FACE_FILE)
+        cached_faces = asset_cache.load_frames(('hud', 'faces')) if asset_cache else None
+        raw_face = None if cached_faces else load_image_safe(face_path)
         
-        self.bj_faces = []
+        self.bj_faces = cached_faces or []
         if raw_face:
             # The image is 672x32, containing 21 faces of 32x32
             # We need to slice it
@@ -96,23 +119,32 @@ class HUD:
                     print(f"  ! Error slicing face {i}: {e}")
             
             print(f"  ✓ Loaded {len(self.bj_faces)} BJ face frames")
+            if asset_cache and self.bj_faces:
+                asset_cache.store_frames(('hud', 'faces'), self.bj_faces, face_path)
             
-            # Set default face
-            if self.bj_faces:
-                self.player_face = self.bj_faces[0]
+        # Set default face
+        if self.bj_faces:
+            self.player_face = self.bj_faces[0]
             
         # Armas del HUD
         self.weapon_images = {}
-        weapon_files = {
-            'knife': 'hudknife.png',
-            'pistol': 'hudgun.png',
-            'machinegun': 'hudmachinegun.png',
-            'minigun': 'hudmini.png'
-        }
+        weapon_files = self.WEAPON_FILES
         
         for weapon_name, filename in weapon_files.items():
             path = os.path.join(sprite_dir, filename)
-            self.weapon_images[weapon_name] = load_image_safe(path, (60, 60))
+            img = asset_cache.load_image(('hud', 'weapon', weapon_name)) if asset_cache else None
+            if img is None:
+                img = load_image_safe(path, (60, 60))
+                if asset_cache and img:
+                    asset_cache.store_image(('hud', 'weapon', weapon_name), img, path)
+            self.weapon_images[weapon_name] = img
+        
+        # Registrar imágenes en el atlas de texturas
+        if self.texture_manager:
+            for i, face in enumerate(self.bj_faces):
+                self.texture_manager.atlas.add(('hud', 'face', i), face)
+            for weapon_name, img in self.weapon_images.items():
+                self.texture_manager.atlas.add(('hud', 'weapon', weapon_name), img)
             
     def draw_panel(self, surface, x, y, width, height, label, value, is_percentage=False):
         """Dibuja un panel individual del HUD"""
@@ -137,6 +169,9 @@ class HUD:
 
     def draw(self, player_health, player_ammo, current_weapon, player_lives, score):
         """Dibuja el HUD completo estilo Wolfenstein 3D"""
+        if not self.images_loaded:
+            self.load_hud_images()
+            
         # Fondo general (gris oscuro detrás de los paneles)
         hud_surface = pygame.Surface((self.screen_width, self.hud_height))
         hud_surface.fill(self.bg_gray)
@@ -0,0 +1,206 @@
+"""
+Grabación y reproducción de la entrada (settings.INPUT_RECORD / INPUT_REPLAY).
+
+Al grabar, cada tick guarda en un registro binario todo lo que alimenta la
+simulación: la hora del tick (game_clock), la semilla de random, las teclas
+pulsadas (scancodes de pygame.key.get_pressed), el movimiento horizontal del
+mouse y los eventos que trata Game (teclas, clics y cierre). Al reproducir, Game
+toma todo eso del registro en lugar de SDL, así que la partida se repite tick a
+tick sin ventana ni mouse: una sesión capturada sirve de benchmark repetible y de
+prueba de regresión de los renderers optimizados. Al terminar la grabación se
+guarda un resumen (SHA-1) del estado de la simulación y la reproducción lo
+compara con el suyo.
+
+Mientras se graba o reproduce la simulación es determinista: el reloj de
+puertas, enemigos y arma queda fijo en cada tick, random se siembra al empezar
+el tick, la IA no aplaza enemigos por presupuesto de tiempo, el mundo por trozos
+carga los chunks en el momento y el mouse se lee siempre en modo relativo.
+
+Formato (little endian):
+    MAGIC (8 bytes) | versión (u32) | hora inicial (u32) | longitud del nivel (u16) | nivel
+    tick:  'T' | hora (u32) | semilla (u32) | mouse x (i16) | n teclas (u8) | n eventos (u8) |
+           scancodes (u16 * n) | eventos (tipo u8, valor u32) * n
+    fin:   'E' | ticks (u32) | SHA-1 del estado (20 bytes)
+
+Para reproducir una sesión sin ventana (código de salida 1 si el estado final difiere):
+    python input_log.py sesion.r3di
+"""
+import hashlib
+import os
+import struct
+import sys
+import pygame
+import settings
+
+MAGIC = b'R3DINPUT'
+LOG_VERSION = 1
+HEADER = struct.Struct('<8sIIH')
+TICK = struct.Struct('<IIhBB')
+EVENT = struct.Struct('<BI')
+END = struct.Struct('<I20s')
+
+# Eventos que afectan a la simulación
+EVENT_QUIT, EVENT_KEYDOWN, EVENT_MOUSEBUTTONDOWN = range(3)
+
+
+def encode_event(event):
+    """(tipo, valor) de un evento de pygame, o None si no se graba"""
+    if event.type == pygame.QUIT:
+        return (EVENT_QUIT, 0)
+    if event.type == pygame.KEYDOWN:
+        return (EVENT_KEYDOWN, event.key)
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        return (EVENT_MOUSEBUTTONDOWN, event.button)
+    return None
+
+
+def decode_event(kind, value):
+    if kind == EVENT_KEYDOWN:
+        return pygame.event.Event(pygame.KEYDOWN, key=value, mod=0, unicode='', scancode=0)
+    if kind == EVENT_MOUSEBUTTONDOWN:
+        return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=value, pos=(0, 0))
+    return pygame.event.Event(pygame.QUIT)
+
+
+def state_digest(game):
+    """SHA-1 del estado de la simulación (jugador, enemigos, puertas y arma)"""
+    player = game.player
+    state = [
+        (player.x, player.y, player.angle, player.health, player.ammo,
+         player.current_weapon_index, player.score, player.lives),
+        [(e.x, e.y, e.state, e.health, e.dead, e.current_frame) for e in game.enemies],
+        [(d.open_amount, d.is_open, d.is_opening, d.is_closing, d.open_time) for d in game.doors],
+        (game.weapon.animating, game.weapon.current_frame),
+    ]
+    return hashlib.sha1(repr(state).encode('utf-8')).digest()
+
+
+class TickInput:
+    """Entrada de un tick leída del registro"""
+    __slots__ = ('ms', 'seed', 'mouse_x', 'scancodes', 'events')
+
+    def __init__(self, ms, seed, mouse_x, scancodes, events):
+        self.ms = ms
+        self.seed = seed
+        self.mouse_x = mouse_x
+        self.scancodes = scancodes
+        self.events = events  # [(tipo, valor)]
+
+    def keys(self):
+        """Estado del teclado como lo retorna pygame.key.get_pressed"""
+        pressed = [False] * 512
+        for scancode in self.scancodes:
+            pressed[scancode] = True
+        return pygame.key.ScancodeWrapper(pressed)
+
+    def pygame_events(self):
+        return [decode_event(kind, value) for kind, value in self.events]
+
+
+class InputRecorder:
+    """Escribe el registro de una sesión tick a tick"""
+    def __init__(self, path, start_ms):
+        self.path = path
+        self.start_ms = start_ms
+        self.ticks = 0
+        self._file = open(path, 'wb')
+        level = settings.LEVEL_FILE.encode('utf-8')
+        self._file.write(HEADER.pack(MAGIC, LOG_VERSION, start_ms, len(level)))
+        self._file.write(level)
+
+    def record(self, ms, seed, keys, mouse_x, events):
+        """Un tick: keys es el resultado de pygame.key.get_pressed, events [(tipo, valor)]"""
+        scancodes = [i for i, pressed in enumerate(keys) if pressed][:255]
+        events = events[:255]
+        mouse_x = max(-32768, min(32767, mouse_x))
+        out = bytearray(b'T')
+        out += TICK.pack(ms, seed, mouse_x, len(scancodes), len(events))
+        out += struct.pack(f'<{len(scancodes)}H', *scancodes)
+        for kind, value in events:
+            out += EVENT.pack(kind, value & 0xFFFFFFFF)
+        self._file.write(out)
+        self.ticks += 1
+
+    def finish(self, digest):
+        """Cierra el registro con el resumen del estado final"""
+        self._file.write(b'E' + END.pack(self.ticks, digest))
+        self.close()
+        size = os.path.getsize(self.path)
+        print(f"  ✓ Entrada grabada: {self.ticks} ticks, {size / 1024:.1f} KB en {self.path}")
+
+    def close(self):
+        """Cierra el registro (sin resumen final si no se llamó a finish)"""
+        self._file.close()
+
+
+class InputReplay:
+    """Lee un registro y entrega la entrada de cada tick"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.start_ms, level_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path}: no es un registro de entrada (versión {LOG_VERSION})")
+        offset = HEADER.size
+        self.level = data[offset:offset + level_len].decode('utf-8')
+        offset += level_len
+        if self.level != settings.LEVEL_FILE:
+            print(f"  ! El registro se grabó en {self.level}, no en {settings.LEVEL_FILE}")
+
+        self.ticks = []
+        self.expected = None  # (ticks, SHA-1) guardados al final de la grabación
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            offset += 1
+            if tag == b'E':
+                self.expected = END.unpack_from(data, offset)
+                break
+            if tag != b'T':
+                raise ValueError(f"{path}: registro corrupto en el byte {offset - 1}")
+            ms, seed, mouse_x, n_keys, n_events = TICK.unpack_from(data, offset)
+            offset += TICK.size
+            scancodes = struct.unpack_from(f'<{n_keys}H', data, offset)
+            offset += 2 * n_keys
+            events = [EVENT.unpack_from(data, offset + i * EVENT.size) for i in range(n_events)]
+            offset += EVENT.size * n_events
+            self.ticks.append(TickInput(ms, seed, mouse_x, scancodes, events))
+        self.position = 0
+
+    @property
+    def finished(self):
+        return self.position >= len(self.ticks)
+
+    def next_tick(self):
+        """Entrada del siguiente tick, o None al final del registro"""
+        if self.finished:
+            return None
+        tick = self.ticks[self.position]
+        self.position += 1
+        return tick
+
+    def verify(self, digest):
+        """Compara el estado final con el de la grabación; retorna False si difiere"""
+        if self.expected is None:
+            print(f"  ! El registro no tiene estado final (grabación interrumpida): "
+                  f"{self.position} ticks, estado {digest.hex()[:12]}")
+            return True
+        ticks, expected = self.expected
+        if self.position == ticks and digest == expected:
+            print(f"  ✓ Reproducción idéntica: {ticks} ticks, estado {digest.hex()[:12]}")
+            return True
+        print(f"  ! La reproducción difiere: {self.position}/{ticks} ticks, "
+              f"estado {digest.hex()[:12]} en vez de {expected.hex()[:12]}")
+        return False
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python input_log.py sesion.r3di")
+        sys.exit(2)
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    settings.INPUT_REPLAY = sys.argv[1]
+    settings.INPUT_RECORD = None
+    from main import Game
+    Game().run()
@@ -0,0 +1,340 @@
+"""
+Kernels opcionales para los bucles internos del motor.
+
+Son funciones de Python puro sobre arrays NumPy: si numba está instalado se
+compilan con JIT, y si no se ejecutan tal cual. Producen exactamente los mismos
+resultados que el camino de referencia (RayCaster.cast_strip y Renderer._draw_walls).
+
+Modo (settings.KERNEL_MODE o set_mode en tiempo de ejecución):
+    'auto'      - kernels solo si numba está disponible
+    'kernel'    - kernels siempre (sin numba son lentos, útil para verificar)
+    'reference' - camino original
+"""
+import importlib.util
+import math
+import settings
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# numba tarda en importarse: solo se comprueba que existe y se importa en compile_kernels
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+
+_mode = settings.KERNEL_MODE
+_compiled = False
+
+# Columnas del buffer de salida de cast_rays_kernel
+RAY_DEPTH, RAY_HEIGHT, RAY_TYPE, RAY_SIDE, RAY_TEXTURE_X, RAY_ANGLE, RAY_MAP_X, RAY_MAP_Y = range(8)
+RAY_FIELDS = 8
+SIDES = ('vertical', 'horizontal')
+
+
+def set_mode(mode):
+    """Selecciona el modo de los kernels: 'auto', 'kernel' o 'reference'"""
+    global _mode
+    if mode not in ('auto', 'kernel', 'reference'):
+        raise ValueError(f"Modo de kernels desconocido: {mode}")
+    _mode = mode
+
+
+def get_mode():
+    return _mode
+
+
+def kernels_enabled():
+    """True si los bucles internos deben usar los kernels"""
+    if not HAS_NUMPY or _mode == 'reference':
+        return False
+    return _mode == 'kernel' or HAS_NUMBA
+
+
+def cast_rays_kernel(grid, door_index, door_open, door_amount,
+                     player_x, player_y, player_angle, start, end,
+                     half_fov, delta_angle, max_depth, screen_height, out):
+    """
+    DDA de RayCaster.cast_strip sobre arrays: grid (alto, ancho) con el tipo de
+    pared, door_index (alto, ancho) con el índice de puerta o -1, y el estado de
+    cada puerta. Escribe una fila de RAY_FIELDS valores por rayo en out.
+    """
+    map_height = grid.shape[0]
+    map_width = grid.shape[1]
+
+    for ray in range(start, end):
+        ray_angle = player_angle - half_fov + ray * delta_angle
+
+        sin_a = math.sin(ray_angle)
+        cos_a = math.cos(ray_angle)
+        if cos_a == 0: cos_a = 0.000001
+        if sin_a == 0: sin_a = 0.000001
+
+        map_x = int(player_x)
+        map_y = int(player_y)
+
+        delta_dist_x = abs(1 / cos_a)
+        delta_dist_y = abs(1 / sin_a)
+
+        if cos_a < 0:
+            step_x = -1
+            side_dist_x = (player_x - map_x) * delta_dist_x
+        else:
+            step_x = 1
+            side_dist_x = (map_x + 1.0 - player_x) * delta_dist_x
+
+        if sin_a < 0:
+            step_y = -1
+            side_dist_y = (player_y - map_y) * delta_dist_y
+        else:
+            step_y = 1
+            side_dist_y = (map_y + 1.0 - player_y) * delta_dist_y
+
+        side = 0  # 0 = 'vertical', 1 = 'horizontal'
+        wall_type = 0
+        door_offset = 0.0
+
+        for _ in range(max_depth):
+            if side_dist_x < side_dist_y:
+                side_dist_x += delta_dist_x
+                map_x += step_x
+                side = 0
+            else:
+                side_dist_y += delta_dist_y
+                map_y += step_y
+                side = 1
+
+            if map_x < 0 or map_x >= map_width or map_y < 0 or map_y >= map_height:
+                wall_type = 1
+                break
+
+            current_wall_type = grid[map_y, map_x]
+            if current_wall_type != 0:
+                door = door_index[map_y, map_x]
+                if current_wall_type == 7 and door >= 0 and door_open[door]:
+                    if side == 0:
+                        perp_wall_dist = (map_x - player_x + (1 - step_x) / 2) / cos_a
+                        exact_y = player_y + perp_wall_dist * sin_a
+                        hit_offset = exact_y - int(exact_y)
+                    else:
+                        perp_wall_dist = (map_y - player_y + (1 - step_y) / 2) / sin_a
+                        exact_x = player_x + perp_wall_dist * cos_a
+                        hit_offset = exact_x - int(exact_x)
+
+                    if hit_offset < door_amount[door]:
+                        continue
+                    wall_type = current_wall_type
+                    door_offset = door_amount[door]
+                    break
+                wall_type = current_wall_type
+                break
+
+        if side == 0:
+            depth = (map_x - player_x + (1 - step_x) / 2) / cos_a
+            wall_x = player_y + depth * sin_a
+        else:
+            depth = (map_y - player_y + (1 - step_y) / 2) / sin_a
+            wall_x = player_x + depth * cos_a
+        wall_x -= math.floor(wall_x)
+
+        if wall_type == 7:
+            wall_x -= door_offset
+
+        depth *= math.cos(player_angle - ray_angle)
+
+        if depth > 0:
+            wall_height = screen_height / depth
+        else:
+            wall_height = float(screen_height)
+
+        row = ray - start
+        out[row, 0] = depth
+        out[row, 1] = wall_height
+        out[row, 2] = wall_type
+        out[row, 3] = side
+        out[row, 4] = wall_x
+        out[row, 5] = ray_angle
+        out[row, 6] = map_x
+        out[row, 7] = map_y
+
+
+def draw_wall_columns_kernel(frame_cols, wall_bank, wall_slot, wall_heights, wall_types, texture_xs,
+                             shades, shade_lut, first_ray, x0, x1, scale, screen_height, bob_offset):
+    """
+    Rasterizador de columnas de pared: escribe en frame_cols (ancho, alto, 3) las
+    columnas de rayos first_ray.. dentro de [x0, x1). wall_bank es (niveles, n, tex, tex, 3)
+    en orden columna (ver WallBank) y wall_slot traduce tipo de pared a índice del banco.
+    Cada texel pasa por la tabla shade_lut[shades[k]] de su columna (sombreado).
+    """
+    frame_height = frame_cols.shape[1]
+    num_levels = wall_bank.shape[0]
+
+    for k in range(wall_heights.shape[0]):
+        wall_height = wall_heights[k]
+        height = int(wall_height)
+        if height <= 0:
+            continue
+        slot = wall_slot[wall_types[k]]
+        lut = shade_lut[shades[k]]
+
+        # Nivel de mipmap: el más pequeño que aún cubre la altura proyectada
+        level = 0
+        while level + 1 < num_levels and (wall_bank.shape[3] >> (level + 1)) >= height:
+            level += 1
+        tex_width = wall_bank.shape[2] >> level
+        tex_size = wall_bank.shape[3] >> level
+
+        tex_col = int(texture_xs[k] * tex_width)
+        if tex_col < 0 or tex_col >= tex_width:
+            tex_col = 0
+
+        top = int((screen_height - wall_height) / 2 + bob_offset)
+        y0 = max(top, 0)
+        y1 = min(top + height, frame_height)
+        px0 = (first_ray + k) * scale
+        px1 = min(px0 + scale, x1)
+
+        for y in range(y0, y1):
+            ty = ((y - top) * tex_size) // height
+            for px in range(px0, px1):
+                for c in range(3):
+                    frame_cols[px, y, c] = lut[wall_bank[level, slot, tex_col, ty, c]]
+
+
+def compile_kernels():
+    """Compila los kernels con numba (si está instalado) la primera vez que se usan"""
+    global cast_rays_kernel, draw_wall_columns_kernel, _compiled
+    if _compiled:
+        return
+    _compiled = True
+    if HAS_NUMBA:
+        # Sin numba los kernels se ejecutan como Python normal
+        from numba import njit
+        cast_rays_kernel = njit(cache=True)(cast_rays_kernel)
+        draw_wall_columns_kernel = njit(cache=True)(draw_wall_columns_kernel)
+
+
+class KernelMap:
+    """Arrays del mapa y de las puertas en el formato que esperan los kernels"""
+    def __init__(self, world_map, doors):
+        self.grid = np.asarray(world_map, dtype=np.uint8)
+        self.doors = list(doors or [])
+        self.door_index = np.full(self.grid.shape, -1, dtype=np.int32)
+        # La primera puerta en una celda gana, como en get_door_at_position
+        for i in range(len(self.doors) - 1, -1, -1):
+            door = self.doors[i]
+            if 0 <= door.y < self.grid.shape[0] and 0 <= door.x < self.grid.shape[1]:
+                self.door_index[door.y, door.x] = i
+        self.door_open = np.zeros(max(1, len(self.doors)), dtype=np.bool_)
+        self.door_amount = np.zeros(max(1, len(self.doors)), dtype=np.float64)
+
+    def sync_doors(self):
+        """Copia el estado actual de las puertas a los arrays"""
+        for i, door in enumerate(self.doors):
+            self.door_open[i] = door.is_open
+            self.door_amount[i] = door.open_amount
+
+
+def cast_strip(kernel_map, player_x, player_y, player_angle, start, end):
+    """Versión con kernel de RayCaster.cast_strip: mismo formato de rayos"""
+    compile_kernels()
+    kernel_map.sync_doors()
+    out = np.empty((max(0, end - start), RAY_FIELDS), dtype=np.float64)
+    cast_rays_kernel(kernel_map.grid, kernel_map.door_index, kernel_map.door_open, kernel_map.door_amount,
+                     float(player_x), float(player_y), float(player_angle), start, end,
+                     settings.HALF_FOV, settings.DELTA_ANGLE, settings.MAX_DEPTH,
+                     settings.SCREEN_HEIGHT, out)
+
+    rays = []
+    for depth, wall_height, wall_type, side, texture_x, angle, map_x, map_y in out.tolist():
+        rays.append({
+            'depth': depth,
+            'wall_height': wall_height,
+            'wall_type': int(wall_type),
+            'side': SIDES[int(side)],
+            'texture_x': texture_x,
+            'angle': angle,
+            'hit_pos': (int(map_x), int(map_y))
+        })
+    return rays
+
+
+class WallBank:
+    """
+    Texturas de pared apiladas en un único array (niveles, n, tex, tex, 3) para los
+    kernels. El nivel 0 es la textura completa; los siguientes son sus mipmaps
+    (rellenos con ceros hasta tex x tex). Sin mipmaps solo hay un nivel. Las paredes
+    aún no cargadas usan su textura provisional; version indica con qué estado del
+    TextureManager se construyó (hay que reconstruir el banco si cambia).
+    """
+    def __init__(self, texture_manager):
+        import pygame
+        table = texture_manager.wall_texture_table()
+        ids = sorted(table)
+        size = texture_manager.texture_size
+        self.version = texture_manager.wall_version
+
+        atlas = getattr(texture_manager, 'atlas', None)
+        if (atlas is not None and atlas.built and atlas.wall_columns is not None and atlas.wall_ids == ids
+                and all(atlas.key_for(table[i][0]) == ('wall', i) for i in ids)):
+            # Reutilizar las columnas ya transpuestas del atlas (si nada se cargó o descargó después)
+            level0 = atlas.wall_columns[..., :3]
+        else:
+            level0 = np.stack([pygame.surfarray.array3d(table[i][0]) for i in ids])
+
+        chains = [table[i][1] for i in ids]
+        num_levels = min((len(chain) for chain in chains), default=1)
+        self.bank = np.zeros((num_levels, len(ids), size, size, 3), dtype=np.uint8)
+        self.bank[0] = level0
+        for level in range(1, num_levels):
+            for slot, chain in enumerate(chains):
+                pixels = pygame.surfarray.array3d(chain[level])
+                self.bank[level, slot, :pixels.shape[0], :pixels.shape[1]] = pixels
+
+        # Tipos sin textura usan la 1 (como get_wall_texture)
+        default = ids.index(1) if 1 in ids else 0
+        self.slot = np.full(256, default, dtype=np.int32)
+        for slot, wall_id in enumerate(ids):
+            if 0 <= wall_id < 256:
+                self.slot[wall_id] = slot
+
+
+_shade_lut = [None, None]  # [tablas de shade_table, array (variantes, 256)]
+
+
+def shade_arrays(rays, lights=None):
+    """
+    Variante de sombreado de cada rayo y tablas de sombreado (variantes, 256) para los
+    kernels; lights es el nivel de luz precalculada de cada rayo (None = luz completa)
+    """
+    from texture_manager import shade_table, shade_variant
+    key = tuple(shade_table())
+    if _shade_lut[0] != key:
+        _shade_lut[:] = [key, np.frombuffer(b''.join(key), dtype=np.uint8).reshape(len(key), 256)]
+    if settings.WALL_SHADING:
+        # shade_variant de todos los rayos a la vez (acepta arrays)
+        depths = np.array([ray['depth'] for ray in rays], dtype=np.float64)
+        sides = np.array([ray['side'] for ray in rays])
+        light = None if lights is None else np.asarray(lights, dtype=np.int32)
+        shades = np.asarray(shade_variant(depths, sides, light), dtype=np.int32)
+    else:
+        shades = np.full(len(rays), shade_variant(0.0, 'vertical'), dtype=np.int32)  # Brillo completo
+    return shades, _shade_lut[1]
+
+
+def wall_arrays(rays):
+    """Altura, tipo y coordenada de textura de cada rayo como arrays para draw_wall_columns_kernel"""
+    wall_heights = np.array([ray['wall_height'] for ray in rays], dtype=np.float64)
+    wall_types = np.array([ray['wall_type'] for ray in rays], dtype=np.int32)
+    texture_xs = np.array([ray['texture_x'] for ray in rays], dtype=np.float64)
+    return wall_heights, wall_types, texture_xs
+
+
+def draw_walls(frame_cols, wall_bank, rays, bob_offset, first_ray=0, x0=0, x1=None, lights=None):
+    """Versión con kernel de Renderer._draw_walls sobre un array (ancho, alto, 3)"""
+    compile_kernels()
+    if x1 is None:
+        x1 = frame_cols.shape[0]
+    wall_heights, wall_types, texture_xs = wall_arrays(rays)
+    shades, shade_lut = shade_arrays(rays, lights)
+    draw_wall_columns_kernel(frame_cols, wall_bank.bank, wall_bank.slot, wall_heights, wall_types, texture_xs,
+                             shades, shade_lut, first_ray, x0, x1, settings.SCALE, settings.SCREEN_HEIGHT, float(bob_offset))
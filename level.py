@@ -0,0 +1,251 @@
+"""
+Niveles en archivos de texto.
+
+Formato (secciones entre corchetes, '#' inicia un comentario):
+    [map]      una fila de celdas por línea; cada carácter es el tipo de pared en
+               base 36 (0 o '.' = vacío, 1-9, A = 10, B = 11 ... Z = 35)
+    [sprites]  x y tipo
+    [enemies]  x y tipo
+    [player]   x y ángulo
+Las puertas son las celdas de tipo 7.
+
+Al cargar, el texto se compila a capas planas fila a fila (celda = y * ancho + x):
+    grid        tipo de pared (uint8)
+    solid       1 si la celda bloquea el paso (las puertas cuentan como cerradas)
+    door_index  índice de la puerta en doors (uint16), NO_DOOR si no hay puerta
+La versión compilada se guarda junto al archivo (nivel.txt -> nivel.lvlc) y las
+cargas siguientes la mapean en memoria (mmap) sin volver a parsear el texto. Si
+el archivo fuente cambia (mtime, tamaño y SHA-1) se recompila.
+
+Para compilar un nivel sin lanzar el juego:
+    python level.py levels/e1m1.txt
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'R3DLEVEL'
+LEVEL_VERSION = 1
+# magic | versión | ancho | alto | mtime_ns | tamaño | sha1 | longitud de las entidades (JSON)
+HEADER = struct.Struct('<8sIIIqQ20sI')
+ALIGN = 16
+MAX_LEVEL_SIZE = 1024
+DOOR_TYPE = 7
+NO_DOOR = 0xFFFF
+CELL_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _align(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+class Level:
+    """Nivel compilado: capas planas del mapa y listas de entidades"""
+    def __init__(self, width, height, grid, solid, door_index, doors, sprites, enemies, player_start):
+        self.width = width
+        self.height = height
+        self.grid = grid              # bytes/memoryview de ancho * alto
+        self.solid = solid            # bytes/memoryview de ancho * alto
+        self.door_index = door_index  # secuencia uint16 de ancho * alto
+        self.doors = doors            # [(x, y)] en el orden de door_index
+        self.sprites = sprites        # [(x, y, tipo)]
+        self.enemies = enemies        # [(x, y, tipo)]
+        self.player_start = player_start  # (x, y, ángulo)
+        self._file = None  # Archivo compilado mapeado (se mantiene abierto mientras se use el nivel)
+        self._map = None
+
+    def cell(self, x, y):
+        """Tipo de pared de una celda (1 fuera del mapa)"""
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return 1
+        return self.grid[y * self.width + x]
+
+    def rows(self):
+        """Mapa como lista de filas (el formato de map.WORLD_MAP)"""
+        width = self.width
+        return [list(self.grid[y * width:(y + 1) * width]) for y in range(self.height)]
+
+
+def parse_level(text, name='<nivel>'):
+    """Parsea el texto de un nivel y lo compila a capas planas"""
+    section = None
+    rows = []
+    sprites = []
+    enemies = []
+    player_start = None
+
+    for line_number, raw in enumerate(text.splitlines(), 1):
+        line = raw.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            section = line[1:-1].strip().lower()
+            if section not in ('map', 'sprites', 'enemies', 'player'):
+                raise ValueError(f"{name}:{line_number}: sección desconocida [{section}]")
+            continue
+        try:
+            if section == 'map':
+                rows.append([0 if c == '.' else CELL_CHARS.index(c.upper()) for c in line])
+            elif section in ('sprites', 'enemies'):
+                x, y, kind = line.split()
+                (sprites if section == 'sprites' else enemies).append((float(x), float(y), kind))
+            elif section == 'player':
+                x, y, angle = line.split()
+                player_start = (float(x), float(y), float(angle))
+            else:
+                raise ValueError("línea fuera de una sección")
+        except ValueError as e:
+            raise ValueError(f"{name}:{line_number}: {e}") from None
+
+    if not rows:
+        raise ValueError(f"{name}: falta la sección [map]")
+    width = len(rows[0])
+    height = len(rows)
+    if any(len(row) != width for row in rows):
+        raise ValueError(f"{name}: todas las filas del mapa deben tener {width} celdas")
+    if width > MAX_LEVEL_SIZE or height > MAX_LEVEL_SIZE:
+        raise ValueError(f"{name}: el mapa es de {width}x{height}, el máximo es "
+                         f"{MAX_LEVEL_SIZE}x{MAX_LEVEL_SIZE}")
+    if player_start is None:
+        player_start = (width / 2, height / 2, 0.0)
+
+    grid = bytes(cell for row in rows for cell in row)
+    solid = bytes(1 if cell != 0 else 0 for cell in grid)
+    door_index = array('H', [NO_DOOR]) * len(grid)
+    doors = []
+    for i, cell in enumerate(grid):
+        if cell == DOOR_TYPE:
+            if len(doors) >= NO_DOOR:
+                raise ValueError(f"{name}: demasiadas puertas (máximo {NO_DOOR - 1})")
+            door_index[i] = len(doors)
+            doors.append((i % width, i // width))
+    return Level(width, height, grid, solid, door_index, doors, sprites, enemies, player_start)
+
+
+def compiled_path(path):
+    return os.path.splitext(path)[0] + '.lvlc'
+
+
+def _entities(level):
+    return json.dumps({
+        'doors': level.doors,
+        'sprites': level.sprites,
+        'enemies': level.enemies,
+        'player': level.player_start,
+    }).encode('utf-8')
+
+
+def write_compiled(level, path, source_path):
+    """Escribe la versión compilada de un nivel (a un temporal y luego lo reemplaza)"""
+    stat = os.stat(source_path)
+    entities = _entities(level)
+    data_start = _align(HEADER.size + len(entities))
+    door_bytes = array('H', level.door_index)
+    if sys.byteorder != 'little':
+        door_bytes.byteswap()
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, LEVEL_VERSION, level.width, level.height,
+                            stat.st_mtime_ns, stat.st_size, _file_sha1(source_path), len(entities)))
+        f.write(entities)
+        f.write(b'\0' * (data_start - HEADER.size - len(entities)))
+        for layer in (bytes(level.grid), bytes(level.solid), door_bytes.tobytes()):
+            f.write(layer)
+            f.write(b'\0' * (_align(len(layer)) - len(layer)))
+    os.replace(tmp_path, path)
+
+
+def layer_offsets(width, height, entities_len):
+    """Posición en el archivo compilado de las capas grid, solid y door_index"""
+    cells = width * height
+    grid_start = _align(HEADER.size + entities_len)
+    solid_start = grid_start + _align(cells)
+    doors_start = solid_start + _align(cells)
+    return grid_start, solid_start, doors_start
+
+
+def open_compiled(path, source_path):
+    """Mapea un nivel compilado si está al día con su fuente; retorna el Level o None"""
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        f.close()
+        return None
+    try:
+        magic, version, width, height, mtime_ns, size, sha1, entities_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != LEVEL_VERSION:
+            raise ValueError("versión incompatible")
+        stat = os.stat(source_path)
+        if stat.st_size != size or (stat.st_mtime_ns != mtime_ns and _file_sha1(source_path) != sha1):
+            raise ValueError("fuente modificada")
+        grid_start, solid_start, doors_start = layer_offsets(width, height, entities_len)
+        if len(data) != doors_start + _align(width * height * 2):
+            raise ValueError("archivo truncado")
+        entities = json.loads(data[HEADER.size:HEADER.size + entities_len].decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        data.close()
+        f.close()
+        return None
+
+    cells = width * height
+    view = memoryview(data)
+    door_index = view[doors_start:doors_start + cells * 2]
+    if sys.byteorder == 'little':
+        door_index = door_index.cast('H')
+    else:
+        door_index = array('H', door_index)
+        door_index.byteswap()
+
+    level = Level(
+        width, height,
+        view[grid_start:grid_start + cells],
+        view[solid_start:solid_start + cells],
+        door_index,
+        [tuple(door) for door in entities['doors']],
+        [tuple(sprite) for sprite in entities['sprites']],
+        [tuple(enemy) for enemy in entities['enemies']],
+        tuple(entities['player']),
+    )
+    level._file = f
+    level._map = data
+    return level
+
+
+def load_level(path):
+    """Carga un nivel: desde su versión compilada si está al día, si no parseando el texto"""
+    compiled = compiled_path(path)
+    level = open_compiled(compiled, path)
+    if level is not None:
+        return level
+
+    with open(path, encoding='utf-8') as f:
+        level = parse_level(f.read(), os.path.basename(path))
+    try:
+        write_compiled(level, compiled, path)
+    except OSError as e:
+        print(f"  ! No se pudo guardar el nivel compilado: {e}")
+    return level
+
+
+if __name__ == "__main__":
+    for level_path in sys.argv[1:]:
+        loaded = load_level(level_path)
+        print(f"  ✓ {level_path}: {loaded.width}x{loaded.height}, {len(loaded.doors)} puertas, "
+              f"{len(loaded.sprites)} sprites, {len(loaded.enemies)} enemigos")
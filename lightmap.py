@@ -0,0 +1,173 @@
+"""
+Luz precalculada de los sprites que emiten luz (settings.BAKED_LIGHTING).
+
+Al cargar el nivel se calcula para cada celda el nivel de luz (0 a LIGHT_LEVELS - 1)
+que recibe de los sprites LIGHT_SPRITES: cada luz alumbra las celdas a menos de
+LIGHT_RADIUS cuyo centro ve sin paredes de por medio (recorrido de la rejilla como
+el DDA), con intensidad lineal en la distancia; si varias luces llegan a una celda
+gana la más intensa. El resultado es un byte por celda.
+
+Al dibujar, la cara de pared que ve cada rayo toma la luz de la celda desde la que
+se la ve y el nivel se suma a la variante de sombreado (ver texture_manager.shade_variant),
+así que aplicar la luz es una consulta de tabla como el sombreado por distancia.
+
+Las puertas dejan pasar la luz cuando se pueden atravesar (Door.is_passable, la
+misma máscara que las colisiones). Cuando una cambia, solo se recalculan las celdas
+al alcance de las luces que la tienen cerca.
+"""
+import math
+import time
+import settings
+import map as game_map
+from map import world_version
+
+
+class Lightmap:
+    def __init__(self, doors, level=None):
+        level = level or game_map.LEVEL
+        self.width = level.width
+        self.height = level.height
+        self.grid = level.grid
+        self.radius = settings.LIGHT_RADIUS
+        self.lights = [(x, y) for x, y, kind in level.sprites if kind in settings.LIGHT_SPRITES]
+        self.door_cells = {}  # (x, y) -> puerta (la primera gana, como en get_door_at_position)
+        for door in reversed(doors or []):
+            self.door_cells[(door.x, door.y)] = door
+        self.open_doors = {cell for cell, door in self.door_cells.items() if door.is_passable()}
+        self.levels = bytearray(self.width * self.height)  # Nivel de luz de cada celda (y * ancho + x)
+        self.version = world_version()
+        self.cells_baked = 0  # Celdas calculadas en el último bake
+
+        start = time.perf_counter()
+        self.bake()
+        if self.lights:
+            lit = sum(1 for value in self.levels if value)
+            print(f"  ✓ Luz precalculada: {len(self.lights)} luces, {lit} celdas iluminadas "
+                  f"en {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # ---- Cálculo ----
+
+    def _blocks(self, x, y):
+        """True si la celda (dentro del mapa) no deja pasar la luz"""
+        return self.grid[y * self.width + x] != 0 and (x, y) not in self.open_doors
+
+    def _visible(self, x0, y0, x1, y1):
+        """True si no hay celdas que tapen la luz entre dos puntos (sin contar las de los extremos)"""
+        map_x, map_y = int(x0), int(y0)
+        end_x, end_y = int(x1), int(y1)
+        dx = x1 - x0
+        dy = y1 - y0
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        delta_x = abs(1 / dx) if dx else math.inf
+        delta_y = abs(1 / dy) if dy else math.inf
+        side_x = ((map_x + 1 - x0) if dx > 0 else (x0 - map_x)) * delta_x if dx else math.inf
+        side_y = ((map_y + 1 - y0) if dy > 0 else (y0 - map_y)) * delta_y if dy else math.inf
+        for _ in range(abs(end_x - map_x) + abs(end_y - map_y)):
+            if side_x < side_y:
+                side_x += delta_x
+                map_x += step_x
+            else:
+                side_y += delta_y
+                map_y += step_y
+            if map_x == end_x and map_y == end_y:
+                return True
+            if self._blocks(map_x, map_y):
+                return False
+        return True
+
+    def _cells_in_range(self, light):
+        """Celdas (x, y) cuyo centro está a menos de LIGHT_RADIUS de una luz"""
+        lx, ly = light
+        radius = self.radius
+        for y in range(max(0, int(ly - radius)), min(self.height, int(ly + radius) + 1)):
+            for x in range(max(0, int(lx - radius)), min(self.width, int(lx + radius) + 1)):
+                if math.hypot(x + 0.5 - lx, y + 0.5 - ly) < radius:
+                    yield x, y
+
+    def bake(self, lights=None, cells=None):
+        """
+        Calcula la luz de las celdas que alcanzan las luces dadas (todas por defecto);
+        con cells solo se recalculan esas celdas (que se ponen a 0 antes)
+        """
+        lights = self.lights if lights is None else lights
+        levels = self.levels
+        width = self.width
+        top = settings.LIGHT_LEVELS - 1
+        radius = self.radius
+        if cells is None:
+            levels[:] = bytes(len(levels))
+        else:
+            for x, y in cells:
+                levels[y * width + x] = 0
+        baked = 0
+        for light in lights:
+            lx, ly = light
+            for x, y in self._cells_in_range(light):
+                if cells is not None and (x, y) not in cells:
+                    continue
+                i = y * width + x
+                if self.grid[i] != 0 and (x, y) not in self.door_cells:
+                    continue  # Las paredes toman la luz de la celda desde la que se ven
+                baked += 1
+                cx, cy = x + 0.5, y + 0.5
+                level = int((1 - math.hypot(cx - lx, cy - ly) / radius) * top + 0.5)
+                if level > levels[i] and self._visible(lx, ly, cx, cy):
+                    levels[i] = level
+        self.cells_baked = baked
+
+    def update(self):
+        """Recalcula la luz alrededor de las puertas que cambiaron de estado desde el último frame"""
+        version = world_version()
+        if version == self.version:
+            return
+        self.version = version
+        open_doors = {cell for cell, door in self.door_cells.items() if door.is_passable()}
+        changed = open_doors ^ self.open_doors
+        self.open_doors = open_doors
+        if not changed or not self.lights:
+            return
+
+        # Luces a las que la puerta puede tapar o destapar alguna celda, y luces que
+        # comparten celdas con ellas (su luz también cuenta en esas celdas)
+        radius = self.radius
+        affected = [light for light in self.lights
+                    if any(math.hypot(x + 0.5 - light[0], y + 0.5 - light[1]) < radius + 1 for x, y in changed)]
+        if not affected:
+            return
+        cells = set()
+        for light in affected:
+            cells.update(self._cells_in_range(light))
+        neighbours = [light for light in self.lights
+                      if any(math.hypot(light[0] - ax, light[1] - ay) < 2 * radius for ax, ay in affected)]
+        self.bake(neighbours, cells)
+
+    # ---- Consultas ----
+
+    def light_at(self, x, y):
+        """Nivel de luz de una celda (0 fuera del mapa)"""
+        x = int(x)
+        y = int(y)
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return 0
+        return self.levels[y * self.width + x]
+
+    def ray_lights(self, rays):
+        """Nivel de luz de la cara de pared que ve cada rayo (la celda anterior al choque)"""
+        levels = self.levels
+        width = self.width
+        height = self.height
+        cos, sin = math.cos, math.sin
+        lights = []
+        for ray in rays:
+            x, y = ray['hit_pos']
+            if ray['wall_type']:
+                if ray['side'] == 'vertical':
+                    x += 1 if cos(ray['angle']) < 0 else -1
+                else:
+                    y += 1 if sin(ray['angle']) < 0 else -1
+            if 0 <= x < width and 0 <= y < height:
+                lights.append(levels[y * width + x])
+            else:
+                lights.append(0)
+        return lights
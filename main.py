@@ -1,24 +1,39 @@
+import time
+START_TIME = time.perf_counter()  # Para medir el tiempo hasta el primer frame
+
 import pygame
 import sys
 import math
+import os
+import random
+from collections import deque
 import settings
+import kernels
+import game_clock
 from player import Player
 from raycasting import RayCaster
 from renderer import Renderer
-from texture_manager import TextureManager
+from texture_manager import TextureManager, used_wall_ids
+from asset_cache import AssetCache
+from audio_bank import AudioBank
+from asset_loader import AssetLoader
 from sound_manager import SoundManager
 from sprite import Sprite
-from door import Door
+from door import Door, DoorScheduler
 from hud import HUD
 from enemy import Guard
 from weapon import Weapon
-from map import SPRITE_POSITIONS, DOOR_POSITIONS, ENEMY_POSITIONS, is_door, get_door_at_position
+from map import LEVEL, LEVEL_PATH, WORLD_MAP, PLAYER_START, SPRITE_POSITIONS, DOOR_POSITIONS, ENEMY_POSITIONS, is_door, get_door_at_position, world_version
 
 
 class Game:
     def __init__(self):
-        # Inicializar PyGame
-        pygame.init()
+        # Inicializar PyGame (con el arranque diferido el mixer se inicia con el primer sonido)
+        if settings.DEFERRED_INIT:
+            pygame.display.init()
+            pygame.font.init()
+        else:
+            pygame.init()
         
         # Crear ventana
         self.screen = pygame.display.set_mode(
@@ -29,17 +44,86 @@ class Game:
         # Reloj para controlar FPS
         self.clock = pygame.time.Clock()
         
+        # Grabación/reproducción de la entrada: la simulación usa la hora fijada en
+        # cada tick (también al crear puertas y enemigos) y random sembrado por tick
+        self.input_recorder = None
+        self.input_replay = None
+        if settings.INPUT_REPLAY:
+            from input_log import InputReplay
+            self.input_replay = InputReplay(settings.INPUT_REPLAY)
+            game_clock.set_ticks(self.input_replay.start_ms)
+        elif settings.INPUT_RECORD:
+            from input_log import InputRecorder
+            self.input_recorder = InputRecorder(settings.INPUT_RECORD, pygame.time.get_ticks())
+            game_clock.set_ticks(self.input_recorder.start_ms)
+        self.deterministic = bool(self.input_replay or self.input_recorder)
+        self.tick_input = None   # TickInput del registro que se está reproduciendo
+        self.tick_seed = 0       # Semilla de random del tick
+        self.tick_events = []    # Eventos del tick a grabar [(tipo, valor)]
+        
+        # Caché de assets preprocesados (se reconstruye sola si está desactualizada)
+        self.asset_cache = None
+        if settings.ASSET_CACHE:
+            self.asset_cache = AssetCache()
+            self.asset_cache.open()
+        # Banco de audio (se abre al inicializar el mixer, que fija el formato)
+        self.audio_bank = AudioBank() if settings.AUDIO_BANK else None
+        
+        # Mundo por trozos: cargar los chunks alrededor del jugador antes del primer frame
+        if settings.STREAMING_WORLD:
+            WORLD_MAP.update(PLAYER_START[0], PLAYER_START[1], wait=True)
+        
+        # Texturas de pared que usa el mapa (el resto se carga bajo demanda)
+        if not settings.LAZY_TEXTURES:
+            wall_ids = None
+        elif settings.STREAMING_WORLD:
+            wall_ids = WORLD_MAP.resident_wall_ids()
+        else:
+            wall_ids = used_wall_ids(WORLD_MAP)
+        
+        # Decodificar en hilos todo lo que no esté en la caché
+        self.asset_loader = AssetLoader()
+        pending = [
+            path for path in TextureManager.asset_paths(wall_ids) + HUD.asset_paths() + [Weapon.SHEET_FILE]
+            if not (self.asset_cache and self.asset_cache.has_source(path))
+        ]
+        self.asset_loader.prefetch_images(pending)
+        if not settings.DEFERRED_INIT:
+            pygame.mixer.init()
+            if self.audio_bank:
+                self.audio_bank.open(pygame.mixer.get_init())
+            self.asset_loader.prefetch_sounds([
+                path for path in SoundManager.asset_paths()
+                if not (self.audio_bank and self.audio_bank.has_source(path))
+            ])
+        
         # Inicializar componentes
-        self.texture_manager = TextureManager()
-        self.texture_manager.load_textures()
+        self.texture_manager = TextureManager(self.asset_cache, self.asset_loader)
+        self.texture_manager.load_textures(wall_ids)
         
-        self.sound_manager = SoundManager()
-        self.sound_manager.play('guten_tag')  # Sonido de bienvenida
+        self.sound_manager = SoundManager(self.audio_bank, self.asset_loader, settings.DEFERRED_INIT)
         
-        self.player = Player(8.0, 8.0, 0, self.sound_manager)  # Posición inicial en el centro del mapa
-        self.raycaster = RayCaster()
-        self.renderer = Renderer(self.screen, self.texture_manager)
-        self.hud = HUD(self.screen)
+        self.player = Player(*PLAYER_START, self.sound_manager)  # Posición inicial definida en el nivel
+        self.sound_manager.set_listener(self.player)
+        # Los módulos paralelos solo se importan si están activados
+        if settings.PARALLEL_RAYCASTING and settings.STREAMING_WORLD:
+            print("Mundo por trozos: usando el raycaster en serie")
+            self.raycaster = RayCaster()
+        elif settings.PARALLEL_RAYCASTING:
+            from parallel_raycasting import ParallelRayCaster
+            self.raycaster = ParallelRayCaster(settings.RAYCAST_WORKERS)
+        else:
+            self.raycaster = RayCaster()
+        self.renderer = None
+        if settings.PARALLEL_RENDERING:
+            from parallel_renderer import ParallelRenderer, HAS_NUMPY
+            if HAS_NUMPY:
+                self.renderer = ParallelRenderer(self.screen, self.texture_manager, settings.RENDER_WORKERS)
+            else:
+                print("NumPy no disponible: usando el renderer en serie")
+        if self.renderer is None:
+            self.renderer = Renderer(self.screen, self.texture_manager)
+        self.hud = HUD(self.screen, self.texture_manager, settings.DEFERRED_INIT)
         self.weapon = Weapon(self.screen, self.player, self.texture_manager)  # Sistema HUD
         
         # Crear puertas
@@ -48,6 +132,9 @@ class Game:
             x, y = door_pos
             door = Door(x, y)
             self.doors.append(door)
+        # Solo se actualizan las puertas en movimiento; el auto-cierre va por temporizador
+        self.door_scheduler = DoorScheduler(self.doors)
+        self.ray_key = None  # (posición, ángulo, versión del mundo) de los últimos rayos lanzados
         
         # Asignar puertas al jugador, raycaster y renderer
         self.player.set_doors(self.doors)
@@ -71,15 +158,106 @@ class Game:
                  guard = Guard(x, y, self.player, self.raycaster, self.texture_manager, self.sound_manager)
                  self.enemies.append(guard)
         
-        # Configurar mouse
+        # IA por lotes: el estado de los enemigos pasa a arrays NumPy
+        self.enemy_system = None
+        if settings.BATCHED_ENEMIES:
+            from enemy_system import EnemySystem, HAS_NUMPY
+            if HAS_NUMPY:
+                self.enemy_system = EnemySystem(self.enemies, self.player, self.raycaster)
+            else:
+                print("NumPy no disponible: actualizando los enemigos uno a uno")
+        self.ai_scheduler = None
+        if settings.AI_LOD:
+            from ai_scheduler import AIScheduler
+            self.ai_scheduler = AIScheduler(self.enemies, self.player, self.enemy_system)
+            if self.deterministic:
+                self.ai_scheduler.budget_ms = None
+        
+        # Conjuntos potencialmente visibles: culling de sprites, enemigos, IA y sonidos
+        self.pvs = None
+        if settings.PVS:
+            from pvs import load_pvs, build_limit
+            self.pvs = load_pvs(LEVEL, LEVEL_PATH, build_limit())
+            self.renderer.pvs = self.pvs
+            self.sound_manager.pvs = self.pvs
+            if self.ai_scheduler:
+                self.ai_scheduler.pvs = self.pvs
+        
+        # Empaquetar todas las texturas cargadas (paredes, sprites, armas) en el atlas
+        self.texture_manager.build_atlas()
+        self.texture_manager.build_mipmaps()
+        
+        # Configurar mouse (oculto y capturado: SDL entrega movimiento relativo sin límites)
         pygame.mouse.set_visible(False)
         pygame.event.set_grab(True)
+        pygame.mouse.get_rel()  # Descartar el movimiento previo a la captura
+        self.mouse_relative = settings.MOUSE_MODE == 'relative' or self.deterministic
+        self.mouse_rel = 0         # Movimiento horizontal acumulado desde el último tick
+        self.mouse_time = None     # Cuándo llegó el primer movimiento aún no aplicado
+        self.latency_start = None  # Entrada del giro que mostrará el próximo flip
+        self.input_latency = deque(maxlen=3600)  # Latencias entrada→pantalla (s) de los últimos frames con giro
         
         self.running = True
         
+    def finish_startup(self):
+        """Tras el primer frame: sonidos, informes de carga y escritura de la caché"""
+        print(f"  ✓ Primer frame a los {(time.perf_counter() - START_TIME) * 1000:.0f} ms")
+        self.sound_manager.play('guten_tag')  # Sonido de bienvenida (carga los sonidos si se difirió)
+        
+        # Tiempos de decodificación (el pool sigue vivo para las texturas bajo demanda)
+        self.asset_loader.report()
+        
+        # Reescribir la caché si faltaba algo y liberar el mapeo
+        if self.asset_cache:
+            self.asset_cache.report()
+            self.asset_cache.save()
+            # Las cargas bajo demanda ya no pasan por la caché
+            self.texture_manager.asset_cache = None
+        
+    def report_latency(self):
+        """Imprime la latencia entre el movimiento del mouse y el frame que lo muestra"""
+        if not self.input_latency:
+            return
+        samples = sorted(self.input_latency)
+        mean = sum(samples) / len(samples) * 1000
+        p95 = samples[int(len(samples) * 0.95)] * 1000
+        print(f"  ✓ Latencia mouse→pantalla ({settings.MOUSE_MODE}): media {mean:.1f} ms, "
+              f"p95 {p95:.1f} ms en {len(samples)} frames")
+        
+    def begin_tick(self):
+        """Fija la hora y la semilla del tick; retorna sus eventos (del registro al reproducir)"""
+        if self.input_replay:
+            pygame.event.pump()  # La ventana sigue respondiendo; su entrada se ignora
+            self.tick_input = self.input_replay.next_tick()
+            if self.tick_input is None:
+                return []
+            game_clock.set_ticks(self.tick_input.ms)
+            random.seed(self.tick_input.seed)
+            self.mouse_rel = self.tick_input.mouse_x
+            return self.tick_input.pygame_events()
+        events = pygame.event.get()
+        if self.input_recorder:
+            from input_log import encode_event
+            game_clock.set_ticks(pygame.time.get_ticks())
+            self.tick_seed = int.from_bytes(os.urandom(4), 'little')
+            random.seed(self.tick_seed)
+            self.tick_events = [code for code in map(encode_event, events) if code is not None]
+        return events
+        
+    def finish_input_log(self):
+        """Cierra la grabación o verifica la reproducción; retorna False si el estado final difiere"""
+        if not (self.input_recorder or self.input_replay):
+            return True
+        from input_log import state_digest
+        digest = state_digest(self)
+        if self.input_recorder:
+            self.input_recorder.finish(digest)
+            return True
+        return self.input_replay.verify(digest)
+        
     def handle_events(self):
         """Maneja eventos de PyGame"""
-        for event in pygame.event.get():
+        for event in self.begin_tick():
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.KEYDOWN:
@@ -87,6 +265,10 @@ class Game:
                     self.running = False
                 elif event.key == pygame.K_SPACE:
                     self.try_open_door()
+                # F2 alterna entre kernels y camino de referencia
+                elif event.key == pygame.K_F2:
+                    kernels.set_mode('reference' if kernels.kernels_enabled() else 'kernel')
+                    print(f"Kernels: {kernels.get_mode()} (numba: {kernels.HAS_NUMBA})")
                 # Cambio de arma con teclas numéricas
                 elif event.key in [pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4]:
                     weapon_index = event.key - pygame.K_1
@@ -98,6 +280,11 @@ class Game:
                 # Tecla E para recolectar ítems (para futuro)
                 elif event.key == pygame.K_e:
                     pass  # Aquí se puede agregar lógica de recolección
+            # Movimiento del mouse: se acumula y lo consume el siguiente tick
+            elif event.type == pygame.MOUSEMOTION and self.mouse_relative:
+                if self.mouse_time is None:
+                    self.mouse_time = time.perf_counter()
+                self.mouse_rel += event.rel[0]
             # Disparo con clic del mouse
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Clic izquierdo
@@ -105,6 +292,10 @@ class Game:
                     if self.player.shoot():
                          self.weapon.shoot()
                          self.check_shoot_hit(damage)
+                         # El disparo despierta a los enemigos dormidos que lo oyen
+                         if self.ai_scheduler:
+                             px, py = self.player.get_position()
+                             self.ai_scheduler.noise(px, py, settings.AI_NOISE_RADIUS)
                 # Cambio de arma con rueda del mouse
                 elif event.button == 4:  # Rueda hacia arriba
                     self.player.change_weapon(-1)
@@ -152,7 +343,7 @@ class Game:
         if found_door:
             if not found_door.is_open and not found_door.is_opening:
                 found_door.open()
-                self.sound_manager.play('door')
+                self.sound_manager.play('door', (found_door.x + 0.5, found_door.y + 0.5))
 
     def check_shoot_hit(self, damage):
         """Verifica si el disparo impactó a un enemigo"""
@@ -197,29 +388,57 @@ class Game:
         dt = 1
         
         # Obtener teclas presionadas
-        keys = pygame.key.get_pressed()
+        keys = self.tick_input.keys() if self.input_replay else pygame.key.get_pressed()
+        if self.input_recorder:
+            self.input_recorder.record(game_clock.ticks(), self.tick_seed, keys, self.mouse_rel, self.tick_events)
         
         # Actualizar jugador (teclado y mouse)
         self.player.move(keys)
-        self.player.handle_mouse(dt)
+        if self.mouse_relative:
+            turned = self.player.handle_mouse(dt, self.mouse_rel)
+            input_time = self.mouse_time
+            self.mouse_rel = 0
+            self.mouse_time = None
+        else:
+            input_time = time.perf_counter()
+            turned = self.player.handle_mouse(dt)
+        if turned and self.latency_start is None:
+            self.latency_start = input_time
         
         # Actualizar puertas
-        for door in self.doors:
-            door.update()
+        self.door_scheduler.update()
             
         # Actualizar enemigos
-        for enemy in self.enemies:
-            enemy.update()
+        if self.ai_scheduler:
+            self.ai_scheduler.update(self.raycaster.get_rays())
+        elif self.enemy_system:
+            self.enemy_system.update()
+        else:
+            for enemy in self.enemies:
+                enemy.update()
             
         self.weapon.update()
         
         # Lanzar rayos
         player_x, player_y = self.player.get_position()
         player_angle = self.player.get_angle()
-        self.raycaster.cast_rays(player_x, player_y, player_angle)
+        if settings.STREAMING_WORLD:
+            WORLD_MAP.update(player_x, player_y, wait=self.deterministic)
+        # Si ni la cámara ni el mundo ni ninguna puerta cambiaron, los rayos del frame anterior siguen valiendo
+        ray_key = (player_x, player_y, player_angle, world_version(), self.door_scheduler.moves)
+        if ray_key != self.ray_key:
+            self.raycaster.cast_rays(player_x, player_y, player_angle)
+            self.ray_key = ray_key
+        
+        # Cargar/descargar texturas de pared según lo que ven los rayos
+        if settings.LAZY_TEXTURES:
+            self.texture_manager.update_residency(self.raycaster.get_rays())
         
-        # Actualizar distancias de sprites
+        # Actualizar distancias de sprites (los de fuera del PVS no se dibujan)
+        sees = self.pvs.viewer(player_x, player_y) if self.pvs else None
         for sprite in self.sprites:
+            if sees and not sees(sprite.x, sprite.y):
+                continue
             sprite.calculate_distance(player_x, player_y)
             sprite.get_sprite_projection(
                 player_x, player_y, player_angle,
@@ -256,6 +475,9 @@ class Game:
         
         # Actualizar pantalla
         pygame.display.flip()
+        if self.latency_start is not None:
+            self.input_latency.append(time.perf_counter() - self.latency_start)
+            self.latency_start = None
     
     def run(self):
         """Loop principal del juego"""
@@ -268,12 +490,18 @@ class Game:
         print("  1/2/3/4 - Cambiar arma")
         print("  Rueda del Mouse - Cambiar arma")
         print("  ESPACIO - Abrir puerta")
+        print("  F2 - Alternar kernels / camino de referencia")
         print("  ESC - Salir")
         print("\n¡Iniciando juego!")
         
+        first_frame = True
+        loop_start = time.perf_counter()
         while self.running:
             # Manejar eventos
             self.handle_events()
+            # Fin del registro reproducido: no queda entrada para otro tick
+            if self.input_replay and self.tick_input is None:
+                break
             
             # Actualizar
             self.update()
@@ -281,12 +509,35 @@ class Game:
             # Renderizar
             self.render()
             
-            # Controlar FPS
-            self.clock.tick(settings.FPS)
+            if first_frame:
+                first_frame = False
+                self.finish_startup()
+            
+            # Controlar FPS (la reproducción va tan rápido como puede)
+            self.clock.tick(0 if self.input_replay else settings.FPS)
+        
+        self.report_latency()
+        replay_ok = self.finish_input_log()
+        if self.input_replay:
+            elapsed = time.perf_counter() - loop_start
+            ticks = max(self.input_replay.position, 1)
+            print(f"  ✓ Reproducción: {self.input_replay.position} ticks en {elapsed:.2f} s "
+                  f"({elapsed / ticks * 1000:.2f} ms/tick)")
+        
+        # Detener trabajadores del raycaster y del renderer paralelos
+        if hasattr(self.raycaster, 'close'):
+            self.raycaster.close()
+        if hasattr(self.renderer, 'close'):
+            self.renderer.close()
+        self.asset_loader.shutdown()
+        if self.audio_bank:
+            self.audio_bank.close()
+        if settings.STREAMING_WORLD:
+            WORLD_MAP.close()
         
         # Cerrar PyGame
         pygame.quit()
-        sys.exit()
+        sys.exit(0 if replay_ok else 1)
 
 
 if __name__ == "__main__":
@@ -1,93 +1,137 @@
+import os
 import settings
+from level import load_level
+
+# Nivel actual (ver level.py para el formato de los archivos de nivel)
+LEVEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), settings.LEVEL_FILE)
+LEVEL = load_level(LEVEL_PATH)
 
 # Mapa del juego (0 = vacío, 1-6 = diferentes texturas de paredes, 7 = puerta)
-WORLD_MAP = [
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 2, 2, 0, 0, 0, 0, 0, 0, 0, 0, 3, 3, 0, 1],
-    [1, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 3, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 5, 5, 0, 0, 0, 0, 0, 0, 0, 0, 6, 6, 0, 1],
-    [1, 0, 5, 5, 0, 0, 0, 0, 0, 0, 0, 0, 6, 6, 0, 1],
-    [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 5, 5, 7, 5, 5, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 5, 0, 0, 0, 5, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 5, 0, 0, 0, 5, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 5, 0, 0, 0, 5, 0, 0, 0, 0, 0, 1],
-    [1, 0, 0, 0, 0, 5, 5, 5, 5, 5, 0, 0, 0, 0, 0, 1],
-    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
-]
+# Con STREAMING_WORLD es un ChunkedWorld que solo tiene en memoria los chunks cercanos
+if settings.STREAMING_WORLD:
+    from world_stream import ChunkedWorld
+    WORLD_MAP = ChunkedWorld(LEVEL, LEVEL_PATH)
+else:
+    WORLD_MAP = LEVEL.rows()
 
 # Dimensiones del mapa
-MAP_WIDTH = len(WORLD_MAP[0])
-MAP_HEIGHT = len(WORLD_MAP)
+MAP_WIDTH = LEVEL.width
+MAP_HEIGHT = LEVEL.height
 
-# Posiciones de puertas (x, y)
-# Habitación cerrada con una sola puerta en (7, 10)
-DOOR_POSITIONS = [
-    (7, 10),  # Entrada a la habitación secreta
-]
+# Posiciones de puertas (x, y): las celdas de tipo 7
+DOOR_POSITIONS = LEVEL.doors
 
 # Posiciones de sprites (x, y, tipo)
 # tipo: 'barrel', 'pillar', 'greenlight'
-SPRITE_POSITIONS = [
-    (3.5, 3.5, 'barrel'),
-    (2.5, 2.5, 'pillar'),
-    (10.5, 3.5, 'barrel'),
-    (12.5, 5.5, 'pillar'),
-    (4.5, 2.5, 'greenlight'),
-    # Nuevos sprites
-    (1.5, 1.5, 'greenlight'),
-    (14.5, 1.5, 'barrel'),
-    (1.5, 14.5, 'barrel'),
-    (14.5, 14.5, 'greenlight'),
-    (5.5, 5.5, 'pillar'),
-    # Sprites dentro de la habitación secreta
-    (7.5, 12.5, 'greenlight'),  # Luz verde en el centro de la habitación
-    (6.5, 11.5, 'barrel'),      # Barril izquierdo
-    (8.5, 11.5, 'barrel'),      # Barril derecho
-    (7.5, 13.5, 'pillar'),      # Columna al fondo
-]
+SPRITE_POSITIONS = LEVEL.sprites
 
 # Posiciones de enemigos (x, y, tipo)
-ENEMY_POSITIONS = [
-    (10.5, 10.5, 'guard'), # Hallway guard
-    (7.5, 8.5, 'guard'),  # Near door
-    (5.5, 4.5, 'guard'),  # Room guard
-    (13.5, 13.5, 'guard') # Back room guard
-]
+ENEMY_POSITIONS = LEVEL.enemies
 
+# Posición y ángulo iniciales del jugador
+PLAYER_START = LEVEL.player_start
 
-def is_wall(x, y, doors=None):
-    """Verifica si una posición contiene una pared"""
+
+def bordered_layer(cells, width, height, border):
+    """Copia una capa plana (ancho * alto) añadiendo alrededor un borde de una celda con el valor border"""
+    stride = width + 2
+    out = bytearray([border]) * (stride * (height + 2))
+    for y in range(height):
+        start = (y + 1) * stride + 1
+        out[start:start + width] = cells[y * width:(y + 1) * width]
+    return out
+
+
+def make_grid(world_map):
+    """Rejilla plana con borde sólido (tipo 1) de un mapa en filas; retorna (rejilla, stride)"""
+    width = len(world_map[0])
+    height = len(world_map)
+    cells = b''.join(bytes(row) for row in world_map)
+    return bordered_layer(cells, width, height, 1), width + 2
+
+
+# Rejilla plana con un borde de paredes: la celda (x, y) está en GRID[(y + 1) * GRID_STRIDE + x + 1].
+# Los bucles del DDA pueden avanzar sin comprobar límites porque siempre chocan con el borde.
+# SOLID es 1 si la celda bloquea el paso; las puertas pasan a 0 mientras se pueden atravesar.
+# Es la única fuente de verdad del paso: Door la actualiza en cuanto cambia open_amount (ver
+# set_door_passable) y la leen is_wall, la línea de visión y EnemySystem. Con el mundo por
+# trozos no hay rejilla completa (GRID y SOLID son None) y las puertas abiertas van en un conjunto.
+GRID_STRIDE = MAP_WIDTH + 2
+GRID = None
+SOLID = None
+if not settings.STREAMING_WORLD:
+    GRID = bordered_layer(LEVEL.grid, MAP_WIDTH, MAP_HEIGHT, 1)
+    SOLID = bordered_layer(LEVEL.solid, MAP_WIDTH, MAP_HEIGHT, 1)
+_passable_doors = set()  # (x, y) de las puertas abiertas (para el mundo por trozos)
+
+# Versión del estado del mundo: sube cada vez que cambia la geometría (una puerta pasa a
+# poder o no poder atravesarse, no en cada frame de su animación). Las cachés de rayos,
+# luz o minimapa la guardan y se invalidan al cambiar.
+_world_version = 0
+
+
+def world_version():
+    # En el mundo por trozos también cuenta la carga/descarga de chunks
+    return _world_version + getattr(WORLD_MAP, 'version', 0)
+
+
+def bump_world_version():
+    global _world_version
+    _world_version += 1
+
+
+def set_door_passable(x, y, passable):
+    """
+    Actualiza la solidez de una puerta cuando cruza el umbral de paso (Door.is_passable).
+    Solo cambian las celdas de puerta del mapa (las Door de otros niveles se ignoran).
+    """
     if x < 0 or x >= MAP_WIDTH or y < 0 or y >= MAP_HEIGHT:
-        return True
-    
-    wall_type = WORLD_MAP[int(y)][int(x)]
-    
-    # Si es una puerta (7), verificar si está abierta
-    if wall_type == 7 and doors:
-        door = get_door_at_position(int(x), int(y), doors)
-        if door and door.is_passable():
+        return
+    if SOLID is None:
+        if passable:
+            _passable_doors.add((x, y))
+        else:
+            _passable_doors.discard((x, y))
+        return
+    i = (y + 1) * GRID_STRIDE + x + 1
+    if GRID[i] == 7:
+        SOLID[i] = 0 if passable else 1
+
+
+def is_wall(x, y, doors=None):
+    """
+    Verifica si una posición contiene una pared; con doors las puertas que se pueden
+    atravesar no cuentan (según SOLID, no según la lista). Sin comprobar límites: x e y
+    deben estar dentro del mapa o a menos de una celda de él (el borde de GRID).
+    """
+    if SOLID is None:
+        # Mundo por trozos: el chunk responde 1 fuera del mapa o si no está cargado
+        if y < 0 or y >= MAP_HEIGHT:
+            return True
+        x = int(x)
+        y = int(y)
+        wall_type = WORLD_MAP[y][x]
+        if wall_type == 7 and doors and (x, y) in _passable_doors:
             return False
-    
-    return wall_type != 0
+        return wall_type != 0
+    # int(v + 1) es floor(v) + 1 desde -1: la franja [-1, 0) cae en el borde, como fuera del mapa
+    return (SOLID if doors else GRID)[int(y + 1) * GRID_STRIDE + int(x + 1)] != 0
 
 
 def get_wall_type(x, y):
     """Obtiene el tipo de pared en una posición"""
     if x < 0 or x >= MAP_WIDTH or y < 0 or y >= MAP_HEIGHT:
         return 1
-    return WORLD_MAP[int(y)][int(x)]
+    if GRID is None:
+        return WORLD_MAP[int(y)][int(x)]
+    return GRID[(int(y) + 1) * GRID_STRIDE + int(x) + 1]
 
 
 def is_door(x, y):
     """Verifica si una posición contiene una puerta"""
     if x < 0 or x >= MAP_WIDTH or y < 0 or y >= MAP_HEIGHT:
         return False
-    return WORLD_MAP[int(y)][int(x)] == 7
+    return get_wall_type(x, y) == 7
 
 
 def get_door_at_position(x, y, doors):
@@ -0,0 +1,169 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import settings
+from raycasting import RayCaster
+import map as game_map
+from map import WORLD_MAP, make_grid
+
+
+# Estado global de cada proceso trabajador (se inicializa una sola vez por proceso)
+_worker_caster = None
+_worker_shms = []
+
+
+class _SharedDoor:
+    """Vista de solo lectura de una puerta cuyo estado vive en memoria compartida"""
+    def __init__(self, x, y, state, index):
+        self.x = x
+        self.y = y
+        self._state = state
+        self._index = index
+
+    @property
+    def is_open(self):
+        return self._state[self._index * 2] != 0.0
+
+    @property
+    def open_amount(self):
+        return self._state[self._index * 2 + 1]
+
+
+def split_strips(count, parts):
+    """Divide [0, count) en parts franjas contiguas de tamaño casi igual: lista de (inicio, fin)"""
+    base, extra = divmod(count, parts)
+    strips = []
+    start = 0
+    for i in range(parts):
+        end = start + base + (1 if i < extra else 0)
+        strips.append((start, end))
+        start = end
+    return strips
+
+
+def _init_worker(grid_name, map_width, map_height, door_name, door_positions):
+    """Adjunta la rejilla y el estado de puertas compartidos y crea el raycaster del proceso"""
+    global _worker_caster, _worker_shms
+
+    grid_shm = shared_memory.SharedMemory(name=grid_name)
+    door_shm = shared_memory.SharedMemory(name=door_name)
+    _worker_shms = [grid_shm, door_shm]
+
+    # La rejilla compartida tiene borde (como map.GRID); las filas interiores como
+    # memoryviews sobre el bloque compartido dan world_map[y][x] sin copiar
+    grid = grid_shm.buf[:(map_width + 2) * (map_height + 2)]
+    stride = map_width + 2
+    world_map = [grid[(y + 1) * stride + 1:(y + 1) * stride + 1 + map_width] for y in range(map_height)]
+
+    state = door_shm.buf.cast('d')
+    doors = [_SharedDoor(x, y, state, i) for i, (x, y) in enumerate(door_positions)]
+
+    _worker_caster = RayCaster()
+    _worker_caster.world_map = world_map
+    _worker_caster.grid = grid
+    _worker_caster.grid_stride = stride
+    _worker_caster.set_doors(doors)
+
+
+def _cast_strip_task(player_x, player_y, player_angle, start, end):
+    """Tarea de un trabajador: lanza los rayos de una franja de columnas"""
+    return _worker_caster.cast_strip(player_x, player_y, player_angle, start, end)
+
+
+class ParallelRayCaster(RayCaster):
+    """
+    RayCaster que reparte las columnas de la pantalla en franjas y las lanza en un
+    pool persistente de procesos. La rejilla del mapa y el estado de las puertas se
+    comparten mediante multiprocessing.shared_memory, así que por frame solo viajan
+    la pose de la cámara (ida) y los rayos de cada franja (vuelta).
+    """
+    def __init__(self, workers=None, min_columns=None, world_map=None):
+        super().__init__()
+        self.workers = workers or settings.RAYCAST_WORKERS
+        if min_columns is None:
+            min_columns = settings.PARALLEL_MIN_COLUMNS
+        self.min_columns = min_columns
+        self.pool = None
+        self.grid_shm = None
+        self.door_shm = None
+        self.door_state = None
+
+        if world_map is not None:
+            self.world_map = world_map
+        self._grid = self.world_map if self.world_map is not None else WORLD_MAP
+        self.map_width = len(self._grid[0])
+        self.map_height = len(self._grid)
+
+        # Copia de la rejilla con borde en memoria compartida (un byte por celda)
+        if self._grid is WORLD_MAP and game_map.GRID is not None:
+            grid = game_map.GRID
+        else:
+            grid, _ = make_grid(self._grid)
+        self.grid_shm = shared_memory.SharedMemory(create=True, size=len(grid))
+        self.grid_shm.buf[:len(grid)] = grid
+
+    def set_doors(self, doors):
+        """Asigna las puertas y (re)crea el pool con su estado compartido"""
+        super().set_doors(doors)
+        self._close_pool()
+
+        if self.door_shm is not None:
+            self.door_state.release()
+            self.door_shm.close()
+            self.door_shm.unlink()
+
+        door_positions = [(door.x, door.y) for door in (doors or [])]
+        # 2 doubles por puerta (is_open, open_amount); mínimo 8 bytes para un bloque válido
+        self.door_shm = shared_memory.SharedMemory(create=True, size=max(8, len(door_positions) * 16))
+        self.door_state = self.door_shm.buf.cast('d')
+        self._sync_doors()
+
+        if self.workers >= 1:
+            self.pool = multiprocessing.Pool(
+                processes=self.workers,
+                initializer=_init_worker,
+                initargs=(self.grid_shm.name, self.map_width, self.map_height,
+                          self.door_shm.name, door_positions)
+            )
+
+    def _sync_doors(self):
+        """Copia el estado actual de las puertas al bloque compartido"""
+        if not self.doors:
+            return
+        state = self.door_state
+        for i, door in enumerate(self.doors):
+            state[i * 2] = 1.0 if door.is_open else 0.0
+            state[i * 2 + 1] = door.open_amount
+
+    def cast_rays(self, player_x, player_y, player_angle):
+        """Lanza los rayos en paralelo, o en serie si no compensa el coste de IPC"""
+        num_rays = settings.NUM_RAYS
+        if self.pool is None or num_rays < self.min_columns:
+            return super().cast_rays(player_x, player_y, player_angle)
+
+        self._sync_doors()
+        tasks = [(player_x, player_y, player_angle, start, end) for start, end in split_strips(num_rays, self.workers)]
+
+        # Ensamblar las franjas en orden en el buffer de rayos
+        self.rays = []
+        for strip in self.pool.starmap(_cast_strip_task, tasks):
+            self.rays.extend(strip)
+        return self.rays
+
+    def _close_pool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def close(self):
+        """Detiene el pool y libera la memoria compartida"""
+        self._close_pool()
+        if self.door_shm is not None:
+            self.door_state.release()
+            self.door_shm.close()
+            self.door_shm.unlink()
+            self.door_shm = None
+        if self.grid_shm is not None:
+            self.grid_shm.close()
+            self.grid_shm.unlink()
+            self.grid_shm = None
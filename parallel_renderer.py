@@ -0,0 +1,365 @@
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+import pygame
+import settings
+import kernels
+from renderer import Renderer
+from parallel_raycasting import split_strips
+from texture_manager import select_mip_level, shade_table
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+# Estado global de cada proceso trabajador (se inicializa una sola vez por proceso)
+_worker_frame = None
+_worker_background = None
+_worker_walls = None
+_worker_sprites = None
+_worker_shades = None
+_worker_version = 0  # Última actualización de las tablas aplicada por este trabajador
+_worker_shm = None
+
+
+def surface_to_columns(surface):
+    """Copia un Surface a un array (ancho, alto, 3): cada columna de la textura es contigua"""
+    return np.ascontiguousarray(pygame.surfarray.array3d(surface))
+
+
+def surface_to_mask(surface):
+    """Máscara (ancho, alto) de píxeles visibles: alpha > 0 y distinto del colorkey negro"""
+    rgb = pygame.surfarray.array3d(surface)
+    mask = rgb.any(axis=2)
+    if surface.get_flags() & pygame.SRCALPHA:
+        mask &= pygame.surfarray.array_alpha(surface) > 0
+    return mask
+
+
+def shade_array(tables):
+    """Tablas de shade_table() como un array (variantes, 256) para los trabajadores"""
+    return np.frombuffer(b''.join(tables), dtype=np.uint8).reshape(len(tables), 256)
+
+
+def _init_worker(shm_name, background, walls, sprites, shades):
+    """Adjunta el back buffer compartido y recibe las tablas de texturas y de sombreado"""
+    global _worker_frame, _worker_background, _worker_walls, _worker_sprites, _worker_shades, _worker_shm
+
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_frame = np.ndarray(background.shape, dtype=np.uint8, buffer=_worker_shm.buf)
+    _worker_background = background
+    _worker_walls = walls
+    _worker_sprites = sprites
+    _worker_shades = shades
+
+
+def rasterize_strip(frame, background, walls, sprites, first_ray, x0, x1, columns, depths, sprite_list, bob_offset,
+                    shades):
+    """
+    Rasteriza la franja de píxeles [x0, x1) del frame (alto, ancho, 3):
+    fondo, columnas de pared (first_ray en adelante) y sprites con test de profundidad.
+    columns son los arrays (alturas, tipos, texture_x, variante de sombreado) de los
+    rayos de la franja y shades el array (variantes, 256) de tablas de sombreado.
+    walls es un kernels.WallBank (paredes con el kernel) o un dict tipo -> cadena de mipmaps.
+    """
+    screen_height = frame.shape[0]
+    scale = settings.SCALE
+    frame_cols = frame.transpose(1, 0, 2)  # Vista (ancho, alto, 3)
+
+    # Fondo precalculado
+    frame[:, x0:x1] = background[:, x0:x1]
+
+    # Paredes
+    if isinstance(walls, kernels.WallBank):
+        kernels.compile_kernels()
+        kernels.draw_wall_columns_kernel(frame_cols, walls.bank, walls.slot, *columns, shades, first_ray, x0, x1,
+                                         scale, settings.SCREEN_HEIGHT, float(bob_offset))
+        columns = ()
+    for k, (wall_height, wall_type, texture_x, shade) in enumerate(zip(*(c.tolist() for c in columns))):
+        height = int(wall_height)
+        if height <= 0:
+            continue
+        chain = walls.get(wall_type, walls.get(1))
+        texture = chain[select_mip_level(chain[0].shape[1], height, len(chain))]
+        tex_size = texture.shape[1]
+        tex_col = int(texture_x * texture.shape[0])
+        if tex_col < 0 or tex_col >= texture.shape[0]:
+            tex_col = 0
+
+        top = int((settings.SCREEN_HEIGHT - wall_height) / 2 + bob_offset)
+        y0 = max(top, 0)
+        y1 = min(top + height, screen_height)
+        if y0 >= y1:
+            continue
+
+        px0 = (first_ray + k) * scale
+        px1 = min(px0 + scale, x1)
+        src = (np.arange(y0 - top, y1 - top) * tex_size) // height
+        frame[y0:y1, px0:px1] = shades[shade][texture[tex_col][src]][:, None, :]
+
+    # Sprites (ya ordenados del más lejano al más cercano)
+    for tex_index, sprite_x, sprite_y, width, height, distance in sprite_list:
+        a = max(sprite_x, x0)
+        b = min(sprite_x + width, x1)
+        y0 = max(sprite_y, 0)
+        y1 = min(sprite_y + height, screen_height)
+        if a >= b or y0 >= y1:
+            continue
+
+        xs = np.arange(a, b)
+        xs = xs[distance < depths[xs // scale - first_ray]]
+        if xs.size == 0:
+            continue
+
+        chain = sprites[tex_index]
+        full_width, full_height = chain[0][1].shape
+        level = min(select_mip_level(full_width, width, len(chain)),
+                    select_mip_level(full_height, height, len(chain)))
+        rgb, mask = chain[level]
+        ys = np.arange(y0, y1)
+        u = ((xs - sprite_x) * rgb.shape[0]) // width
+        v = ((ys - sprite_y) * rgb.shape[1]) // height
+
+        visible = mask[u[:, None], v[None, :]]
+        cols, rows = np.nonzero(visible)
+        frame_cols[xs[cols], ys[rows]] = rgb[u[cols], v[rows]]
+
+
+def _apply_updates(updates):
+    """Aplica los cambios de las tablas (versión, tipo, clave, valor) que este trabajador aún no tiene"""
+    global _worker_walls, _worker_shades, _worker_version
+    for version, kind, key, value in updates:
+        if version <= _worker_version:
+            continue
+        if kind == 'walls':
+            _worker_walls = value  # Banco de paredes completo (kernels)
+        elif kind == 'wall':
+            _worker_walls[key] = value
+        elif kind == 'sprite':
+            _worker_sprites.extend([None] * (key + 1 - len(_worker_sprites)))
+            _worker_sprites[key] = value
+        else:
+            _worker_shades = value
+        _worker_version = version
+
+
+def _rasterize_task(first_ray, x0, x1, columns, depths, sprite_list, bob_offset, updates):
+    """
+    Tarea de un trabajador: aplica los cambios de las tablas y rasteriza su franja
+    directamente en el back buffer compartido. Retorna (pid, versión de sus tablas).
+    """
+    _apply_updates(updates)
+    rasterize_strip(_worker_frame, _worker_background, _worker_walls, _worker_sprites,
+                    first_ray, x0, x1, columns, depths, sprite_list, bob_offset, _worker_shades)
+    return os.getpid(), _worker_version
+
+
+class ParallelRenderer(Renderer):
+    """
+    Renderer que expone el back buffer como un array NumPy en memoria compartida.
+    Cada proceso trabajador rasteriza una franja vertical de paredes y sprites sin
+    copias, y el proceso principal hace un único blit del buffer a la pantalla.
+    El pool se crea en el primer frame, cuando ya se conocen las texturas de los sprites.
+
+    Las texturas de pared que se cargan o descargan, las texturas de sprites nuevas y
+    los cambios de sombreado no reinician el pool: se anotan en un registro con versión
+    que viaja con las tareas, y cada trabajador aplica lo que le falta y responde con
+    la versión que tiene. Lo que ya tienen todos se borra del registro.
+
+    Con los kernels activos las paredes de cada franja se dibujan con el mismo kernel
+    que el Renderer en serie (draw_wall_columns_kernel sobre un WallBank), y los datos
+    de los rayos viajan como arrays calculados de una vez en el proceso principal.
+    """
+    def __init__(self, screen, texture_manager, workers=None):
+        super().__init__(screen, texture_manager)
+        self.workers = workers or settings.RENDER_WORKERS
+        self.pool = None
+        self.sprite_index = {}  # id(Surface) -> índice en la tabla de los trabajadores
+        self.wall_version = None  # TextureManager.wall_version de las tablas de pared enviadas
+        self.wall_sources = {}    # wall_id -> Surface de la tabla de pared enviada
+        self.use_kernels = False  # Los trabajadores tienen un WallBank en vez de cadenas por pared
+        self.shades = None        # Tablas de sombreado enviadas
+        self.table_version = 0    # Versión de la última entrada de updates
+        self.updates = []         # (versión, tipo, clave, valor) que algún trabajador aún no tiene
+        self.worker_versions = {}  # pid -> versión de las tablas de ese trabajador
+        self.wait_ms = 0.0         # Espera a las franjas del último frame (el resto es del proceso principal)
+
+        width, height = screen.get_size()
+        self.shm = shared_memory.SharedMemory(create=True, size=width * height * 3)
+        self.frame = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf)
+        # Surface que comparte la memoria del buffer: el blit final no necesita conversión a NumPy
+        self.back_buffer = pygame.image.frombuffer(self.shm.buf, (width, height), 'RGB')
+
+        # Fondo (cielo + gradiente del suelo) precalculado una sola vez
+        original_screen = self.screen
+        self.screen = pygame.Surface((width, height))
+        self._draw_background()
+        self.background = np.ascontiguousarray(pygame.surfarray.array3d(self.screen).transpose(1, 0, 2))
+        self.screen = original_screen
+
+    def _wall_chain(self, chain):
+        # Cada textura es una cadena de mipmaps [completa, 1/2, ...] (un solo nivel sin mipmaps)
+        return [surface_to_columns(level) for level in chain]
+
+    def _sprite_chain(self, texture):
+        atlas = self.texture_manager.atlas
+        key = atlas.key_for(texture) if atlas.built else None
+        if key is not None:
+            # Muestrear del atlas sin tocar la superficie
+            columns = atlas.get_columns(key)
+            rgb = np.ascontiguousarray(columns[..., :3])
+            chain = [(rgb, (columns[..., 3] > 0) & rgb.any(axis=2))]
+        else:
+            chain = [(surface_to_columns(texture), surface_to_mask(texture))]
+        if settings.MIPMAPPING:
+            mips = self.texture_manager.get_sprite_mip_chain(texture)
+            chain += [(surface_to_columns(level), surface_to_mask(level)) for level in mips[1:]]
+        return chain
+
+    def _start_pool(self, sprites):
+        """Construye las tablas de texturas y arranca los trabajadores"""
+        walls = {}
+        self.wall_sources = {}
+        self.use_kernels = kernels.kernels_enabled()
+        if self.use_kernels:
+            walls = kernels.WallBank(self.texture_manager)
+        else:
+            for wall_id, (tex, chain) in self.texture_manager.wall_texture_table().items():
+                walls[wall_id] = self._wall_chain(chain)
+                self.wall_sources[wall_id] = tex
+        self.wall_version = self.texture_manager.wall_version
+        tables = shade_table()
+        self.shades = tables
+
+        textures = []
+        for sprite in sprites:
+            textures.append(sprite.texture)
+            for frames in getattr(sprite, 'frames', {}).values():
+                textures.extend(frames)
+
+        sprite_table = []
+        # Mantener vivas las superficies para que sus id() no se reutilicen
+        self._sprite_surfaces = []
+        for texture in textures:
+            if texture is not None and id(texture) not in self.sprite_index:
+                self.sprite_index[id(texture)] = len(sprite_table)
+                sprite_table.append(self._sprite_chain(texture))
+                self._sprite_surfaces.append(texture)
+
+        self.table_version = 0
+        self.updates = []
+        self.worker_versions = {}
+        self.pool = multiprocessing.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(self.shm.name, self.background, walls, sprite_table, shade_array(tables))
+        )
+
+    def _log_update(self, kind, key, value):
+        self.table_version += 1
+        self.updates.append((self.table_version, kind, key, value))
+
+    def _register_sprite(self, texture):
+        """Añade a las tablas de los trabajadores una textura de sprite que no tenían"""
+        index = len(self._sprite_surfaces)
+        self.sprite_index[id(texture)] = index
+        self._sprite_surfaces.append(texture)
+        self._log_update('sprite', index, self._sprite_chain(texture))
+
+    def _sync_tables(self):
+        """Anota las texturas de pared y el sombreado que cambiaron desde el último envío"""
+        if self.use_kernels and self.wall_version != self.texture_manager.wall_version:
+            # El banco se reconstruye entero (como Renderer.wall_bank)
+            self._log_update('walls', None, kernels.WallBank(self.texture_manager))
+            self.wall_version = self.texture_manager.wall_version
+        elif self.wall_version != self.texture_manager.wall_version:
+            # Se cargó o descargó una textura de pared: solo viajan las que cambiaron
+            for wall_id, (tex, chain) in self.texture_manager.wall_texture_table().items():
+                if self.wall_sources.get(wall_id) is not tex:
+                    self.wall_sources[wall_id] = tex
+                    self._log_update('wall', wall_id, self._wall_chain(chain))
+            self.wall_version = self.texture_manager.wall_version
+        tables = shade_table()
+        if tables != self.shades:
+            self.shades = tables
+            self._log_update('shades', None, shade_array(tables))
+
+    def _pending_updates(self):
+        """Entradas del registro que le pueden faltar a algún trabajador"""
+        if len(self.worker_versions) < self.workers:
+            return self.updates  # Hay trabajadores que aún no han respondido
+        oldest = min(self.worker_versions.values())
+        self.updates = [entry for entry in self.updates if entry[0] > oldest]
+        return self.updates
+
+    def render_scene(self, rays, player, sprites):
+        """Renderiza la escena en paralelo sobre el buffer compartido y lo vuelca a pantalla"""
+        if self.pool is None:
+            self._start_pool(sprites)
+        else:
+            self._sync_tables()
+
+        bob_offset = player.get_bobbing_offset()
+        player_x, player_y = player.get_position()
+
+        # Proyectar sprites (más lejanos primero) que estén en el PVS del jugador
+        sees = self.pvs.viewer(player_x, player_y) if self.pvs else None
+        sprite_list = []
+        for sprite in sorted(sprites, key=lambda s: s.distance, reverse=True):
+            if sprite.texture is None or (sees and not sees(sprite.x, sprite.y)):
+                continue
+            projection = sprite.get_sprite_projection(
+                player_x, player_y, player.angle,
+                settings.SCREEN_WIDTH, settings.SCREEN_HEIGHT
+            )
+            if projection is None:
+                continue
+            if id(sprite.texture) not in self.sprite_index:
+                self._register_sprite(sprite.texture)
+            sprite_list.append((
+                self.sprite_index[id(sprite.texture)],
+                projection['x'] - projection['width'] // 2,
+                int(projection['y'] + bob_offset),
+                projection['width'],
+                projection['height'],
+                projection['distance'],
+            ))
+
+        updates = self._pending_updates()
+        # Datos de todas las columnas de una vez; cada franja recibe sus trozos
+        wall_heights, wall_types, texture_xs = kernels.wall_arrays(rays)
+        shades, _ = kernels.shade_arrays(rays, self._wall_lights(rays))
+        depths = np.array([ray['depth'] for ray in rays], dtype=np.float64)
+        tasks = []
+        for start, end in split_strips(len(rays), self.workers):
+            x0 = start * settings.SCALE
+            x1 = settings.SCREEN_WIDTH if end == len(rays) else end * settings.SCALE
+            columns = (wall_heights[start:end], wall_types[start:end], texture_xs[start:end], shades[start:end])
+            tasks.append((start, x0, x1, columns, depths[start:end], sprite_list, bob_offset, updates))
+        start = time.perf_counter()
+        self.worker_versions.update(self.pool.starmap(_rasterize_task, tasks))
+        self.wait_ms = (time.perf_counter() - start) * 1000
+
+        # Único blit del back buffer a la pantalla
+        self.screen.blit(self.back_buffer, (0, 0))
+
+    def _stop_pool(self):
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+        self.sprite_index = {}
+        self.worker_versions = {}
+
+    def close(self):
+        """Detiene el pool y libera el buffer compartido"""
+        if self.pool is not None:
+            self._stop_pool()
+        if self.shm is not None:
+            del self.back_buffer
+            del self.frame
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
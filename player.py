@@ -5,6 +5,14 @@ from map import is_wall
 
 
 class Player:
+    # Sonido de disparo de cada arma (nombres de SoundManager.SOUNDS)
+    WEAPON_SOUNDS = {
+        'knife': 'knife',
+        'pistol': 'pistol',
+        'machinegun': 'machinegun',
+        'minigun': 'gatling',
+    }
+    
     def __init__(self, x, y, angle, sound_manager=None):
         self.x = x
         self.y = y
@@ -87,13 +95,12 @@ class Player:
         if self.current_weapon == 'knife':
             # El cuchillo no usa munición
             if self.sound_manager:
-                # Puedes añadir sonido de cuchillo si lo tienes
-                pass
+                self.sound_manager.play(self.WEAPON_SOUNDS['knife'])
             return True
         elif self.ammo > 0:
             self.ammo -= 1
             if self.sound_manager:
-                self.sound_manager.play('pistol') # Todo: add weapon specific sounds
+                self.sound_manager.play(self.WEAPON_SOUNDS[self.current_weapon])
             return True
         return False
         
@@ -152,23 +159,29 @@ class Player:
         # Amplitud de 10 píxeles
         self.bobbing_offset = math.sin(self.bobbing_phase) * 10
 
-    def handle_mouse(self, dt):
-        """Maneja la rotación con el mouse"""
-        mx, my = pygame.mouse.get_pos()
-        
-        # Calcular diferencia con el centro de la pantalla
-        center_x = settings.SCREEN_WIDTH // 2
-        dx = mx - center_x
+    def handle_mouse(self, dt, rel_x=None):
+        """
+        Maneja la rotación con el mouse. rel_x es el movimiento relativo acumulado
+        desde el último tick (modo 'relative'); sin él se lee la posición del
+        puntero y se recentra (modo 'warp'). Retorna True si la vista giró.
+        """
+        if rel_x is None:
+            mx, my = pygame.mouse.get_pos()
+            
+            # Calcular diferencia con el centro de la pantalla
+            center_x = settings.SCREEN_WIDTH // 2
+            rel_x = mx - center_x
+            
+            # Resetear mouse al centro
+            if rel_x != 0:
+                pygame.mouse.set_pos((center_x, settings.SCREEN_HEIGHT // 2))
         
         # Si hubo movimiento, rotar
-        if dx != 0:
-            # Sensibilidad del mouse (Reducida a petición del usuario)
-            SENSITIVITY = 0.001
-            self.angle += dx * SENSITIVITY
+        if rel_x != 0:
+            self.angle += rel_x * settings.MOUSE_SENSITIVITY
             self.angle = self.angle % (2 * math.pi)
-            
-            # Resetear mouse al centro
-            pygame.mouse.set_pos((center_x, settings.SCREEN_HEIGHT // 2))
+            return True
+        return False
             
     def get_bobbing_offset(self):
         """Retorna el offset vertical para el efecto de caminar"""
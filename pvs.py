@@ -0,0 +1,412 @@
+"""
+Conjuntos potencialmente visibles (PVS) por celda (settings.PVS).
+
+Para cada celda por la que se puede andar (vacía o puerta) se calcula qué zonas del
+nivel pueden verse desde algún punto de la celda con todas las puertas abiertas.
+Las zonas son bloques de PVS_CLUSTER x PVS_CLUSTER celdas y la visibilidad se
+muestrea: desde el centro y las cuatro esquinas de la celda se lanzan PVS_RAYS rayos
+DDA que atraviesan las puertas y llegan hasta PVS_DISTANCE; cada celda que cruzan
+marca su bloque y los que están a menos de PVS_MARGIN celdas.
+
+El muestreo no es exacto: una rendija estrecha entre dos rayos, o vista solo desde
+un punto de la celda que no se muestrea, puede quedar fuera. PVS_MARGIN amplía cada
+celda vista a sus vecinas para cubrir esos huecos (y los sprites que sobresalen de
+su celda); más margen es más conservador pero descarta menos.
+
+Por qué basta con muestrear: dos rayos vecinos se separan como mucho
+2 * pi * PVS_DISTANCE / PVS_RAYS celdas (0.19 con los valores por defecto), así que
+toda abertura de una celda o más la cruza algún rayo de cada muestra. Lo que se
+escapa es lo visible solo desde un punto de la celda que no es ninguna muestra;
+ese punto está a menos de una celda de alguna muestra, y PVS_MARGIN celdas
+alrededor de cada celda vista cubren ese desplazamiento salvo en rendijas muy
+largas. python benchmark.py pvs lo comprueba: lanza los rayos del juego desde
+poses al azar y cuenta los puntos vistos que quedan fuera del PVS (deben ser 0).
+
+Cada celda guarda una fila de bits con los bloques de una ventana de
+(2 * radio + 1)^2 bloques centrada en el suyo (más allá no se ve nada). Las filas
+repetidas se guardan una vez (las celdas de una misma sala suelen compartirla):
+el archivo tiene el índice de fila de cada celda y la tabla de filas distintas.
+
+El PVS se guarda junto al nivel (nivel.txt -> nivel.pvs) y las cargas siguientes lo
+mapean en memoria. Si cambia el mapa (SHA-1 de la capa grid) o los parámetros, se
+recalcula. El cálculo es un kernel de Python puro que se compila con numba si está
+instalado (ver kernels.py).
+
+Lo usan el renderer (sprites y enemigos fuera del PVS del jugador no se proyectan),
+la IA (los IDLE fuera del PVS no pueden ver al jugador y quedan dormidos; los ruidos
+solo despiertan a los que están en el PVS de donde suenan) y el sonido (los emisores
+fuera del PVS del oyente no suenan).
+
+El juego solo lo calcula al arrancar en niveles pequeños (build_limit()); para
+los demás hay que calcularlo antes, sin lanzar el juego:
+    python pvs.py levels/e1m1.txt
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+import settings
+import kernels
+
+MAGIC = b'R3DPVS\0\0'
+PVS_VERSION = 2
+# magic | versión | ancho | alto | bloque | radio | rayos | margen | distancia | SHA-1 del grid | filas
+HEADER = struct.Struct('<8sIIIIIIId20sI')
+ALIGN = 16
+NO_ROW = 0xFFFFFFFF
+DOOR_TYPE = 7
+# Puntos de muestreo dentro de cada celda (centro y esquinas casi en el borde)
+SAMPLES = ((0.5, 0.5), (0.02, 0.02), (0.98, 0.02), (0.02, 0.98), (0.98, 0.98))
+
+_compiled = False
+
+
+def _align(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def pvs_path(level_path):
+    return os.path.splitext(level_path)[0] + '.pvs'
+
+
+def window_radius(cluster, distance, margin):
+    """Bloques alrededor del de la celda que puede marcar un rayo de distance celdas"""
+    return int(math.ceil((distance + 2 + margin) / cluster))
+
+
+def build_rows_kernel(blocked, width, height, sources, cluster, radius, cos_table, sin_table,
+                      sample_x, sample_y, distance, margin, row_bytes, seen, out):
+    """
+    Escribe en out (len(sources) * row_bytes) la fila de bits de cada celda de sources
+    (índices y * ancho + x). blocked es 1 en las celdas que paran los rayos; seen es
+    un buffer de (2 * (int(distance) + 2) + 1)^2 bytes para las celdas que ve cada una.
+    """
+    window = 2 * radius + 1
+    reach = int(distance) + 2
+    side = 2 * reach + 1
+    for k in range(len(sources)):
+        cell = sources[k]
+        cell_x = cell % width
+        cell_y = cell // width
+        for i in range(side * side):
+            seen[i] = 0
+        for s in range(len(sample_x)):
+            start_x = cell_x + sample_x[s]
+            start_y = cell_y + sample_y[s]
+            for r in range(len(cos_table)):
+                cos_a = cos_table[r]
+                sin_a = sin_table[r]
+                map_x = cell_x
+                map_y = cell_y
+                delta_x = abs(1 / cos_a)
+                delta_y = abs(1 / sin_a)
+                if cos_a < 0:
+                    step_x = -1
+                    side_x = (start_x - map_x) * delta_x
+                else:
+                    step_x = 1
+                    side_x = (map_x + 1.0 - start_x) * delta_x
+                if sin_a < 0:
+                    step_y = -1
+                    side_y = (start_y - map_y) * delta_y
+                else:
+                    step_y = 1
+                    side_y = (map_y + 1.0 - start_y) * delta_y
+
+                travelled = 0.0
+                while True:
+                    seen[(map_y - cell_y + reach) * side + map_x - cell_x + reach] = 1
+                    if travelled > distance:
+                        break
+                    if side_x < side_y:
+                        travelled = side_x
+                        side_x += delta_x
+                        map_x += step_x
+                    else:
+                        travelled = side_y
+                        side_y += delta_y
+                        map_y += step_y
+                    if map_x < 0 or map_x >= width or map_y < 0 or map_y >= height:
+                        break
+                    if blocked[map_y * width + map_x]:
+                        # La pared se ve: marcarla y parar
+                        travelled = distance + 1.0
+
+        # Bloques de las celdas vistas y de las que están a menos de margin celdas
+        source_cx = cell_x // cluster
+        source_cy = cell_y // cluster
+        base = k * row_bytes
+        for i in range(side * side):
+            if not seen[i]:
+                continue
+            map_x = cell_x + i % side - reach
+            map_y = cell_y + i // side - reach
+            for cy in range((map_y - margin) // cluster, (map_y + margin) // cluster + 1):
+                dy = cy - source_cy + radius
+                if dy < 0 or dy >= window:
+                    continue
+                for cx in range((map_x - margin) // cluster, (map_x + margin) // cluster + 1):
+                    dx = cx - source_cx + radius
+                    if 0 <= dx < window:
+                        bit = dy * window + dx
+                        out[base + (bit >> 3)] |= 1 << (bit & 7)
+    return out
+
+
+def _compile():
+    global build_rows_kernel, _compiled
+    if _compiled:
+        return
+    _compiled = True
+    if kernels.HAS_NUMBA:
+        from numba import njit
+        build_rows_kernel = njit(cache=True)(build_rows_kernel)
+
+
+class PVS:
+    """PVS de un nivel: índice de fila por celda y tabla de filas de bits"""
+    def __init__(self, width, height, cluster, radius, cell_rows, rows):
+        self.width = width
+        self.height = height
+        self.cluster = cluster
+        self.radius = radius
+        self.window = 2 * radius + 1
+        self.row_bytes = (self.window * self.window + 7) // 8
+        self.cell_rows = cell_rows  # Secuencia uint32 de ancho * alto (NO_ROW = sin PVS)
+        self.rows = rows            # bytes/memoryview de filas * row_bytes
+        self._file = None  # Archivo mapeado (se mantiene abierto mientras se use)
+        self._map = None
+        self._view = None
+
+    @property
+    def row_count(self):
+        return len(self.rows) // self.row_bytes if self.row_bytes else 0
+
+    def viewer(self, x, y):
+        """
+        Función sees(x, y) -> bool que dice si una posición está en el PVS de la celda
+        de (x, y), o None si esa celda no tiene PVS (fuera del mapa o dentro de una pared)
+        """
+        cell_x = int(x)
+        cell_y = int(y)
+        if cell_x < 0 or cell_x >= self.width or cell_y < 0 or cell_y >= self.height:
+            return None
+        row = self.cell_rows[cell_y * self.width + cell_x]
+        if row == NO_ROW:
+            return None
+        rows = self.rows
+        base = row * self.row_bytes
+        cluster = self.cluster
+        window = self.window
+        origin_x = cell_x // cluster - self.radius
+        origin_y = cell_y // cluster - self.radius
+
+        def sees(x, y):
+            dx = int(x) // cluster - origin_x
+            dy = int(y) // cluster - origin_y
+            if dx < 0 or dx >= window or dy < 0 or dy >= window:
+                return False
+            bit = dy * window + dx
+            return rows[base + (bit >> 3)] >> (bit & 7) & 1 == 1
+        return sees
+
+    def sees(self, from_x, from_y, x, y):
+        """True si (x, y) está en el PVS de la celda de (from_x, from_y) (True si no tiene PVS)"""
+        sees = self.viewer(from_x, from_y)
+        return True if sees is None else sees(x, y)
+
+    def sees_many(self, from_x, from_y, xs, ys):
+        """sees() para arrays NumPy de posiciones"""
+        import numpy as np
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        cell_x = int(from_x)
+        cell_y = int(from_y)
+        if cell_x < 0 or cell_x >= self.width or cell_y < 0 or cell_y >= self.height:
+            return np.ones(xs.shape, dtype=bool)
+        row = self.cell_rows[cell_y * self.width + cell_x]
+        if row == NO_ROW:
+            return np.ones(xs.shape, dtype=bool)
+        bits = np.unpackbits(np.frombuffer(self.rows, dtype=np.uint8, count=self.row_bytes,
+                                           offset=row * self.row_bytes), bitorder='little')
+        dx = np.floor(xs).astype(np.int64) // self.cluster - (cell_x // self.cluster - self.radius)
+        dy = np.floor(ys).astype(np.int64) // self.cluster - (cell_y // self.cluster - self.radius)
+        inside = (dx >= 0) & (dx < self.window) & (dy >= 0) & (dy < self.window)
+        result = np.zeros(xs.shape, dtype=bool)
+        result[inside] = bits[dy[inside] * self.window + dx[inside]] == 1
+        return result
+
+    def close(self):
+        """Libera el mapeo del archivo"""
+        if self._map is not None:
+            # Soltar las vistas del archivo (los viewer() ya creados dejan de valer)
+            for view in (self.cell_rows, self.rows, self._view):
+                if isinstance(view, memoryview):
+                    view.release()
+            self.cell_rows = None
+            self.rows = None
+            self._view = None
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _params():
+    cluster = settings.PVS_CLUSTER
+    margin = settings.PVS_MARGIN
+    distance = float(settings.PVS_DISTANCE)
+    return cluster, window_radius(cluster, distance, margin), settings.PVS_RAYS, margin, distance
+
+
+def build_pvs(level):
+    """Calcula el PVS de un nivel (puertas abiertas)"""
+    cluster, radius, ray_count, margin, distance = _params()
+    width, height = level.width, level.height
+    grid = bytes(level.grid)
+    window = 2 * radius + 1
+    row_bytes = (window * window + 7) // 8
+    sources = [i for i, cell in enumerate(grid) if cell == 0 or cell == DOOR_TYPE]
+    blocked = bytes(0 if cell == 0 or cell == DOOR_TYPE else 1 for cell in grid)
+
+    # Ángulos desplazados medio paso para no lanzar rayos paralelos a los ejes
+    angles = [(r + 0.5) * 2 * math.pi / ray_count for r in range(ray_count)]
+    cos_table = [math.cos(a) for a in angles]
+    sin_table = [math.sin(a) for a in angles]
+    sample_x = [x for x, _ in SAMPLES]
+    sample_y = [y for _, y in SAMPLES]
+    seen_size = (2 * (int(distance) + 2) + 1) ** 2
+    _compile()
+    if kernels.HAS_NUMBA:
+        # numba necesita arrays NumPy; sin numba las listas de Python son más rápidas
+        import numpy as np
+        out = build_rows_kernel(
+            np.frombuffer(blocked, dtype=np.uint8), width, height, np.array(sources, dtype=np.int64),
+            cluster, radius, np.array(cos_table), np.array(sin_table), np.array(sample_x), np.array(sample_y),
+            distance, margin, row_bytes, np.zeros(seen_size, dtype=np.uint8),
+            np.zeros(len(sources) * row_bytes, dtype=np.uint8)).tobytes()
+    else:
+        out = bytes(build_rows_kernel(blocked, width, height, sources, cluster, radius, cos_table, sin_table,
+                                      sample_x, sample_y, distance, margin, row_bytes, bytearray(seen_size),
+                                      bytearray(len(sources) * row_bytes)))
+
+    # Filas repetidas una sola vez
+    cell_rows = array('I', [NO_ROW]) * (width * height)
+    unique = {}
+    for k, cell in enumerate(sources):
+        row = out[k * row_bytes:(k + 1) * row_bytes]
+        cell_rows[cell] = unique.setdefault(row, len(unique))
+    return PVS(width, height, cluster, radius, cell_rows, b''.join(unique))
+
+
+def _grid_sha1(level):
+    return hashlib.sha1(bytes(level.grid)).digest()
+
+
+def write_pvs(pvs, level, path):
+    """Escribe el PVS junto al nivel (a un temporal y luego lo reemplaza)"""
+    cluster, radius, ray_count, margin, distance = _params()
+    cell_rows = array('I', pvs.cell_rows)
+    if sys.byteorder != 'little':
+        cell_rows.byteswap()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, PVS_VERSION, pvs.width, pvs.height, cluster, radius, ray_count,
+                            margin, distance, _grid_sha1(level), pvs.row_count))
+        f.write(b'\0' * (_align(HEADER.size) - HEADER.size))
+        for layer in (cell_rows.tobytes(), bytes(pvs.rows)):
+            f.write(layer)
+            f.write(b'\0' * (_align(len(layer)) - len(layer)))
+    os.replace(tmp_path, path)
+
+
+def open_pvs(path, level):
+    """Mapea un PVS guardado si corresponde al nivel y a los settings; retorna el PVS o None"""
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        f.close()
+        return None
+    try:
+        magic, version, width, height, cluster, radius, ray_count, margin, distance, sha1, row_count = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != PVS_VERSION:
+            raise ValueError("versión incompatible")
+        if (width, height) != (level.width, level.height) or sha1 != _grid_sha1(level):
+            raise ValueError("el nivel cambió")
+        if (cluster, radius, ray_count, margin, distance) != _params():
+            raise ValueError("parámetros distintos")
+        window = 2 * radius + 1
+        row_bytes = (window * window + 7) // 8
+        if len(data) != _align(HEADER.size) + _align(width * height * 4) + _align(row_count * row_bytes):
+            raise ValueError("archivo truncado")
+    except (ValueError, struct.error):
+        data.close()
+        f.close()
+        return None
+
+    cells = width * height
+    view = memoryview(data)
+    rows_start = _align(HEADER.size)
+    cell_rows = view[rows_start:rows_start + cells * 4]
+    if sys.byteorder == 'little':
+        cell_rows = cell_rows.cast('I')
+    else:
+        cell_rows = array('I', cell_rows)
+        cell_rows.byteswap()
+    table_start = rows_start + _align(cells * 4)
+    pvs = PVS(width, height, cluster, radius, cell_rows, None)
+    pvs.rows = view[table_start:table_start + row_count * pvs.row_bytes]
+    pvs._file = f
+    pvs._map = data
+    pvs._view = view
+    return pvs
+
+
+def build_limit():
+    """Celdas transitables hasta las que se calcula el PVS al cargar el nivel en el juego"""
+    return settings.PVS_BUILD_LIMIT if kernels.HAS_NUMBA else settings.PVS_BUILD_LIMIT_PYTHON
+
+
+def load_pvs(level, level_path, max_cells=None):
+    """
+    PVS de un nivel: el guardado junto al nivel si está al día, si no se calcula y se
+    guarda. Con max_cells, un nivel con más celdas transitables no se calcula (retorna None).
+    """
+    path = pvs_path(level_path)
+    start = time.perf_counter()
+    pvs = open_pvs(path, level)
+    if pvs is not None:
+        print(f"  ✓ PVS mapeado: {pvs.row_count} filas distintas en {(time.perf_counter() - start) * 1000:.1f} ms")
+        return pvs
+
+    cells = sum(1 for cell in level.grid if cell == 0 or cell == DOOR_TYPE)
+    if max_cells is not None and cells > max_cells:
+        print(f"  ! PVS sin calcular: {cells} celdas transitables (límite {max_cells}"
+              f"{'' if kernels.HAS_NUMBA else ' sin numba'}); calcúlalo con python pvs.py {level_path}")
+        return None
+
+    pvs = build_pvs(level)
+    size = len(pvs.cell_rows) * 4 + len(pvs.rows)
+    print(f"  ✓ PVS calculado: {pvs.row_count} filas distintas de {pvs.row_bytes} bytes, "
+          f"{size / 1024:.0f} KB en {(time.perf_counter() - start) * 1000:.0f} ms")
+    try:
+        write_pvs(pvs, level, path)
+    except OSError as e:
+        print(f"  ! No se pudo guardar el PVS: {e}")
+    return pvs
+
+
+if __name__ == "__main__":
+    from level import load_level
+    for level_path in sys.argv[1:]:
+        load_pvs(load_level(level_path), level_path).close()
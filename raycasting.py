@@ -1,12 +1,21 @@
 import math
 import settings
-from map import is_wall, get_wall_type
+import kernels
+import map as game_map
+from map import WORLD_MAP, is_wall, make_grid
 
 
 class RayCaster:
     def __init__(self):
         self.rays = []
         self.doors = None
+        self.world_map = None  # None = usar map.WORLD_MAP
+        self.kernel_map = None  # Arrays para kernels.cast_strip (se crean al usarlos)
+        self.grid = None        # Rejilla plana con borde de world_map (ver map.GRID); se crea al usarla
+        self.grid_stride = 0
+        self.door_cells = {}    # (x, y) -> puerta
+        self.gap_columns = set()  # Columnas cuyo rayo cruzó el hueco de una puerta (modo adaptativo)
+        self.columns_cast = 0     # Columnas con DDA en el último cast_rays (el resto interpoladas)
     
     def has_line_of_sight(self, x1, y1, x2, y2):
         """Verifica si hay línea de visión directa entre dos puntos (sin paredes)"""
@@ -24,13 +33,23 @@ class RayCaster:
         
         # Verificar cada paso
         cx, cy = x1, y1
+        if game_map.SOLID is None:
+            for _ in range(steps):
+                cx += step_x
+                cy += step_y
+                if is_wall(int(cx), int(cy), self.doors):
+                    return False
+            return True
+        
+        # Máscara con borde (SOLID con puertas, como is_wall) indexada directamente
+        mask = game_map.SOLID if self.doors else game_map.GRID
+        stride = game_map.GRID_STRIDE
         for _ in range(steps):
             cx += step_x
             cy += step_y
             
             # Si chocamos con una pared, no hay LOS
-            # Verificación simple, se puede mejorar con DDA si es necesario
-            if is_wall(int(cx), int(cy), self.doors):
+            if mask[(int(cy) + 1) * stride + int(cx) + 1]:
                 return False
                 
         return True
@@ -38,18 +57,134 @@ class RayCaster:
     def set_doors(self, doors):
         """Asigna las puertas al raycaster"""
         self.doors = doors
+        self.kernel_map = None
+        self.door_cells = {}
+        # La primera puerta en una celda gana, como en get_door_at_position
+        for door in reversed(doors or []):
+            self.door_cells[(door.x, door.y)] = door
         
     def cast_rays(self, player_x, player_y, player_angle):
         """Lanza rayos desde la posición del jugador"""
-        self.rays = []
+        # Con kernels el DDA completo ya es más barato que el reparto adaptativo
+        if settings.ADAPTIVE_RAYS and not kernels.kernels_enabled():
+            self.rays = self.cast_adaptive(player_x, player_y, player_angle)
+        else:
+            self.rays = self.cast_strip(player_x, player_y, player_angle, 0, settings.NUM_RAYS)
+            self.columns_cast = settings.NUM_RAYS
+        return self.rays
+
+    def cast_adaptive(self, player_x, player_y, player_angle):
+        """
+        Mismos rayos que cast_strip para toda la pantalla, pero con DDA solo en una
+        columna de cada ADAPTIVE_RAY_STEP. Si las dos columnas de un tramo chocan con
+        la misma cara de la misma celda (ni puerta ni cruzando el hueco de una), las
+        intermedias chocan con esa cara y se calculan con la fórmula de la cara; si
+        no, se lanza la columna del medio y se repite con cada mitad. Es exacto
+        porque un bloque de 1x1 no cabe entre dos rayos del tramo antes de MAX_DEPTH
+        (el paso se limita para que sea así).
+        """
+        num_rays = settings.NUM_RAYS
+        span = settings.DELTA_ANGLE * (settings.MAX_DEPTH + 1)
+        step = max(1, min(settings.ADAPTIVE_RAY_STEP, int(1 / span) if span > 0 else num_rays))
+        
+        rays = [None] * num_rays
+        self.gap_columns.clear()
+        coarse = list(range(0, num_rays - 1, step)) + [num_rays - 1]
+        for column, ray in zip(coarse, self.cast_strip(player_x, player_y, player_angle, 0, 0, coarse)):
+            rays[column] = ray
+        self.columns_cast = len(coarse)
+        
+        gaps = self.gap_columns
+        spans = list(zip(coarse, coarse[1:]))
+        while spans:
+            a, b = spans.pop()
+            if b - a < 2:
+                continue
+            ray_a = rays[a]
+            ray_b = rays[b]
+            if (ray_a['hit_pos'] == ray_b['hit_pos'] and ray_a['side'] == ray_b['side']
+                    and ray_a['wall_type'] not in (0, 7) and a not in gaps and b not in gaps):
+                rays[a + 1:b] = self._face_rays(player_x, player_y, player_angle, a + 1, b, ray_a)
+            else:
+                middle = (a + b) // 2
+                rays[middle] = self.cast_strip(player_x, player_y, player_angle, 0, 0, (middle,))[0]
+                self.columns_cast += 1
+                spans.append((a, middle))
+                spans.append((middle, b))
+        return rays
+
+    def _face_rays(self, player_x, player_y, player_angle, start, end, face):
+        """Rayos de [start, end) que chocan con la misma cara que face (cálculo final de cast_strip)"""
+        sin, cos, floor = math.sin, math.cos, math.floor
+        half_fov = settings.HALF_FOV
+        delta_angle = settings.DELTA_ANGLE
+        screen_height = settings.SCREEN_HEIGHT
+        wall_type = face['wall_type']
+        side = face['side']
+        hit_pos = face['hit_pos']
+        vertical = side == 'vertical'
+        map_x, map_y = hit_pos
+        rays = []
+        for column in range(start, end):
+            ray_angle = player_angle - half_fov + column * delta_angle
+            sin_a = sin(ray_angle)
+            cos_a = cos(ray_angle)
+            if cos_a == 0: cos_a = 0.000001
+            if sin_a == 0: sin_a = 0.000001
+            
+            if vertical:
+                step_x = -1 if cos_a < 0 else 1
+                depth = (map_x - player_x + (1 - step_x) / 2) / cos_a
+                wall_x = player_y + depth * sin_a
+            else:
+                step_y = -1 if sin_a < 0 else 1
+                depth = (map_y - player_y + (1 - step_y) / 2) / sin_a
+                wall_x = player_x + depth * cos_a
+            wall_x -= floor(wall_x)
+            
+            depth *= cos(player_angle - ray_angle)
+            rays.append({
+                'depth': depth,
+                'wall_height': screen_height / depth if depth > 0 else screen_height,
+                'wall_type': wall_type,
+                'side': side,
+                'texture_x': wall_x,
+                'angle': ray_angle,
+                'hit_pos': hit_pos
+            })
+        return rays
+
+    def cast_strip(self, player_x, player_y, player_angle, start, end, columns=None):
+        """
+        Lanza los rayos de las columnas [start, end) y retorna su información.
+        Se usa tanto para el frame completo como para las franjas paralelas.
+        columns: columnas concretas a lanzar en lugar de [start, end) (modo adaptativo).
+        """
+        world_map = self.world_map if self.world_map is not None else WORLD_MAP
+        
+        if kernels.kernels_enabled() and not getattr(world_map, 'streaming', False) and columns is None:
+            if self.kernel_map is None:
+                self.kernel_map = kernels.KernelMap(world_map, self.doors)
+            return kernels.cast_strip(self.kernel_map, player_x, player_y, player_angle, start, end)
         
-        # Ángulo inicial (izquierda del FOV)
-        ray_angle = player_angle - settings.HALF_FOV
+        rays = []
         
-        # Local import to avoid circular dependency
-        from map import get_door_at_position, MAP_WIDTH, MAP_HEIGHT
+        # Rejilla plana con borde: el DDA no necesita comprobar los límites del mapa
+        streaming = getattr(world_map, 'streaming', False)
+        if self.grid is None and not streaming:
+            if world_map is WORLD_MAP and game_map.GRID is not None:
+                self.grid, self.grid_stride = game_map.GRID, game_map.GRID_STRIDE
+            else:
+                self.grid, self.grid_stride = make_grid(world_map)
+        grid = self.grid
+        stride = self.grid_stride
+        door_cells = self.door_cells
         
-        for ray in range(settings.NUM_RAYS):
+        for ray in (range(start, end) if columns is None else columns):
+            # Ángulo del rayo (desde la izquierda del FOV)
+            # Se calcula por índice para que cualquier franja dé el mismo resultado
+            ray_angle = player_angle - settings.HALF_FOV + ray * settings.DELTA_ANGLE
+            
             # Lanzar un rayo en esta dirección usando DDA avanzado
             sin_a = math.sin(ray_angle)
             cos_a = math.cos(ray_angle)
@@ -97,18 +232,15 @@ class RayCaster:
                     map_y += step_y
                     hit_side = 'horizontal'
                 
-                # Verificar si está fuera del mapa
-                if map_x < 0 or map_x >= MAP_WIDTH or map_y < 0 or map_y >= MAP_HEIGHT:
-                    wall_type = 1
-                    break
-                    
-                # Verificar pared usando map.py (pero optimizado)
+                # Verificar pared leyendo la rejilla directamente (fuera del mapa está el borde, tipo 1)
                 # Intencionalmente no usamos is_wall aquí para manejar manualmente la lógica de puertas
-                if is_wall(map_x, map_y, None): # Check geometry only first
-                    current_wall_type = get_wall_type(map_x, map_y)
-                    
-                    if current_wall_type == 7 and self.doors: # Es una puerta
-                        door = get_door_at_position(map_x, map_y, self.doors)
+                if streaming:
+                    current_wall_type = world_map.cell(map_x, map_y)
+                else:
+                    current_wall_type = grid[(map_y + 1) * stride + map_x + 1]
+                if current_wall_type != 0: # Check geometry only first
+                    if current_wall_type == 7 and door_cells: # Es una puerta
+                        door = door_cells.get((map_x, map_y))
                         if door and door.is_open:
                             # Calcular punto de impacto exacto para ver si pasamos por el hueco
                             if hit_side == 'vertical':
@@ -124,6 +256,7 @@ class RayCaster:
                             # (Alineación de texturas)
                             # Simple check: if offset < open_amount, it's a gap
                             if hit_offset < door.open_amount:
+                                self.gap_columns.add(ray)
                                 continue # Pasar a través (hueco)
                             else:
                                 # Golpeamos la parte sólida de la puerta
@@ -177,12 +310,9 @@ class RayCaster:
                 'hit_pos': (map_x, map_y) # Approx pos
             }
             
-            self.rays.append(ray_info)
-            
-            # Siguiente rayo
-            ray_angle += settings.DELTA_ANGLE
+            rays.append(ray_info)
         
-        return self.rays
+        return rays
 
     def get_rays(self):
         """Retorna los rayos lanzados"""
@@ -1,6 +1,9 @@
 import pygame
 import settings
-from map import WORLD_MAP, MAP_WIDTH, MAP_HEIGHT, get_door_at_position
+import kernels
+from texture_manager import shade_variant
+from lightmap import Lightmap
+from map import WORLD_MAP, MAP_WIDTH, MAP_HEIGHT, get_door_at_position, world_version
 
 
 class Renderer:
@@ -9,10 +12,23 @@ class Renderer:
         self.texture_manager = texture_manager
         self.font = pygame.font.Font(None, 36)
         self.doors = None
+        self.lightmap = None   # Luz precalculada de las celdas (settings.BAKED_LIGHTING)
+        self.pvs = None        # PVS del nivel (settings.PVS): sprites fuera del del jugador no se dibujan
+        self.wall_bank = None  # Texturas de pared para kernels.draw_walls
+        self.minimap_cells = None  # Celdas del minimapa ya dibujadas
+        self.minimap_key = None    # (origen, versión del mundo) de minimap_cells
         
     def set_doors(self, doors):
-        """Asigna las puertas al renderer"""
+        """Asigna las puertas al renderer (y precalcula la luz del nivel con ellas)"""
         self.doors = doors
+        self.lightmap = Lightmap(doors) if settings.BAKED_LIGHTING else None
+
+    def _wall_lights(self, rays):
+        """Nivel de luz de la cara que ve cada rayo, o None sin luz precalculada"""
+        if self.lightmap is None or not settings.WALL_SHADING:
+            return None
+        self.lightmap.update()
+        return self.lightmap.ray_lights(rays)
         
     def render_scene(self, rays, player, sprites):
         """Renderiza la escena completa"""
@@ -61,6 +77,18 @@ class Renderer:
     
     def _draw_walls(self, rays, bob_offset=0):
         """Dibuja las paredes usando los rayos"""
+        if kernels.kernels_enabled():
+            if self.wall_bank is None or self.wall_bank.version != self.texture_manager.wall_version:
+                self.wall_bank = kernels.WallBank(self.texture_manager)
+            frame_cols = pygame.surfarray.pixels3d(self.screen)
+            kernels.draw_walls(frame_cols, self.wall_bank, rays, bob_offset, lights=self._wall_lights(rays))
+            del frame_cols  # Desbloquear la superficie
+            return
+        if settings.BATCHED_WALL_BLITS:
+            self._draw_walls_batched(rays, bob_offset)
+            return
+        
+        lights = self._wall_lights(rays)
         for i, ray in enumerate(rays):
             wall_height = ray['wall_height']
             wall_type = ray['wall_type']
@@ -70,11 +98,18 @@ class Renderer:
             wall_top = (settings.SCREEN_HEIGHT - wall_height) / 2 + bob_offset
             wall_bottom = wall_top + wall_height
             
-            # Obtener textura
-            texture = self.texture_manager.get_wall_texture(wall_type)
+            # Obtener textura (nivel de mipmap según la altura proyectada)
+            if settings.MIPMAPPING:
+                texture = self.texture_manager.get_wall_mip(wall_type, wall_height)
+            else:
+                texture = self.texture_manager.get_wall_texture(wall_type)
+            # Variante ya oscurecida según la distancia, el lado de la pared y la luz precalculada
+            if settings.WALL_SHADING:
+                variant = shade_variant(ray['depth'], ray['side'], lights[i] if lights else None)
+                texture = self.texture_manager.get_shaded_wall(texture, variant)
             
             # Obtener columna de textura
-            tex_col = int(texture_x * self.texture_manager.texture_size)
+            tex_col = int(texture_x * texture.get_width())
             
             # (Legacy door logic removed - RayCaster DDA handles sliding offset/transparency now)
             
@@ -87,16 +122,57 @@ class Renderer:
             x_pos = i * settings.SCALE
             self.screen.blit(column, (x_pos, wall_top))
     
+    def _draw_walls_batched(self, rays, bob_offset=0):
+        """
+        Mismas columnas que _draw_walls, pero escaladas desde columnas de textura ya
+        en el formato de la pantalla (sin conversión al blitear) y enviadas en una
+        sola llamada a Surface.blits
+        """
+        scale = pygame.transform.scale
+        get_columns = self.texture_manager.get_wall_columns
+        get_texture = self.texture_manager.get_wall_mip if settings.MIPMAPPING else None
+        get_shaded = self.texture_manager.get_shaded_wall if settings.WALL_SHADING else None
+        shaded_columns = {}  # (id de la textura, variante) -> columnas sombreadas de este frame
+        lights = self._wall_lights(rays) if get_shaded else None
+        column_width = settings.SCALE
+        screen_height = settings.SCREEN_HEIGHT
+        blits = []
+        for i, ray in enumerate(rays):
+            wall_height = ray['wall_height']
+            wall_top = (screen_height - wall_height) / 2 + bob_offset
+            if get_texture:
+                texture = get_texture(ray['wall_type'], wall_height)
+            else:
+                texture = self.texture_manager.get_wall_texture(ray['wall_type'])
+            if get_shaded:
+                variant = shade_variant(ray['depth'], ray['side'], lights[i] if lights else None)
+                key = (id(texture), variant)
+                columns = shaded_columns.get(key)
+                if columns is None:
+                    columns = shaded_columns[key] = get_columns(get_shaded(texture, variant))
+            else:
+                columns = get_columns(texture)
+            tex_col = int(ray['texture_x'] * len(columns))
+            if tex_col < 0 or tex_col >= len(columns):
+                tex_col = 0
+            blits.append((scale(columns[tex_col], (column_width, int(wall_height))), (i * column_width, wall_top)))
+        self.screen.blits(blits, doreturn=False)
+    
     def _draw_sprites(self, sprites, rays, player, bob_offset=0):
         """Dibuja los sprites en la escena"""
+        player_x, player_y = player.get_position()
+        
+        # Descartar los que están fuera del PVS de la celda del jugador
+        sees = self.pvs.viewer(player_x, player_y) if self.pvs else None
+        if sees:
+            sprites = [sprite for sprite in sprites if sees(sprite.x, sprite.y)]
+        
         # Ordenar sprites por distancia (más lejanos primero)
         sorted_sprites = sorted(sprites, key=lambda s: s.distance, reverse=True)
         
         # Crear buffer de profundidad desde los rayos
         depth_buffer = [ray['depth'] for ray in rays]
         
-        player_x, player_y = player.get_position()
-        
         for sprite in sorted_sprites:
             projection = sprite.get_sprite_projection(
                 player_x, player_y, player.angle, 
@@ -106,10 +182,11 @@ class Renderer:
             if projection is None:
                 continue
             
-            # Obtener textura del sprite
+            # Obtener textura del sprite (nivel de mipmap según el tamaño proyectado)
             texture = sprite.texture
             if texture is None:
                 continue
+            texture = self.texture_manager.get_sprite_mip(texture, projection['width'], projection['height'])
             
             # Escalar sprite
             try:
@@ -148,33 +225,44 @@ class Renderer:
                     )
     
     def draw_minimap(self, player):
-        """Dibuja el minimap"""
-        minimap_surface = pygame.Surface(
-            (MAP_WIDTH * settings.MINIMAP_TILE_SIZE, 
-             MAP_HEIGHT * settings.MINIMAP_TILE_SIZE)
-        )
-        minimap_surface.set_alpha(200)
+        """Dibuja el minimap (una ventana de MINIMAP_CELLS celdas alrededor del jugador)"""
+        player_x, player_y = player.get_position()
+        cells_x = min(MAP_WIDTH, settings.MINIMAP_CELLS)
+        cells_y = min(MAP_HEIGHT, settings.MINIMAP_CELLS)
+        origin_x = min(max(int(player_x) - cells_x // 2, 0), MAP_WIDTH - cells_x)
+        origin_y = min(max(int(player_y) - cells_y // 2, 0), MAP_HEIGHT - cells_y)
         
-        # Dibujar mapa
-        for y in range(MAP_HEIGHT):
-            for x in range(MAP_WIDTH):
-                color = settings.WHITE if WORLD_MAP[y][x] != 0 else settings.BLACK
-                pygame.draw.rect(
-                    minimap_surface,
-                    color,
-                    (x * settings.MINIMAP_TILE_SIZE,
-                     y * settings.MINIMAP_TILE_SIZE,
-                     settings.MINIMAP_TILE_SIZE,
-                     settings.MINIMAP_TILE_SIZE)
-                )
+        # Las celdas solo se vuelven a dibujar si la ventana se movió o cambió el mundo
+        key = (origin_x, origin_y, world_version())
+        if key != self.minimap_key:
+            self.minimap_cells = pygame.Surface(
+                (cells_x * settings.MINIMAP_TILE_SIZE, 
+                 cells_y * settings.MINIMAP_TILE_SIZE)
+            )
+            
+            # Dibujar mapa
+            for y in range(cells_y):
+                row = WORLD_MAP[origin_y + y]
+                for x in range(cells_x):
+                    color = settings.WHITE if row[origin_x + x] != 0 else settings.BLACK
+                    pygame.draw.rect(
+                        self.minimap_cells,
+                        color,
+                        (x * settings.MINIMAP_TILE_SIZE,
+                         y * settings.MINIMAP_TILE_SIZE,
+                         settings.MINIMAP_TILE_SIZE,
+                         settings.MINIMAP_TILE_SIZE)
+                    )
+            self.minimap_key = key
+        minimap_surface = self.minimap_cells.copy()
+        minimap_surface.set_alpha(200)
         
         # Dibujar jugador
-        player_x, player_y = player.get_position()
         pygame.draw.circle(
             minimap_surface,
             settings.RED,
-            (int(player_x * settings.MINIMAP_TILE_SIZE),
-             int(player_y * settings.MINIMAP_TILE_SIZE)),
+            (int((player_x - origin_x) * settings.MINIMAP_TILE_SIZE),
+             int((player_y - origin_y) * settings.MINIMAP_TILE_SIZE)),
             3
         )
         
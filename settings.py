@@ -10,15 +10,114 @@ FOV = math.pi / 3  # 60 grados
 HALF_FOV = FOV / 2
 NUM_RAYS = SCREEN_WIDTH // 2  # Número de rayos a lanzar
 MAX_DEPTH = 20  # Profundidad máxima de rayos
+# Rayos adaptativos (sin kernels): DDA en una columna de cada ADAPTIVE_RAY_STEP y las
+# intermedias interpoladas sobre la cara de pared cuando sus vecinas chocan con la misma
+ADAPTIVE_RAYS = True
+ADAPTIVE_RAY_STEP = 16
 DELTA_ANGLE = FOV / NUM_RAYS
 
+# Raycasting paralelo (pool de procesos sobre franjas de columnas)
+PARALLEL_RAYCASTING = False
+RAYCAST_WORKERS = 4
+# Por debajo de este número de columnas el coste de IPC supera la ganancia: se lanza en serie
+PARALLEL_MIN_COLUMNS = 256
+
+# Kernels de los bucles internos (DDA y columnas de pared), ver kernels.py
+# 'auto' = compilados con numba si está instalado, 'kernel' = siempre, 'reference' = nunca
+KERNEL_MODE = 'auto'
+
+# Rasterizado paralelo de paredes y sprites sobre un back buffer compartido (requiere NumPy)
+PARALLEL_RENDERING = False
+RENDER_WORKERS = 4
+
+# IA de enemigos por lotes (estado en arrays NumPy, compensa con muchos enemigos)
+BATCHED_ENEMIES = False
+
+# Nivel de detalle de la IA: cercanos/visibles cada tick, lejanos cada AI_FAR_INTERVAL
+# ticks y los IDLE más allá de AI_DORMANT_DISTANCE solo al oír un disparo
+AI_LOD = True
+AI_NEAR_DISTANCE = 8.0
+AI_FAR_INTERVAL = 4
+AI_DORMANT_DISTANCE = 20.0
+AI_NOISE_RADIUS = 16.0  # Alcance del ruido de un disparo
+AI_BUDGET_MS = 2.0      # Tiempo máximo de IA por tick (enemigos objeto)
+
 # Configuración del jugador
 PLAYER_SPEED = 0.05  # Velocidad de movimiento
 PLAYER_ROT_SPEED = 0.03  # Velocidad de rotación
+# Mouse: 'relative' acumula el movimiento relativo de los eventos y lo aplica en el
+# tick; 'warp' lee la posición del puntero y lo recentra cada frame (modo antiguo)
+MOUSE_MODE = 'relative'
+MOUSE_SENSITIVITY = 0.001
+
+# Grabación y reproducción de la entrada (ver input_log.py): ruta del registro o None
+INPUT_RECORD = None  # Graba cada tick de la partida
+INPUT_REPLAY = None  # Reproduce un registro en lugar de la entrada real
+
+# Mipmaps de texturas de pared y sprites (nivel según el tamaño proyectado)
+MIPMAPPING = True
+
+# Sombreado de paredes: SHADE_LEVELS niveles de brillo por distancia (el último a partir
+# de SHADE_DISTANCE, con brillo SHADE_MIN) y las caras 'horizontal' multiplicadas por
+# SIDE_SHADE. Las texturas se oscurecen una vez por variante (sin coste por píxel)
+WALL_SHADING = True
+SHADE_LEVELS = 8
+SHADE_DISTANCE = 16.0
+SHADE_MIN = 0.35
+SIDE_SHADE = 0.75
+
+# Luz precalculada (ver lightmap.py): los sprites LIGHT_SPRITES alumbran las celdas a
+# menos de LIGHT_RADIUS que ven sin paredes de por medio. Se aplica con el sombreado de
+# paredes en LIGHT_LEVELS niveles; una cara sin luz queda a LIGHT_AMBIENT de brillo
+BAKED_LIGHTING = True
+LIGHT_SPRITES = ('greenlight',)
+LIGHT_RADIUS = 5.0
+LIGHT_LEVELS = 4
+LIGHT_AMBIENT = 0.6
+
+# Paredes sin kernels: columnas de textura ya convertidas al formato de la pantalla y
+# un solo Surface.blits por frame en lugar de un blit por columna
+BATCHED_WALL_BLITS = True
+
+# Texturas de pared bajo demanda: al arrancar solo se cargan las que usa el mapa,
+# el resto se carga la primera vez que la ve el raycaster (con un color provisional
+# mientras tanto) y las que llevan TEXTURE_EVICT_SECONDS sin verse se descargan si
+# se supera TEXTURE_BUDGET_KB
+LAZY_TEXTURES = True
+TEXTURE_BUDGET_KB = 256  # Unas 11 texturas de 64x64 con sus mipmaps (de 23)
+TEXTURE_EVICT_SECONDS = 30
 
 # Tamaño del mapa
 TILE_SIZE = 1.0
 
+# Archivo del nivel (relativo a la carpeta del juego, ver level.py)
+LEVEL_FILE = 'levels/e1m1.txt'
+
+# Mundo por trozos para niveles grandes (ver world_stream.py): solo los chunks a
+# STREAM_RADIUS chunks del jugador están en memoria, como mucho STREAM_MAX_CHUNKS
+STREAMING_WORLD = False
+STREAM_CHUNK_SIZE = 32
+STREAM_RADIUS = 1  # Con chunks de 32 celdas cubre MAX_DEPTH desde cualquier posición
+STREAM_MAX_CHUNKS = 16
+
+# Conjuntos potencialmente visibles por celda (ver pvs.py): sprites, enemigos, IA y
+# sonidos fuera del PVS de la celda del jugador se descartan. Se calcula una vez por
+# nivel (bloques de PVS_CLUSTER celdas, PVS_RAYS rayos desde 5 puntos de cada celda
+# hasta PVS_DISTANCE, que debe cubrir MAX_DEPTH, AI_DORMANT_DISTANCE y SOUND_MAX_DISTANCE).
+# Es un muestreo, no un cálculo exacto: lo visible solo por una rendija entre dos rayos
+# puede quedar fuera. PVS_MARGIN (celdas) amplía cada celda vista a sus vecinas para
+# cubrir esos huecos; con menos margen se descarta más pero es menos conservador.
+# Al arrancar solo se calcula si el nivel tiene como mucho PVS_BUILD_LIMIT celdas
+# transitables (PVS_BUILD_LIMIT_PYTHON sin numba, unos 2 s en ambos casos); los niveles
+# más grandes se juegan sin PVS hasta calcularlo fuera del juego con python pvs.py nivel.
+PVS = True
+PVS_CLUSTER = 4
+PVS_RAYS = 720
+PVS_MARGIN = 2
+PVS_DISTANCE = 22.0
+PVS_BUILD_LIMIT = 20000
+PVS_BUILD_LIMIT_PYTHON = 256
+
 # Colores
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -35,6 +134,7 @@ CEILING_COLOR = (100, 100, 100)
 # Configuración del minimap
 MINIMAP_SCALE = 5
 MINIMAP_TILE_SIZE = 10
+MINIMAP_CELLS = 16  # Celdas visibles por lado (los mapas más grandes se recortan alrededor del jugador)
 MINIMAP_OFFSET_X = 10
 MINIMAP_OFFSET_Y = 10
 
@@ -43,3 +143,21 @@ SCALE = SCREEN_WIDTH // NUM_RAYS
 
 # Configuración de sonido
 SOUND_ENABLED = True
+# Canales del mixer reservados por grupo: los sonidos de un grupo solo compiten entre sí
+SOUND_CHANNEL_GROUPS = {'player': 4, 'world': 4, 'enemies': 8}
+SOUND_MAX_DISTANCE = 20.0  # Más lejos no se oye un emisor
+SOUND_MIN_VOLUME = 0.05    # Por debajo de este volumen no se reproduce
+# Banco de audio: PCM de todos los sonidos ya convertido al formato del mixer (ver audio_bank.py)
+AUDIO_BANK = True
+AUDIO_BANK_FILE = 'sound_bank.bin'
+
+# Caché binaria de assets preprocesados (ver asset_cache.py)
+ASSET_CACHE = True
+ASSET_CACHE_FILE = 'asset_cache.bin'
+
+# Arranque diferido: el mixer, los sonidos y las imágenes del HUD se cargan con
+# su primer uso en lugar de antes del primer frame
+DEFERRED_INIT = True
+
+# Hilos para decodificar PNG/WAV en paralelo durante la carga (ver asset_loader.py)
+ASSET_LOADER_THREADS = 4
@@ -1,47 +1,233 @@
+import math
 import pygame
 import os
+import settings
 
 
 class SoundManager:
-    def __init__(self):
-        self.sounds = {}
+    # Sonidos registrados: nombre -> (archivo en sound/, prioridad, voces simultáneas
+    # como máximo). Al llenarse un grupo de canales se roba la voz de menor prioridad
+    # y, a igual prioridad, la más baja. Se cargan con su primer uso desde el banco de
+    # audio, así que registrar más no alarga el arranque (ver register).
+    SOUNDS = {
+        # Armas
+        'knife': ('Knife.wav', 50, 2),
+        'pistol': ('Pistol.wav', 50, 3),
+        'machinegun': ('Machine Gun.wav', 50, 3),
+        'gatling': ('Gatling Gun.wav', 50, 3),
+        'flamethrower': ('Flamethrower.wav', 50, 2),
+        'rocket_launcher': ('Rocket Launcher.wav', 50, 2),
+        'rocket_explode': ('Rocket Explode.wav', 70, 3),
+        'boss_gun': ('Boss Gun.wav', 50, 3),
+        # Mundo
+        'door': ('Door.wav', 60, 2),
+        'secret': ('Secret Entrance.wav', 70, 1),
+        'switch': ('Switch.wav', 60, 1),
+        'pickup': ('Pickup.wav', 60, 2),
+        'ammo': ('Ammo.wav', 60, 2),
+        'health': ('Health.wav', 60, 2),
+        'key': ('Key.wav', 60, 1),
+        # Jugador
+        'thud': ('Thud!.wav', 10, 1),
+        'pain': ('Player Pain 1.wav', 80, 1),
+        'pain_2': ('Player Pain 2.wav', 80, 1),
+        'death': ('Death 1.wav', 100, 1),
+        'player_dies': ('Player Dies.wav', 100, 1),
+        'all_right': ('All Right!.wav', 90, 1),
+        'yeeeah': ('Yeeeah!.wav', 90, 1),
+        # Enemigos
+        'achtung': ('Achtung!.wav', 40, 2),
+        'guten_tag': ('Guten Tag!.wav', 90, 1),
+        'halt': ('Halt.wav', 40, 2),
+        'halt_2': ('Halt 2.wav', 40, 2),
+        'halten_sie': ('Halten Sie!.wav', 40, 2),
+        'sheisse': ('Sheisse!.wav', 40, 2),
+        'sheisse_koph': ('Sheisse-koph.wav', 40, 2),
+        'oof': ('Oof!.wav', 40, 2),
+        'enemy_pain': ('Enemy Pain.wav', 40, 2),
+        'enemy_death': ('Death 2.wav', 40, 2),
+        'dog': ('Dog.wav', 40, 2),
+        'dog_death': ('Dog Death.wav', 40, 2),
+        'boss_speak_1': ('Boss Speak 1.wav', 90, 1),
+        'boss_speak_2': ('Boss Speak 2.wav', 90, 1),
+        'metal_hoof': ('Metal Hoof.wav', 20, 2),
+        'mechahitler_hoof': ('Mechahitler Hoof.wav', 20, 2),
+        # Menús
+        'menu_select': ('Menu Select.wav', 90, 1),
+        'menu_toggle': ('Menu Toggle.wav', 90, 1),
+    }
+    
+    def __init__(self, audio_bank=None, asset_loader=None, deferred=False):
+        self.sounds = {}  # Sonidos ya creados (el resto se crea con su primer play)
+        self.missing = set()  # Sonidos registrados cuyo archivo no se pudo cargar
+        self.listener = None  # Objeto con x, y y angle (el jugador) para el paneo y la atenuación
+        self.pvs = None       # PVS del nivel (settings.PVS): emisores fuera del del oyente no suenan
+        self.groups = {}      # grupo -> [Channel]
+        self.voices = {}      # Channel -> (nombre, prioridad, volumen) de lo que suena en él
+        self.stats = {'played': 0, 'stolen': 0, 'dropped': 0, 'culled': 0}
+        self.audio_bank = audio_bank  # AudioBank opcional con el PCM ya convertido
+        self.asset_loader = asset_loader  # AssetLoader opcional que decodifica en hilos
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.sound_dir = os.path.join(self.base_dir, 'sound')
         
-        # Inicializar mixer
-        pygame.mixer.init()
+        # Inicializar mixer y cargar sonidos (o en el primer play si se difiere el arranque)
+        self.loaded = False
+        if not deferred:
+            self.load_sounds()
         
-        self.load_sounds()
+    @classmethod
+    def register(cls, name, filename, priority=50, max_voices=2):
+        """Registra un sonido nuevo (antes de cargar los sonidos para que entre en el banco)"""
+        cls.SOUNDS[name] = (filename, priority, max_voices)
+        
+    @classmethod
+    def asset_paths(cls):
+        """Archivos que lee load_sounds (para decodificarlos por adelantado)"""
+        sound_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sound')
+        return list(dict.fromkeys(os.path.join(sound_dir, filename) for filename, _, _ in cls.SOUNDS.values()))
+        
+    def _decode(self, path):
+        """Decodifica y convierte un WAV al formato del mixer"""
+        if self.asset_loader:
+            return self.asset_loader.get_sound(path)
+        return pygame.mixer.Sound(path)
         
     def load_sounds(self):
-        """Carga los sonidos del juego"""
-        sound_files = {
-            'pistol': 'Pistol.wav',
-            'door': 'Door.wav',
-            'death': 'Death 1.wav',
-            'pain': 'Player Pain 1.wav',
-            'pickup': 'Pickup.wav',
-            'thud': 'Thud!.wav',
-            'achtung': 'Achtung!.wav',
-            'guten_tag': 'Guten Tag!.wav'
-        }
+        """Inicializa el mixer y prepara los sonidos (desde el banco de audio si lo hay)"""
+        self.loaded = True
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        self._reserve_channels()
         
         print("Cargando sonidos...")
-        for name, filename in sound_files.items():
-            filepath = os.path.join(self.sound_dir, filename)
-            if os.path.exists(filepath):
+        paths = self.asset_paths()
+        if self.audio_bank:
+            bank = self.audio_bank
+            if not bank.open(pygame.mixer.get_init()) or not all(bank.has_source(p) for p in paths):
                 try:
-                    self.sounds[name] = pygame.mixer.Sound(filepath)
-                    print(f"  ✓ Sonido {name} cargado")
+                    bank.build(paths, self._decode)
                 except Exception as e:
-                    print(f"  ! Error cargando sonido {name}: {e}")
-            else:
-                print(f"  ! Archivo de sonido no encontrado: {filename}")
+                    print(f"  ! Error escribiendo el banco de audio: {e}")
+            print(f"  ✓ Banco de audio: {len(bank.valid)} sonidos al día")
+            return
+        
+        # Sin banco: convertir todos los WAV ahora
+        for name in self.SOUNDS:
+            if self.get_sound(name) is not None:
+                print(f"  ✓ Sonido {name} cargado")
                 
-    def play(self, name):
-        """Reproduce un sonido"""
-        if name in self.sounds:
-            self.sounds[name].play()
+    def get_sound(self, name):
+        """Sound de un sonido registrado (lo crea la primera vez), o None"""
+        sound = self.sounds.get(name)
+        if sound is not None or name not in self.SOUNDS or name in self.missing:
+            return sound
+        filepath = os.path.join(self.sound_dir, self.SOUNDS[name][0])
+        if self.audio_bank:
+            sound = self.audio_bank.load_sound(filepath)
+        if sound is None:
+            if not os.path.exists(filepath):
+                print(f"  ! Archivo de sonido no encontrado: {self.SOUNDS[name][0]}")
+                self.missing.add(name)
+                return None
+            try:
+                sound = self._decode(filepath)
+            except Exception as e:
+                print(f"  ! Error cargando sonido {name}: {e}")
+                self.missing.add(name)
+                return None
+        self.sounds[name] = sound
+        return sound
+                
+    def _reserve_channels(self):
+        """Reparte los canales del mixer entre los grupos de SOUND_CHANNEL_GROUPS"""
+        total = sum(settings.SOUND_CHANNEL_GROUPS.values())
+        pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)  # Sound.play() suelto no puede robarlos
+        first = 0
+        for group, count in settings.SOUND_CHANNEL_GROUPS.items():
+            self.groups[group] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            first += count
+        
+    def set_listener(self, listener):
+        """Asigna quién escucha (normalmente el jugador)"""
+        self.listener = listener
+        
+    def _spatialize(self, position):
+        """Volumen (izquierdo, derecho) de un emisor según su distancia y ángulo respecto al oyente"""
+        dx = position[0] - self.listener.x
+        dy = position[1] - self.listener.y
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance >= settings.SOUND_MAX_DISTANCE:
+            return 0.0, 0.0
+        volume = (1.0 - distance / settings.SOUND_MAX_DISTANCE) ** 2
+        if distance < 1e-6:
+            return volume, volume
+        # Ángulo positivo = a la derecha de la vista (como la proyección de sprites)
+        pan = math.sin(math.atan2(dy, dx) - self.listener.angle)
+        return volume * min(1.0, 1.0 - pan), volume * min(1.0, 1.0 + pan)
+        
+    def _pick_channel(self, group, name, priority, volume, max_voices):
+        """Canal libre del grupo, o la voz a robar; None si la nueva no gana a ninguna"""
+        free = None
+        busy = []
+        same = []
+        for channel in self.groups.get(group, ()):
+            voice = self.voices.get(channel)
+            if voice is None or not channel.get_busy():
+                if free is None:
+                    free = channel
+                continue
+            busy.append((voice, channel))
+            if voice[0] == name:
+                same.append((voice, channel))
+        
+        if len(same) >= max_voices:
+            candidates = same
+        elif free is not None:
+            return free
+        else:
+            candidates = busy
+        voice, channel = min(candidates, key=lambda item: (item[0][1], item[0][2]))
+        if (priority, volume) > (voice[1], voice[2]):
+            self.stats['stolen'] += 1
+            return channel
+        return None
+        
+    def play(self, name, position=None, group=None):
+        """
+        Reproduce un sonido. Con position (x, y) se panea y atenúa respecto al
+        oyente; group es el grupo de canales ('player' sin posición, 'world' con
+        ella por defecto). Retorna el Channel usado o None si no sonó.
+        """
+        if not self.loaded:
+            self.load_sounds()
+        sound = self.get_sound(name)
+        if sound is None:
+            return None
+        if group is None:
+            group = 'player' if position is None else 'world'
+        
+        left = right = 1.0
+        if position is not None and self.listener is not None:
+            if self.pvs and not self.pvs.sees(self.listener.x, self.listener.y, *position):
+                self.stats['culled'] += 1
+                return None
+            left, right = self._spatialize(position)
+            if max(left, right) < settings.SOUND_MIN_VOLUME:
+                self.stats['culled'] += 1
+                return None
+        
+        _, priority, max_voices = self.SOUNDS[name]
+        volume = max(left, right)
+        channel = self._pick_channel(group, name, priority, volume, max_voices)
+        if channel is None:
+            self.stats['dropped'] += 1
+            return None
+        channel.play(sound)
+        channel.set_volume(left, right)  # Después de play: play reinicia el volumen estéreo
+        self.voices[channel] = (name, priority, volume)
+        self.stats['played'] += 1
+        return channel
             
     def play_random_enemy_sound(self):
         """Reproduce un sonido de enemigo aleatorio"""
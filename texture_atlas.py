@@ -0,0 +1,128 @@
+import pygame
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+class TextureAtlas:
+    """
+    Almacén de texturas respaldado por NumPy.
+
+    Las texturas de pared, los frames de sprites y las imágenes del HUD se registran
+    con add(clave, surface) y build() las empaqueta en un único array RGBA contiguo
+    (alto, ancho, 4). Cada entrada tiene su rect dentro del atlas y las paredes
+    tienen además una copia transpuesta (columna por columna) en wall_columns, para
+    que los renderers vectorizados muestreen sin bloquear Surfaces ni convertir por frame.
+
+    Claves usadas por el juego:
+        ('wall', id), ('sprite', nombre), ('guard', animación, i),
+        ('weapon', arma, i), ('hud', 'face', i), ('hud', 'weapon', arma)
+    """
+    def __init__(self, width=2048):
+        self.width = width
+        self.surfaces = {}      # clave -> Surface pendiente de empaquetar
+        self.surface_keys = {}  # id(Surface) -> primera clave con esa superficie
+        self.rects = {}         # clave -> (x, y, ancho, alto) dentro del atlas
+        self.pixels = None      # Array (alto, ancho, 4) uint8
+        self.wall_columns = None  # Array (n, tex, tex, 4): wall_columns[slot, x] es una columna
+        self.wall_slot = None     # tipo de pared -> índice en wall_columns
+        self.wall_ids = []        # tipos de pared en wall_columns, en orden de slot
+        self.built = False
+
+    def add(self, key, surface):
+        """
+        Registra una superficie; si ya estaba registrada con otra clave, comparte su entrada.
+        Las añadidas después de build() quedan pendientes hasta el siguiente build().
+        """
+        if surface is None or key in self.surfaces:
+            return
+        self.surfaces[key] = surface
+        self.surface_keys.setdefault(id(surface), key)
+
+    def discard(self, key):
+        """
+        Olvida la superficie de una clave (p. ej. una textura descargada) para no
+        retenerla; su copia empaquetada sigue en pixels hasta el siguiente build().
+        """
+        surface = self.surfaces.pop(key, None)
+        if surface is not None and self.surface_keys.get(id(surface)) == key:
+            del self.surface_keys[id(surface)]
+
+    def key_for(self, surface):
+        """Clave del atlas de una superficie ya empaquetada, o None"""
+        key = self.surface_keys.get(id(surface))
+        return key if key in self.rects else None
+
+    def _surface_to_rgba(self, surface):
+        """Copia una superficie a (alto, ancho, 4); el colorkey se convierte en alpha 0"""
+        rgb = pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+        if surface.get_flags() & pygame.SRCALPHA:
+            alpha = pygame.surfarray.array_alpha(surface).T
+        else:
+            alpha = np.full(rgb.shape[:2], 255, dtype=np.uint8)
+        colorkey = surface.get_colorkey()
+        if colorkey is not None:
+            alpha = np.where((rgb == colorkey[:3]).all(axis=2), 0, alpha).astype(np.uint8)
+        return np.dstack((rgb, alpha))
+
+    def build(self):
+        """Empaqueta todas las superficies registradas (estantes ordenados por altura)"""
+        if not HAS_NUMPY:
+            print("  ! NumPy no disponible: atlas de texturas desactivado")
+            return False
+
+        # Una sola entrada por superficie distinta
+        unique = {}
+        for key, surface in self.surfaces.items():
+            unique.setdefault(id(surface), (key, surface))
+        entries = sorted(unique.values(), key=lambda e: e[1].get_height(), reverse=True)
+
+        width = max([self.width] + [surface.get_width() for _, surface in entries])
+        placements = {}
+        x = y = shelf_height = 0
+        for key, surface in entries:
+            w, h = surface.get_size()
+            if x + w > width:
+                x = 0
+                y += shelf_height
+                shelf_height = 0
+            placements[id(surface)] = (x, y, w, h)
+            x += w
+            shelf_height = max(shelf_height, h)
+        height = y + shelf_height
+
+        self.pixels = np.zeros((max(1, height), width, 4), dtype=np.uint8)
+        for key, surface in entries:
+            x, y, w, h = placements[id(surface)]
+            self.pixels[y:y + h, x:x + w] = self._surface_to_rgba(surface)
+        self.rects = {key: placements[id(surface)] for key, surface in self.surfaces.items()}
+
+        # Paredes: copia transpuesta contigua y tabla tipo -> slot
+        wall_ids = sorted(key[1] for key in self.surfaces if key[0] == 'wall')
+        self.wall_ids = wall_ids
+        if wall_ids:
+            self.wall_columns = np.stack([
+                np.ascontiguousarray(self.get(('wall', wall_id)).transpose(1, 0, 2))
+                for wall_id in wall_ids
+            ])
+            default = wall_ids.index(1) if 1 in wall_ids else 0
+            self.wall_slot = np.full(256, default, dtype=np.int32)
+            for slot, wall_id in enumerate(wall_ids):
+                if 0 <= wall_id < 256:
+                    self.wall_slot[wall_id] = slot
+
+        self.built = True
+        print(f"  ✓ Atlas de texturas: {len(entries)} imágenes en {width}x{height} "
+              f"({self.pixels.nbytes // 1024} KB)")
+        return True
+
+    def get(self, key):
+        """Vista (alto, ancho, 4) de una entrada dentro del atlas"""
+        x, y, w, h = self.rects[key]
+        return self.pixels[y:y + h, x:x + w]
+
+    def get_columns(self, key):
+        """Vista (ancho, alto, 4) de una entrada: indexar por x da una columna"""
+        return self.get(key).transpose(1, 0, 2)
@@ -1,83 +1,213 @@
 import pygame
 import os
-try:
-    from PIL import Image
-    HAS_PILLOW = True
-except ImportError:
-    HAS_PILLOW = False
+import time
+import settings
+from texture_atlas import TextureAtlas
+
+
+def load_pillow():
+    """PIL.Image, or None. Imported only when PyGame fails to decode a file (it is slow to import)."""
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+def select_mip_level(size, projected, num_levels):
+    """Smallest mip level whose size (size >> level) still covers the projected size in pixels."""
+    level = 0
+    while level + 1 < num_levels and (size >> (level + 1)) >= projected:
+        level += 1
+    return level
+
+
+def build_mip_chain(surface):
+    """Box-filtered mip chain [full, 1/2, 1/4, ... 1x1] of a surface, keeping its colorkey."""
+    chain = [surface]
+    colorkey = surface.get_colorkey()
+    width, height = surface.get_size()
+    while width > 1 and height > 1:
+        width //= 2
+        height //= 2
+        try:
+            level = pygame.transform.smoothscale(chain[-1], (width, height))
+        except ValueError:
+            # smoothscale needs 24/32-bit surfaces
+            level = pygame.transform.scale(chain[-1], (width, height))
+        if colorkey is not None:
+            level.set_colorkey(colorkey)
+        chain.append(level)
+    return chain
+
+
+_shade_tables = {}  # shading settings -> per-variant 256-entry tables (see shade_table)
+
+
+def shade_factors():
+    """
+    Brightness multiplier (0-255) of every shade variant: SHADE_LEVELS depth buckets,
+    then their side variants, repeated for each baked light level (see lightmap.py).
+    """
+    levels = settings.SHADE_LEVELS
+    light_top = max(1, settings.LIGHT_LEVELS - 1)
+    ambient = settings.LIGHT_AMBIENT
+    factors = []
+    for light in range(settings.LIGHT_LEVELS):
+        lit = ambient + (1.0 - ambient) * light / light_top
+        for side in (1.0, settings.SIDE_SHADE):
+            for bucket in range(levels):
+                brightness = 1.0 - (1.0 - settings.SHADE_MIN) * bucket / max(1, levels - 1)
+                factors.append(round(255 * brightness * side * lit))
+    return factors
+
+
+def shade_bucket(depth):
+    """Depth bucket (0 to SHADE_LEVELS - 1) of a distance; element-wise on NumPy arrays."""
+    levels = settings.SHADE_LEVELS
+    scaled = depth * levels / settings.SHADE_DISTANCE
+    if hasattr(scaled, 'clip'):
+        return scaled.clip(0, levels - 1).astype(int)  # Truncates like int() below
+    return min(levels - 1, int(scaled)) if scaled > 0 else 0
+
+
+def shade_variant(depth, side, light=None):
+    """
+    Shade variant of a wall hit: depth bucket, offset by SHADE_LEVELS on 'horizontal'
+    sides and by 2 * SHADE_LEVELS per light level (None = fully lit, no baked lighting).
+    Also works on NumPy arrays of depths, sides and light levels (kernels.shade_arrays).
+    """
+    levels = settings.SHADE_LEVELS
+    if light is None:
+        light = settings.LIGHT_LEVELS - 1
+    return (2 * light + (side == 'horizontal')) * levels + shade_bucket(depth)
+
+
+def shade_table():
+    """
+    Per-variant lookup tables (256 bytes each) mapping a channel value to its shaded
+    value. They are read back from a ramp shaded with the same BLEND_RGB_MULT fill
+    as the pre-shaded textures, so array renderers match the surface path exactly.
+    """
+    factors = shade_factors()
+    key = tuple(factors)
+    tables = _shade_tables.get(key)
+    if tables is None:
+        tables = []
+        for factor in factors:
+            ramp = pygame.Surface((256, 1))
+            for value in range(256):
+                ramp.set_at((value, 0), (value, value, value))
+            ramp.fill((factor, factor, factor), special_flags=pygame.BLEND_RGB_MULT)
+            tables.append(bytes(ramp.get_at((value, 0))[0] for value in range(256)))
+        _shade_tables[key] = tables
+    return tables
+
+
+def used_wall_ids(world_map):
+    """Wall ids referenced by a map, plus texture 1 (used for out-of-bounds hits and unknown ids)."""
+    ids = {1}
+    for row in world_map:
+        ids.update(cell for cell in row if cell != 0)
+    return ids
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 class TextureManager:
-    def __init__(self):
+    WALL_TEXTURE_FILES = {
+        1: os.path.join(BASE_DIR, 'textures', '1.png'),
+        2: os.path.join(BASE_DIR, 'textures', '2.png'),
+        3: os.path.join(BASE_DIR, 'textures', '3.png'),
+        4: os.path.join(BASE_DIR, 'textures', '4.png'),
+        5: os.path.join(BASE_DIR, 'textures', '5.png'),
+        6: os.path.join(BASE_DIR, 'textures', '6.png'),
+        7: os.path.join(BASE_DIR, 'textures', 'door.png'),
+        8: os.path.join(BASE_DIR, 'textures', 'bluestone.png'),
+        9: os.path.join(BASE_DIR, 'textures', 'colorstone.png'),
+        10: os.path.join(BASE_DIR, 'textures', 'eagle.png'),
+        11: os.path.join(BASE_DIR, 'textures', 'greystone.png'),
+        12: os.path.join(BASE_DIR, 'textures', 'mossy.png'),
+        13: os.path.join(BASE_DIR, 'textures', 'purplestone.png'),
+        14: os.path.join(BASE_DIR, 'textures', 'redbrick.png'),
+        15: os.path.join(BASE_DIR, 'textures', 'wood.png'),
+        16: os.path.join(BASE_DIR, 'textures', 'wolf12.png'),
+        17: os.path.join(BASE_DIR, 'textures', 'wolf15.png'),
+        18: os.path.join(BASE_DIR, 'textures', 'wolf68.png'),
+        19: os.path.join(BASE_DIR, 'textures', 'wolf69.png'),
+        20: os.path.join(BASE_DIR, 'textures', 'wolf100.png'),
+        21: os.path.join(BASE_DIR, 'textures', 'wolf105.png'),
+        22: os.path.join(BASE_DIR, 'textures', 'wolf106.png'),
+        23: os.path.join(BASE_DIR, 'textures', 'grey stone wall.png'),
+    }
+    SPRITE_FILES = {
+        'barrel': os.path.join(BASE_DIR, 'sprites', 'barrel.png'),
+        'pillar': os.path.join(BASE_DIR, 'sprites', 'pillar.png'),
+        'greenlight': os.path.join(BASE_DIR, 'sprites', 'greenlight.png'),
+        'guard': os.path.join(BASE_DIR, 'sprites', 'guard.png'),
+    }
+
+    def __init__(self, asset_cache=None, asset_loader=None):
+        self.asset_cache = asset_cache  # Optional AssetCache with pre-decoded images
+        self.asset_loader = asset_loader  # Optional AssetLoader decoding files in a thread pool
         self.wall_textures = {}
         self.sprite_textures = {}
         self.texture_size = 64  # Standard texture size
+        self.atlas = TextureAtlas()  # NumPy-backed copy of every texture, built after all loads
+        self.wall_mipmaps = {}    # wall_id -> [64x64, 32x32, ... 1x1]
+        self.sprite_mipmaps = {}  # id(Surface) -> mip chain of a sprite frame
+        self.wall_columns = {}    # id(Surface) -> (wall texture or mip level, its display-format columns)
+        self.wall_columns_version = 0  # wall_version the column and shading caches were built for
+        self.shaded_walls = {}    # id(Surface) -> (wall texture or mip level, {variant: shaded copy})
 
-    def load_textures(self):
-        """Load all wall and sprite textures, with fallbacks and proper alpha handling."""
-        base_dir = os.path.dirname(os.path.abspath(__file__))
+        # Wall texture residency (see update_residency)
+        self.placeholders = {}    # wall_id -> (solid color texture, mip chain) shown until loaded
+        self.pending_walls = {}   # wall_id -> path being decoded
+        self.last_used = {}       # wall_id -> time the raycaster last hit it
+        self.wall_version = 0     # Bumped whenever a wall texture is loaded or evicted
+
+    @classmethod
+    def asset_paths(cls, wall_ids=None):
+        """Image files read by load_textures (for prefetching)."""
+        walls = [path for wall_id, path in cls.WALL_TEXTURE_FILES.items()
+                 if wall_ids is None or wall_id in wall_ids]
+        return walls + list(cls.SPRITE_FILES.values())
+
+    def _decode(self, path):
+        """Decode an image file, through the thread pool when there is an asset loader."""
+        if self.asset_loader:
+            return self.asset_loader.get_image(path)
+        return pygame.image.load(path)
+
+    def load_textures(self, wall_ids=None):
+        """Load wall textures (only wall_ids if given, the rest on demand) and all sprite textures."""
         print("Cargando texturas...")
 
         # ---- Wall textures ----
-        wall_texture_files = {
-            1: os.path.join(base_dir, 'textures', '1.png'),
-            2: os.path.join(base_dir, 'textures', '2.png'),
-            3: os.path.join(base_dir, 'textures', '3.png'),
-            4: os.path.join(base_dir, 'textures', '4.png'),
-            5: os.path.join(base_dir, 'textures', '5.png'),
-            6: os.path.join(base_dir, 'textures', '6.png'),
-            7: os.path.join(base_dir, 'textures', 'door.png'),
-        }
-        for wall_id, path in wall_texture_files.items():
-            texture_loaded = False
-            if os.path.exists(path):
-                try:
-                    tex = pygame.image.load(path).convert()
-                    tex = pygame.transform.scale(tex, (self.texture_size, self.texture_size))
-                    self.wall_textures[wall_id] = tex
-                    texture_loaded = True
-                    print(f"  ✓ Textura {wall_id} cargada desde archivo (PyGame)")
-                except Exception as e:
-                    print(f"  ! Error PyGame cargando textura {wall_id}: {e}")
-                    if HAS_PILLOW:
-                        try:
-                            pil_img = Image.open(path).convert('RGB')
-                            mode = pil_img.mode
-                            size = pil_img.size
-                            data = pil_img.tobytes()
-                            tex = pygame.image.fromstring(data, size, mode).convert()
-                            tex = pygame.transform.scale(tex, (self.texture_size, self.texture_size))
-                            self.wall_textures[wall_id] = tex
-                            texture_loaded = True
-                            print(f"  ✓ Textura {wall_id} cargada con Pillow (RGB)")
-                        except Exception as pil_e:
-                            print(f"  ! Error Pillow cargando textura {wall_id}: {pil_e}")
-            if not texture_loaded:
-                # fallback solid color
-                tex = pygame.Surface((self.texture_size, self.texture_size))
-                tex.fill(self._get_fallback_color(wall_id))
-                self.wall_textures[wall_id] = tex
-                print(f"  ✓ Textura {wall_id} usando color sólido")
+        for wall_id, path in self.WALL_TEXTURE_FILES.items():
+            if wall_ids is None or wall_id in wall_ids:
+                self._load_wall_texture(wall_id, path)
 
         # ---- Sprite textures ----
-        sprite_files = {
-            'barrel': os.path.join(base_dir, 'sprites', 'barrel.png'),
-            'pillar': os.path.join(base_dir, 'sprites', 'pillar.png'),
-            'greenlight': os.path.join(base_dir, 'sprites', 'greenlight.png'),
-            'guard': os.path.join(base_dir, 'sprites', 'guard.png'),
-        }
+        sprite_files = self.SPRITE_FILES
         for name, path in sprite_files.items():
+            cached = self.asset_cache.load_image(('sprite', name)) if self.asset_cache else None
+            if cached is not None:
+                self.sprite_textures[name] = cached
+                continue
             sprite_loaded = False
             if os.path.exists(path):
                 try:
-                    spr = pygame.image.load(path).convert_alpha()
+                    spr = self._decode(path).convert_alpha()
                     spr.set_colorkey((0, 0, 0))
                     self.sprite_textures[name] = spr
                     sprite_loaded = True
                     print(f"  ✓ Sprite {name} cargado desde archivo (PyGame)")
                 except Exception as e:
                     print(f"  ! Error PyGame cargando sprite {name}: {e}")
-                    if HAS_PILLOW:
+                    Image = load_pillow()
+                    if Image:
                         try:
                             pil_img = Image.open(path).convert('RGBA')
                             mode = pil_img.mode
@@ -103,6 +233,157 @@ class TextureManager:
                 pygame.draw.circle(spr, color, (32, 32), 30)
                 self.sprite_textures[name] = spr
                 print(f"  ✓ Sprite {name} usando forma de respaldo")
+            elif self.asset_cache:
+                self.asset_cache.store_image(('sprite', name), self.sprite_textures[name], path)
+
+        # Register everything in the atlas (packed later by build_atlas)
+        for wall_id, tex in self.wall_textures.items():
+            self.atlas.add(('wall', wall_id), tex)
+        for name, spr in self.sprite_textures.items():
+            self.atlas.add(('sprite', name), spr)
+
+
+    def _load_wall_texture(self, wall_id, path, decoded=None):
+        """Load one wall texture (cache, file or solid color fallback) and make it resident."""
+        cached = self.asset_cache.load_image(('wall', wall_id)) if self.asset_cache else None
+        if cached is not None:
+            self._make_resident(wall_id, cached)
+            return
+        texture_loaded = False
+        if os.path.exists(path):
+            try:
+                tex = (decoded or self._decode(path)).convert()
+                tex = pygame.transform.scale(tex, (self.texture_size, self.texture_size))
+                texture_loaded = True
+                print(f"  ✓ Textura {wall_id} cargada desde archivo (PyGame)")
+            except Exception as e:
+                print(f"  ! Error PyGame cargando textura {wall_id}: {e}")
+                Image = load_pillow()
+                if Image:
+                    try:
+                        pil_img = Image.open(path).convert('RGB')
+                        mode = pil_img.mode
+                        size = pil_img.size
+                        data = pil_img.tobytes()
+                        tex = pygame.image.fromstring(data, size, mode).convert()
+                        tex = pygame.transform.scale(tex, (self.texture_size, self.texture_size))
+                        texture_loaded = True
+                        print(f"  ✓ Textura {wall_id} cargada con Pillow (RGB)")
+                    except Exception as pil_e:
+                        print(f"  ! Error Pillow cargando textura {wall_id}: {pil_e}")
+        if not texture_loaded:
+            # fallback solid color
+            tex = pygame.Surface((self.texture_size, self.texture_size))
+            tex.fill(self._get_fallback_color(wall_id))
+            print(f"  ✓ Textura {wall_id} usando color sólido")
+        elif self.asset_cache:
+            self.asset_cache.store_image(('wall', wall_id), tex, path)
+        self._make_resident(wall_id, tex)
+
+    def _make_resident(self, wall_id, tex):
+        self.wall_textures[wall_id] = tex
+        if settings.MIPMAPPING:
+            self.wall_mipmaps[wall_id] = build_mip_chain(tex)
+        self.last_used[wall_id] = time.perf_counter()
+        self.wall_version += 1
+
+    def _placeholder(self, wall_id):
+        """Solid color stand-in for a wall texture that is not resident yet."""
+        entry = self.placeholders.get(wall_id)
+        if entry is None:
+            tex = pygame.Surface((self.texture_size, self.texture_size))
+            tex.fill(self._get_fallback_color(wall_id))
+            entry = self.placeholders[wall_id] = (tex, build_mip_chain(tex) if settings.MIPMAPPING else [tex])
+        return entry
+
+    def request_wall_texture(self, wall_id):
+        """Start loading a wall texture that is not resident (decoded in the asset loader if there is one)."""
+        if wall_id in self.wall_textures or wall_id in self.pending_walls:
+            return
+        path = self.WALL_TEXTURE_FILES.get(wall_id)
+        if path is None:
+            return
+        self.pending_walls[wall_id] = path
+        if self.asset_loader:
+            self.asset_loader.prefetch_images([path])
+
+    def update_residency(self, rays, now=None):
+        """
+        Once per frame after casting rays: mark the wall ids hit as used, request
+        the ones that are not resident, finish loads whose decode is done and evict
+        textures unused for TEXTURE_EVICT_SECONDS while over TEXTURE_BUDGET_KB.
+        """
+        now = time.perf_counter() if now is None else now
+        for wall_id in {ray['wall_type'] for ray in rays}:
+            if wall_id in self.wall_textures:
+                self.last_used[wall_id] = now
+            else:
+                self.request_wall_texture(wall_id)
+
+        for wall_id, path in list(self.pending_walls.items()):
+            loader = self.asset_loader
+            if loader and path in loader.futures and not loader.is_ready(path):
+                continue  # Keep showing the placeholder while the decode runs
+            # No future (e.g. a missing file was never submitted): load now so the failure is reported
+            del self.pending_walls[wall_id]
+            decoded = None
+            if self.asset_loader:
+                try:
+                    decoded = self.asset_loader.get_image(path)
+                except Exception:
+                    decoded = None  # _load_wall_texture retries and reports the error
+            self._load_wall_texture(wall_id, path, decoded)
+            self.last_used[wall_id] = now
+
+        self._evict(now)
+
+    def _texture_bytes(self, wall_id):
+        chain = self.wall_mipmaps.get(wall_id) or [self.wall_textures[wall_id]]
+        return sum(level.get_width() * level.get_height() * level.get_bytesize() for level in chain)
+
+    def _evict(self, now):
+        """Drop the least recently used wall textures while resident memory is over budget."""
+        budget = settings.TEXTURE_BUDGET_KB * 1024
+        resident = sum(self._texture_bytes(wall_id) for wall_id in self.wall_textures)
+        if resident <= budget:
+            return
+        candidates = sorted(
+            (self.last_used.get(wall_id, 0.0), wall_id) for wall_id in self.wall_textures
+            if wall_id != 1 and now - self.last_used.get(wall_id, 0.0) > settings.TEXTURE_EVICT_SECONDS
+        )
+        for _, wall_id in candidates:
+            if resident <= budget:
+                break
+            resident -= self._texture_bytes(wall_id)
+            del self.wall_textures[wall_id]
+            self.wall_mipmaps.pop(wall_id, None)
+            self.atlas.discard(('wall', wall_id))
+            self.last_used.pop(wall_id, None)
+            self.wall_version += 1
+            print(f"  ✓ Textura {wall_id} descargada (sin usar)")
+
+    def wall_texture_table(self):
+        """wall_id -> (texture, mip chain) for every drawable wall id, resident or placeholder."""
+        table = {}
+        for wall_id in self.WALL_TEXTURE_FILES:
+            if wall_id not in self.wall_textures:
+                table[wall_id] = self._placeholder(wall_id)
+        for wall_id, tex in self.wall_textures.items():
+            table[wall_id] = (tex, self.wall_mipmaps.get(wall_id, [tex]))
+        return table
+
+    def build_atlas(self):
+        """Pack all registered textures (walls, sprite frames, HUD) into the NumPy atlas."""
+        return self.atlas.build()
+
+    def build_mipmaps(self):
+        """Build mip chains for every sprite frame registered so far (sprites and enemy frames)."""
+        if not settings.MIPMAPPING:
+            return
+        for key, surface in self.atlas.surfaces.items():
+            if key[0] in ('sprite', 'guard') and id(surface) not in self.sprite_mipmaps:
+                self.sprite_mipmaps[id(surface)] = build_mip_chain(surface)
+        print(f"  ✓ Mipmaps: {len(self.wall_mipmaps)} paredes, {len(self.sprite_mipmaps)} frames de sprites")
 
     def _get_fallback_color(self, wall_id):
         """Fallback solid colors for missing wall textures."""
@@ -118,19 +399,89 @@ class TextureManager:
         return colors.get(wall_id, (128, 128, 128))
 
     def get_wall_texture(self, wall_id):
-        """Retrieve wall texture, fallback to texture 1 if missing."""
-        return self.wall_textures.get(wall_id, self.wall_textures.get(1))
+        """Retrieve wall texture: a placeholder while it is not resident, texture 1 for unknown ids."""
+        tex = self.wall_textures.get(wall_id)
+        if tex is None:
+            if wall_id in self.WALL_TEXTURE_FILES:
+                return self._placeholder(wall_id)[0]
+            tex = self.wall_textures.get(1)
+        return tex
+
+    def get_wall_mip(self, wall_id, height):
+        """Retrieve the wall texture mip level that best matches a projected column height."""
+        chain = self.wall_mipmaps.get(wall_id)
+        if chain is None:
+            if wall_id in self.WALL_TEXTURE_FILES and wall_id not in self.wall_textures:
+                chain = self._placeholder(wall_id)[1]
+            else:
+                chain = self.wall_mipmaps.get(1)
+        if not chain:
+            return self.get_wall_texture(wall_id)
+        return chain[select_mip_level(chain[0].get_height(), int(height), len(chain))]
 
     def get_sprite_texture(self, sprite_name):
         """Retrieve sprite texture."""
         return self.sprite_textures.get(sprite_name)
 
+    def get_sprite_mip_chain(self, texture):
+        """Retrieve the mip chain of a sprite frame, building it if it was not seen at load time."""
+        chain = self.sprite_mipmaps.get(id(texture))
+        if chain is None:
+            chain = self.sprite_mipmaps[id(texture)] = build_mip_chain(texture)
+        return chain
+
+    def get_sprite_mip(self, texture, width, height):
+        """Retrieve the mip level of a sprite frame for a projected width x height."""
+        if not settings.MIPMAPPING:
+            return texture
+        chain = self.get_sprite_mip_chain(texture)
+        w, h = texture.get_size()
+        level = min(select_mip_level(w, width, len(chain)), select_mip_level(h, height, len(chain)))
+        return chain[level]
+
+    def _check_wall_caches(self):
+        if self.wall_columns_version != self.wall_version:
+            # Loads and evictions replace textures: drop entries of surfaces that may be gone
+            self.wall_columns = {}
+            self.shaded_walls = {}
+            self.wall_columns_version = self.wall_version
+
+    def get_wall_columns(self, texture):
+        """Display-format 1-pixel columns of a wall texture or mip level, built on first use."""
+        self._check_wall_caches()
+        entry = self.wall_columns.get(id(texture))
+        if entry is None:
+            width, height = texture.get_size()
+            columns = [texture.subsurface((x, 0, 1, height)).convert() for x in range(width)]
+            entry = self.wall_columns[id(texture)] = (texture, columns)
+        return entry[1]
+
+    def get_shaded_wall(self, texture, variant):
+        """
+        Copy of a wall texture or mip level darkened for a shade variant (see
+        shade_variant), built once per texture and variant: the renderer picks
+        pre-shaded columns instead of shading pixels.
+        """
+        self._check_wall_caches()
+        entry = self.shaded_walls.get(id(texture))
+        if entry is None:
+            entry = self.shaded_walls[id(texture)] = (texture, {})
+        shaded = entry[1].get(variant)
+        if shaded is None:
+            factor = shade_factors()[variant]
+            shaded = texture.copy()
+            if factor != 255:
+                shaded.fill((factor, factor, factor), special_flags=pygame.BLEND_RGB_MULT)
+            entry[1][variant] = shaded
+        return shaded
+
     def get_texture_column(self, texture, column, height):
         """Extract a column from a texture and scale to desired height."""
-        if column < 0 or column >= self.texture_size:
+        tex_width, tex_height = texture.get_size()
+        if column < 0 or column >= tex_width:
             column = 0
-        column_surface = pygame.Surface((1, self.texture_size))
-        column_surface.blit(texture, (0, 0), (column, 0, 1, self.texture_size))
+        column_surface = pygame.Surface((1, tex_height))
+        column_surface.blit(texture, (0, 0), (column, 0, 1, tex_height))
         if height > 0:
             column_surface = pygame.transform.scale(column_surface, (1, int(height)))
         return column_surface
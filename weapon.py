@@ -1,7 +1,10 @@
 import pygame
 import os
+import game_clock
 
 class Weapon:
+    SHEET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sprites', 'wolfweapons.png')
+    
     def __init__(self, screen, player, texture_manager):
         self.screen = screen
         self.player = player
@@ -25,12 +28,22 @@ class Weapon:
         # For others, use Pistol as placeholder or try to find them.
         # Actually user has hudmachinegun.png etc, but those are small icons.
         
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        path = os.path.join(base_dir, 'sprites', 'wolfweapons.png')
+        path = self.SHEET_FILE
         
-        if os.path.exists(path):
+        # Frames ya cortados y escalados desde la caché de assets
+        asset_cache = self.texture_manager.asset_cache
+        cached_knife = asset_cache.load_frames(('weapon', 'knife')) if asset_cache else None
+        cached_pistol = asset_cache.load_frames(('weapon', 'pistol')) if cached_knife else None
+        
+        if cached_knife and cached_pistol:
+            self.sprites['knife'] = cached_knife
+            self.sprites['pistol'] = cached_pistol
+        elif os.path.exists(path):
             try:
-                sheet = pygame.image.load(path).convert_alpha()
+                if self.texture_manager.asset_loader:
+                    sheet = self.texture_manager.asset_loader.get_image(path).convert_alpha()
+                else:
+                    sheet = pygame.image.load(path).convert_alpha()
             except Exception as e:
                 print(f"Error PyGame loading weapons: {e}")
                 try:
@@ -63,19 +76,30 @@ class Weapon:
             self.sprites['knife'] = [pygame.transform.scale(img, (target_w, target_h)) for img in frames_knife]
             self.sprites['pistol'] = [pygame.transform.scale(img, (target_w, target_h)) for img in frames_pistol]
             
-            # Fallback for others
-            self.sprites['machinegun'] = self.sprites['pistol']
-            self.sprites['minigun'] = self.sprites['pistol']
+            if asset_cache:
+                asset_cache.store_frames(('weapon', 'knife'), self.sprites['knife'], path)
+                asset_cache.store_frames(('weapon', 'pistol'), self.sprites['pistol'], path)
+        else:
+            return
+            
+        # Fallback for others
+        self.sprites['machinegun'] = self.sprites['pistol']
+        self.sprites['minigun'] = self.sprites['pistol']
+        
+        # Registrar frames en el atlas de texturas
+        for name, frames in self.sprites.items():
+            for i, frame in enumerate(frames):
+                self.texture_manager.atlas.add(('weapon', name, i), frame)
             
     def shoot(self):
         if not self.animating:
             self.animating = True
             self.current_frame = 0
-            self.last_update = pygame.time.get_ticks()
+            self.last_update = game_clock.ticks()
             
     def update(self):
         if self.animating:
-            now = pygame.time.get_ticks()
+            now = game_clock.ticks()
             if now - self.last_update > self.frame_rate:
                 self.last_update = now
                 self.current_frame += 1
@@ -0,0 +1,238 @@
+"""
+Mundo por trozos (chunks) para niveles muy grandes.
+
+El mapa se divide en chunks de STREAM_CHUNK_SIZE x STREAM_CHUNK_SIZE celdas. Solo
+los chunks alrededor del jugador están en memoria; el resto se lee del nivel
+compilado (.lvlc) en un hilo de fondo cuando el jugador se acerca, y los que
+quedan lejos se descartan al pasar de STREAM_MAX_CHUNKS. La memoria usada no
+depende del tamaño del nivel.
+
+Si el nivel se cargó del texto (el .lvlc faltaba o estaba viejo), el .lvlc se
+escribe al crear el mundo; si no se puede escribir, los chunks se copian del
+nivel ya parseado en memoria (funciona, pero la memoria vuelve a depender del
+tamaño del nivel).
+
+Las consultas sobre un chunk que aún no está en memoria responden de forma
+conservadora: la celda es una pared de tipo 1 (sólida, sin puerta).
+
+El hilo de carga no toca el estado del mundo: deja los chunks leídos en una cola y
+update() los publica en el hilo principal, así los chunks en memoria y la versión
+solo cambian entre frames.
+
+ChunkedWorld se puede indexar como map.WORLD_MAP (mundo[y][x], len(mundo),
+len(mundo[0])), así que el código que lee la rejilla funciona sin cambios.
+"""
+import queue
+import sys
+import threading
+import time
+from array import array
+import settings
+from level import HEADER, NO_DOOR, compiled_path, layer_offsets, write_compiled
+
+
+class Chunk:
+    """Capas de un chunk (mismo formato que Level, pero solo w x h celdas)"""
+    __slots__ = ('x0', 'y0', 'w', 'h', 'grid', 'solid', 'door_index')
+
+    def __init__(self, x0, y0, w, h, grid, solid, door_index):
+        self.x0 = x0
+        self.y0 = y0
+        self.w = w
+        self.h = h
+        self.grid = grid
+        self.solid = solid
+        self.door_index = door_index
+
+
+class _Row:
+    """Fila de un ChunkedWorld (para mundo[y][x])"""
+    __slots__ = ('world', 'y')
+
+    def __init__(self, world, y):
+        self.world = world
+        self.y = y
+
+    def __getitem__(self, x):
+        return self.world.cell(x, self.y)
+
+    def __len__(self):
+        return self.world.width
+
+
+class ChunkedWorld:
+    streaming = True  # Los kernels y el raycaster paralelo necesitan el mapa completo
+
+    def __init__(self, level, path, chunk_size=None, radius=None, max_chunks=None):
+        self.width = level.width
+        self.height = level.height
+        self.chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        self.radius = settings.STREAM_RADIUS if radius is None else radius
+        self.max_chunks = max(max_chunks or settings.STREAM_MAX_CHUNKS, (2 * self.radius + 1) ** 2)
+        self.chunks_x = -(-self.width // self.chunk_size)
+        self.chunks_y = -(-self.height // self.chunk_size)
+
+        # El nivel compilado se lee con seek/read (solo el hilo de carga o bajo el lock)
+        self._file = None
+        self._level = None  # Nivel en memoria del que se copian los chunks si no hay .lvlc
+        self._lock = threading.Lock()
+        compiled = compiled_path(path)
+        if level._map is None:
+            # Nivel parseado del texto: el .lvlc no existe o no corresponde a la fuente
+            try:
+                write_compiled(level, compiled, path)
+            except OSError as e:
+                print(f"  ! No se pudo escribir {compiled} ({e}): los chunks se copian del nivel en memoria")
+                self._level = level
+        if self._level is None:
+            self._file = open(compiled, 'rb')
+            entities_len = HEADER.unpack(self._file.read(HEADER.size))[-1]
+            self._offsets = layer_offsets(self.width, self.height, entities_len)
+
+        self.chunks = {}       # (cx, cy) -> Chunk
+        self.last_used = {}    # (cx, cy) -> última vez que el jugador estuvo cerca
+        self.requested = set()  # Chunks pedidos al hilo de carga y aún no publicados
+        self.misses = 0        # Consultas respondidas de forma conservadora
+        self.version = 0       # Sube al cargar o descartar un chunk (ver map.world_version)
+        self._queue = queue.Queue()   # Chunks a leer (hilo principal -> hilo de carga)
+        self._loaded = queue.Queue()  # (clave, Chunk o None si falló) leídos (hilo de carga -> update)
+        self._thread = threading.Thread(target=self._loader, daemon=True)
+        self._thread.start()
+
+    # ---- Consultas ----
+
+    def cell(self, x, y):
+        """Tipo de pared de una celda (1 fuera del mapa o si su chunk no está cargado)"""
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return 1
+        chunk = self.chunks.get((x // self.chunk_size, y // self.chunk_size))
+        if chunk is None:
+            self.misses += 1
+            return 1
+        return chunk.grid[(y - chunk.y0) * chunk.w + x - chunk.x0]
+
+    def door_at(self, x, y):
+        """Índice de la puerta de una celda, o None (también si su chunk no está cargado)"""
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return None
+        chunk = self.chunks.get((x // self.chunk_size, y // self.chunk_size))
+        if chunk is None:
+            return None
+        index = chunk.door_index[(y - chunk.y0) * chunk.w + x - chunk.x0]
+        return None if index == NO_DOOR else index
+
+    def __getitem__(self, y):
+        if y < 0 or y >= self.height:
+            raise IndexError(y)
+        return _Row(self, y)
+
+    def __len__(self):
+        return self.height
+
+    def resident_wall_ids(self):
+        """Tipos de pared de los chunks en memoria (más el 1, que usan las celdas no cargadas)"""
+        ids = {1}
+        for chunk in list(self.chunks.values()):
+            ids.update(chunk.grid)
+        ids.discard(0)
+        return ids
+
+    def resident_bytes(self):
+        return sum(len(c.grid) + len(c.solid) + 2 * len(c.door_index) for c in list(self.chunks.values()))
+
+    # ---- Carga ----
+
+    def _read_chunk(self, cx, cy):
+        x0 = cx * self.chunk_size
+        y0 = cy * self.chunk_size
+        w = min(self.chunk_size, self.width - x0)
+        h = min(self.chunk_size, self.height - y0)
+        if self._level is not None:
+            level = self._level
+            rows = [slice(y * self.width + x0, y * self.width + x0 + w) for y in range(y0, y0 + h)]
+            return Chunk(x0, y0, w, h, b''.join(bytes(level.grid[r]) for r in rows),
+                         b''.join(bytes(level.solid[r]) for r in rows),
+                         array('H', [i for r in rows for i in level.door_index[r]]))
+        grid_start, solid_start, doors_start = self._offsets
+        grid = bytearray()
+        solid = bytearray()
+        doors = bytearray()
+        with self._lock:
+            for y in range(y0, y0 + h):
+                offset = y * self.width + x0
+                self._file.seek(grid_start + offset)
+                grid += self._file.read(w)
+                self._file.seek(solid_start + offset)
+                solid += self._file.read(w)
+                self._file.seek(doors_start + offset * 2)
+                doors += self._file.read(w * 2)
+        door_index = array('H', bytes(doors))
+        if sys.byteorder != 'little':
+            door_index.byteswap()
+        return Chunk(x0, y0, w, h, bytes(grid), bytes(solid), door_index)
+
+    def _loader(self):
+        """Hilo de fondo: lee los chunks pedidos por update"""
+        while True:
+            key = self._queue.get()
+            if key is None:
+                break
+            chunk = None
+            try:
+                chunk = self._read_chunk(*key)
+            except (OSError, ValueError) as e:
+                print(f"  ! Error leyendo el chunk {key}: {e}")
+            self._loaded.put((key, chunk))
+
+    def _publish(self):
+        """Añade al mundo los chunks que terminó de leer el hilo de carga"""
+        while True:
+            try:
+                key, chunk = self._loaded.get_nowait()
+            except queue.Empty:
+                return
+            self.requested.discard(key)
+            if chunk is not None and key not in self.chunks:
+                self.chunks[key] = chunk
+                self.version += 1
+
+    def update(self, player_x, player_y, wait=False):
+        """
+        Pide los chunks en un radio de STREAM_RADIUS alrededor del jugador y
+        descarta los más antiguos si hay demasiados. Con wait=True los carga en
+        el momento, también los que ya estaban pedidos al hilo de carga (para el
+        primer frame y las repeticiones).
+        """
+        self._publish()
+        pcx = int(player_x) // self.chunk_size
+        pcy = int(player_y) // self.chunk_size
+        now = time.perf_counter()
+        needed = set()
+        for cy in range(max(0, pcy - self.radius), min(self.chunks_y, pcy + self.radius + 1)):
+            for cx in range(max(0, pcx - self.radius), min(self.chunks_x, pcx + self.radius + 1)):
+                key = (cx, cy)
+                needed.add(key)
+                self.last_used[key] = now
+                if key in self.chunks:
+                    continue
+                if wait:
+                    # Lo que devuelva después el hilo de carga para esta clave se ignora
+                    self.chunks[key] = self._read_chunk(cx, cy)
+                    self.version += 1
+                elif key not in self.requested:
+                    self.requested.add(key)
+                    self._queue.put(key)
+
+        if len(self.chunks) > self.max_chunks:
+            old = sorted((self.last_used.get(key, 0.0), key) for key in list(self.chunks) if key not in needed)
+            for _, key in old[:len(self.chunks) - self.max_chunks]:
+                self.chunks.pop(key, None)
+                self.last_used.pop(key, None)
+                self.version += 1
+
+    def close(self):
+        """Detiene el hilo de carga y cierra el archivo"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()